@@ -0,0 +1,130 @@
+# sales_dashboard/analysis/aggregate_store.py
+import os
+import pickle
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+# 写入方和触发器维护的表版本号（存放在数据库内），聚合缓存以它和记录数、最大rowid共同标识数据版本
+表版本表 = "表版本"
+缓存表 = "聚合缓存"
+
+# 度量函数: pandas 聚合名 -> SQL 聚合函数
+度量函数 = {'sum': 'SUM', 'mean': 'AVG', 'count': 'COUNT', 'min': 'MIN', 'max': 'MAX'}
+
+def _准备表版本表(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {表版本表} (表名 TEXT PRIMARY KEY, 版本 INTEGER NOT NULL)")
+
+def 递增表版本(conn, 表名):
+    """在写入方的事务内把表的版本号加一，使该表的聚合缓存失效"""
+    _准备表版本表(conn)
+    conn.execute(
+        f"INSERT INTO {表版本表} VALUES (?, 1) ON CONFLICT(表名) DO UPDATE SET 版本 = 版本 + 1", [表名]
+    )
+
+def 创建版本触发器(conn, 表名):
+    """在表上创建修改和删除时递增版本号的触发器（已存在时不做改动），由写入方在建表或初始化时调用
+
+    外部程序原地修改记录不会改变记录数和最大rowid，由触发器递增版本号，聚合缓存才会失效。
+    新增记录不递增版本号，由记录数和最大rowid发现（日摘要据此只合并新增的记录）。
+    不提交事务：整表替换时与新表在同一个事务内创建。
+    """
+    _准备表版本表(conn)
+    for 事件, 后缀 in (('UPDATE', '修改'), ('DELETE', '删除')):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{表名}_版本_{后缀} AFTER {事件} ON {表名}
+            BEGIN
+                INSERT INTO {表版本表} VALUES ('{表名}', 1) ON CONFLICT(表名) DO UPDATE SET 版本 = 版本 + 1;
+            END
+        """)
+
+def 读取表版本(conn, 表名):
+    """返回表的数据版本标识：'版本号:记录数:最大rowid'
+
+    记录数和最大rowid 能发现外部追加的记录；原地修改和删除由写入方创建的版本触发器（见 创建版本触发器）
+    递增版本号发现。只读取，不修改数据库。
+    """
+    版本号 = 0
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [表版本表]).fetchone():
+        行 = conn.execute(f"SELECT 版本 FROM {表版本表} WHERE 表名 = ?", [表名]).fetchone()
+        版本号 = 行[0] if 行 else 0
+    记录数, 最大行号 = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {表名}").fetchone()
+    return f"{版本号}:{记录数}:{最大行号 or 0}"
+
+def 分组汇总(df, 分组键, 度量):
+    """在内存数据上计算分组汇总，结果与 聚合存储.分组汇总 的格式相同
+
+    度量为 ((列名, 函数), ...)，结果列名为 "列名_函数"，分组键为空值的记录不参与分组。
+    """
+    结果 = df.groupby(list(分组键), observed=True).agg(**{
+        f"{列名}_{函数}": (列名, 函数) for 列名, 函数 in 度量
+    })
+    return 结果
+
+class 聚合存储:
+    """按 (表, 表版本, 分组键, 度量) 缓存分组汇总结果的磁盘存储
+
+    缓存放在数据库旁边的独立文件中，读写缓存不会改变数据库文件本身（看板按其修改时间判断数据版本）。
+    未命中时在 SQLite 中直接 GROUP BY，不把明细读入内存。
+    """
+
+    def __init__(self, 数据库路径, 缓存路径=None):
+        self.数据库路径 = 数据库路径
+        self.缓存路径 = 缓存路径 or os.path.join(os.path.dirname(os.path.abspath(数据库路径)), "aggregate_cache.db")
+        self.命中 = 0
+        self.未命中 = 0
+
+        conn = sqlite3.connect(self.缓存路径)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {缓存表} (
+                表名 TEXT NOT NULL,
+                表版本 TEXT NOT NULL,
+                分组键 TEXT NOT NULL,
+                度量 TEXT NOT NULL,
+                结果 BLOB NOT NULL,
+                创建时间 TEXT,
+                PRIMARY KEY (表名, 表版本, 分组键, 度量)
+            )
+        """)
+        conn.close()
+
+    def 分组汇总(self, 表名, 分组键, 度量):
+        """返回表当前版本的分组汇总，已缓存时直接读取"""
+        数据库 = sqlite3.connect(self.数据库路径)
+        try:
+            表版本 = 读取表版本(数据库, 表名)
+            键 = (表名, 表版本, ','.join(分组键), ','.join(f"{列名}_{函数}" for 列名, 函数 in 度量))
+
+            缓存 = sqlite3.connect(self.缓存路径)
+            行 = 缓存.execute(
+                f"SELECT 结果 FROM {缓存表} WHERE 表名 = ? AND 表版本 = ? AND 分组键 = ? AND 度量 = ?", 键
+            ).fetchone()
+            if 行:
+                self.命中 += 1
+                缓存.close()
+                return pickle.loads(行[0])
+
+            self.未命中 += 1
+            结果 = self._计算(数据库, 表名, 分组键, 度量)
+            with 缓存:
+                # 同一张表的旧版本结果不会再被用到
+                缓存.execute(f"DELETE FROM {缓存表} WHERE 表名 = ? AND 表版本 != ?", [表名, 表版本])
+                缓存.execute(
+                    f"INSERT OR REPLACE INTO {缓存表} VALUES (?, ?, ?, ?, ?, ?)",
+                    list(键) + [pickle.dumps(结果), datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+                )
+            缓存.close()
+            return 结果
+        finally:
+            数据库.close()
+
+    def _计算(self, conn, 表名, 分组键, 度量):
+        """在 SQLite 中计算分组汇总，返回以分组键为索引的 DataFrame"""
+        键列 = ', '.join(分组键)
+        度量列 = ', '.join(f'{度量函数[函数]}({列名}) AS "{列名}_{函数}"' for 列名, 函数 in 度量)
+        条件 = ' AND '.join(f"{键} IS NOT NULL" for 键 in 分组键)
+        结果 = pd.read_sql(
+            f"SELECT {键列}, {度量列} FROM {表名} WHERE {条件} GROUP BY {键列} ORDER BY {键列}", conn
+        )
+        return 结果.set_index(list(分组键))
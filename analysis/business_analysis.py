@@ -1,25 +1,33 @@
 # sales_dashboard/analysis/business_analysis.py
 import sqlite3
+import argparse
 import pandas as pd
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
+from compact_frame import 压缩数据框, 内存报告
+from cleaned_table import 清洗表
+from aggregate_store import 聚合存储, 分组汇总
+from chart_rendering import 业务图表面板, 渲染图表
+from time_series import 时间序列
+from range_index import 区间索引, 变化率
+from sketches import 摘要存储, 合并摘要
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
-plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
+数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
+
+# 销售员、产品、区域三个维度共用的业绩度量
+业绩度量 = (('销售额', 'sum'), ('销售额', 'mean'), ('销售额', 'count'), ('单价', 'mean'), ('数量', 'mean'))
 
 def 获取清洗后数据():
     """获取清洗后的干净数据"""
-    数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
     conn = sqlite3.connect(数据库路径)
     
-    # 读取清洗后的数据
-    df = pd.read_sql("SELECT * FROM 产品销售_清洗后", conn)
+    # 读取清洗后的数据，并转换为紧凑的内存表示（金额需要直接汇总，保留float64）
+    df = pd.read_sql(f"SELECT * FROM {清洗表}", conn)
     conn.close()
+    df = 压缩数据框(df, 金额降精度=False)
     
-    print(f"✅ 读取清洗后数据: {len(df)} 条记录")
+    print(f"✅ 读取清洗后数据: {len(df)} 条记录 (内存占用 {内存报告(df).loc['合计', '内存(KB)']} KB)")
     return df
 
 def 核心KPI分析(df):
@@ -38,7 +46,16 @@ def 核心KPI分析(df):
     print(f"📦 总订单数: {总订单数} 笔")
     print(f"📊 平均订单金额: {平均订单金额:,.2f} 元")
     print(f"👤 客单价: {客单价:,.2f} 元")
-    print(f"📅 分析时间范围: {df['订单日期'].min()} 到 {df['订单日期'].max()}")
+    print(f"📅 分析时间范围: {df['订单日期'].min().date()} 到 {df['订单日期'].max().date()}")
+    
+    # 近30天与前30天对比（前缀和索引，每个区间两次查询）
+    索引 = 区间索引.从记录构建(df)
+    _, 最后一天 = 索引.日期范围()
+    本期, 上期 = 索引.环比(最后一天 - 29, 最后一天)
+    for 度量, 单位 in [('销售额', '元'), ('订单数', '笔')]:
+        变化 = 变化率(本期[度量], 上期[度量])
+        变化说明 = f"{变化:+.1f}%" if 变化 is not None else "无上期数据"
+        print(f"🔄 近30天{度量}: {本期[度量]:,.0f} {单位} (前30天 {上期[度量]:,.0f} {单位}, {变化说明})")
     
     return {
         '总销售额': 总销售额,
@@ -47,22 +64,25 @@ def 核心KPI分析(df):
         '客单价': 客单价
     }
 
-def 销售团队分析(df):
+def 维度业绩(df, 维度, 存储=None):
+    """按维度汇总业绩，传入聚合存储时从缓存读取（同一数据版本只计算一次）"""
+    if 存储 is not None:
+        业绩 = 存储.分组汇总(清洗表, [维度], 业绩度量)
+    else:
+        业绩 = 分组汇总(df, [维度], 业绩度量)
+    
+    业绩 = 业绩.round(2)
+    业绩.columns = ['总销售额', '平均订单额', '订单数', '平均单价', '平均数量']
+    return 业绩.sort_values('总销售额', ascending=False)
+
+def 销售团队分析(df, 存储=None):
     """销售团队业绩深度分析"""
     print("\n" + "=" * 50)
     print("👥 销售团队分析")
     print("=" * 50)
     
     # 销售员业绩排名
-    销售员业绩 = df.groupby('销售员姓名').agg({
-        '销售额': ['sum', 'mean', 'count'],
-        '单价': 'mean',
-        '数量': 'mean'
-    }).round(2)
-    
-    # 重命名列
-    销售员业绩.columns = ['总销售额', '平均订单额', '订单数', '平均单价', '平均数量']
-    销售员业绩 = 销售员业绩.sort_values('总销售额', ascending=False)
+    销售员业绩 = 维度业绩(df, '销售员姓名', 存储)
     
     print("🏆 销售员业绩排名:")
     print(销售员业绩)
@@ -77,21 +97,14 @@ def 销售团队分析(df):
     
     return 销售员业绩
 
-def 产品表现分析(df):
+def 产品表现分析(df, 存储=None):
     """产品类别和性能分析"""
     print("\n" + "=" * 50)
     print("📦 产品表现分析")
     print("=" * 50)
     
     # 产品类别分析
-    产品业绩 = df.groupby('产品类别').agg({
-        '销售额': ['sum', 'mean', 'count'],
-        '单价': 'mean',
-        '数量': 'mean'
-    }).round(2)
-    
-    产品业绩.columns = ['总销售额', '平均订单额', '订单数', '平均单价', '平均数量']
-    产品业绩 = 产品业绩.sort_values('总销售额', ascending=False)
+    产品业绩 = 维度业绩(df, '产品类别', 存储)
     
     print("🔥 产品类别表现:")
     print(产品业绩)
@@ -107,21 +120,14 @@ def 产品表现分析(df):
     
     return 产品业绩
 
-def 区域市场分析(df):
+def 区域市场分析(df, 存储=None):
     """区域销售表现分析"""
     print("\n" + "=" * 50)
     print("🌍 区域市场分析")
     print("=" * 50)
     
     # 区域业绩分析
-    区域业绩 = df.groupby('区域').agg({
-        '销售额': ['sum', 'mean', 'count'],
-        '单价': 'mean',
-        '数量': 'mean'
-    }).round(2)
-    
-    区域业绩.columns = ['总销售额', '平均订单额', '订单数', '平均单价', '平均数量']
-    区域业绩 = 区域业绩.sort_values('总销售额', ascending=False)
+    区域业绩 = 维度业绩(df, '区域', 存储)
     
     print("📍 区域销售表现:")
     print(区域业绩)
@@ -136,38 +142,73 @@ def 区域市场分析(df):
     
     return 区域业绩
 
+def 订单分布分析(日摘要):
+    """订单金额分位数、去重订单数和销售额 Top-3（由按天的可合并摘要近似得到，不读取明细）"""
+    print("\n" + "=" * 50)
+    print("📐 订单分布分析（近似）")
+    print("=" * 50)
+    
+    摘要 = 合并摘要(日摘要)
+    分位数 = 摘要.分位数()
+    print(f"🧾 去重订单数: 约 {摘要.订单.估计():,.0f} 笔 (共 {摘要.金额.计数} 条记录)")
+    print("💵 订单金额分位数: " + ", ".join(f"{名}={值:,.0f}元" for 名, 值 in 分位数.items()))
+    for 名称, 频繁 in [('销售员', 摘要.销售员), ('产品', 摘要.产品)]:
+        前三 = 频繁.前N(3)
+        print(f"🏆 销售额前3{名称}: " + ", ".join(f"{项}({行.计数:,.0f}元)" for 项, 行 in 前三.iterrows()))
+    return 分位数
+
 def 时间趋势分析(df):
-    """销售时间趋势分析"""
+    """销售时间趋势分析（月度、季度汇总和滚动窗口都由按天的基础序列推导）"""
     print("\n" + "=" * 50)
     print("📅 时间趋势分析")
     print("=" * 50)
     
-    # 确保日期格式
-    df['订单日期'] = pd.to_datetime(df['订单日期'])
-    
-    # 月度趋势
-    df['年月'] = df['订单日期'].dt.to_period('M')
-    月度趋势 = df.groupby('年月').agg({
-        '销售额': 'sum',
-        '订单ID': 'count',
-        '单价': 'mean'
-    }).round(2)
-    
-    月度趋势.columns = ['月销售额', '月订单数', '月平均单价']
+    # 扫描一次订单得到按天的基础序列，之后的计算只与天数有关
+    # 单价有缺失时平均单价只按有单价的订单计算（与 mean() 跳过空值一致）
+    序列 = 时间序列.从明细构建(
+        df.assign(有单价订单数=df['单价'].notna()), ('销售额', '订单数', '单价', '有单价订单数')
+    )
+    
+    # 月度趋势（只列出有订单的月份）
+    月度汇总 = 序列.汇总('M')
+    月度汇总 = 月度汇总[月度汇总['订单数'] > 0]
+    月度趋势 = pd.DataFrame({
+        '月销售额': 月度汇总['销售额'],
+        '月订单数': 月度汇总['订单数'].astype(int),
+        '月平均单价': 月度汇总['单价'] / 月度汇总['有单价订单数'].where(月度汇总['有单价订单数'] > 0),
+    }).rename_axis('年月').round(2)
     
     print("📈 月度销售趋势:")
     print(月度趋势)
     
+    # 季度汇总
+    季度汇总 = 序列.汇总('Q')
+    print(f"\n📊 季度销售额:")
+    for 季度, 销售额 in 季度汇总['销售额'].items():
+        print(f"  {季度}: ¥{销售额:,.0f}")
+    
     # 增长分析
     if len(月度趋势) > 1:
         首月销售额 = 月度趋势.iloc[0]['月销售额']
         末月销售额 = 月度趋势.iloc[-1]['月销售额']
         增长率 = ((末月销售额 - 首月销售额) / 首月销售额 * 100).round(2)
+        环比 = 序列.环比('M')['销售额'].iloc[-1]
+        同比 = 序列.同比('M')['销售额'].iloc[-1]
         
         print(f"\n🚀 销售增长分析:")
         print(f"  期初: ¥{首月销售额:,.0f}")
         print(f"  期末: ¥{末月销售额:,.0f}")
         print(f"  增长率: {增长率}%")
+        # 上月没有销售额时环比无意义（NaN），与报告中其他缺失值一样显示为 -
+        print(f"  末月环比: {'-' if pd.isna(环比) else f'{环比}%'}")
+        print(f"  末月同比: {'数据不足一年' if pd.isna(同比) else f'{同比}%'}")
+    
+    # 滚动窗口
+    print(f"\n📉 近期滚动窗口 (截至 {序列.日数据.index[-1].date()}):")
+    for 天数 in (7, 30):
+        合计 = 序列.滚动(天数)['销售额'].iloc[-1]
+        if pd.notna(合计):
+            print(f"  近{天数}天: 销售额 ¥{合计:,.0f}，日均 ¥{合计 / 天数:,.0f}")
     
     return 月度趋势
 
@@ -183,7 +224,7 @@ def 生成分析报告(df, kpi, 销售员业绩, 产品业绩, 区域业绩, 月
     with open(报告路径, 'w', encoding='utf-8') as f:
         f.write("=== 销售业务分析报告 ===\n\n")
         f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"分析周期: {df['订单日期'].min()} 到 {df['订单日期'].max()}\n")
+        f.write(f"分析周期: {df['订单日期'].min().date()} 到 {df['订单日期'].max().date()}\n")
         f.write(f"数据总量: {len(df)} 条销售记录\n\n")
         
         f.write("一、核心KPI指标\n")
@@ -230,8 +271,8 @@ def 生成分析报告(df, kpi, 销售员业绩, 产品业绩, 区域业绩, 月
     
     print(f"\n📄 详细分析报告已保存至: {报告路径}")
 
-def 创建可视化图表(df, 销售员业绩, 产品业绩, 区域业绩, 月度趋势):
-    """创建业务分析可视化图表"""
+def 创建可视化图表(df, 销售员业绩, 产品业绩, 区域业绩, 月度趋势, 缩略图=None, 进程数=None):
+    """创建业务分析可视化图表（数据未变的图片直接复用，变化的在多个进程中并行渲染）"""
     print("\n" + "=" * 50)
     print("📊 生成可视化图表")
     print("=" * 50)
@@ -239,44 +280,27 @@ def 创建可视化图表(df, 销售员业绩, 产品业绩, 区域业绩, 月
     try:
         # 创建图表目录
         图表目录 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/reports/charts"
-        os.makedirs(图表目录, exist_ok=True)
-        
-        # 1. 销售员业绩饼图
-        plt.figure(figsize=(10, 8))
-        plt.subplot(2, 2, 1)
-        plt.pie(销售员业绩['总销售额'], labels=销售员业绩.index, autopct='%1.1f%%')
-        plt.title('销售员业绩分布')
-        
-        # 2. 产品销售额柱状图
-        plt.subplot(2, 2, 2)
-        产品业绩['总销售额'].plot(kind='bar')
-        plt.title('产品销售额对比')
-        plt.xticks(rotation=45)
-        
-        # 3. 区域市场份额
-        plt.subplot(2, 2, 3)
-        plt.pie(区域业绩['总销售额'], labels=区域业绩.index, autopct='%1.1f%%')
-        plt.title('区域市场份额')
-        
-        # 4. 月度趋势图
-        plt.subplot(2, 2, 4)
-        月度趋势['月销售额'].plot(kind='line', marker='o')
-        plt.title('月度销售趋势')
-        plt.xticks(rotation=45)
         
-        plt.tight_layout()
-        图表路径 = os.path.join(图表目录, '业务分析图表.png')
-        plt.savefig(图表路径, dpi=300, bbox_inches='tight')
-        plt.close()
+        # 销售员业绩饼图、产品销售额柱状图、区域市场份额、月度趋势图，以及四合一的全图
+        面板列表 = 业务图表面板(销售员业绩, 产品业绩, 区域业绩, 月度趋势)
+        结果 = 渲染图表(图表目录, 面板列表, 缩略图=缩略图, 进程数=进程数)
         
-        print(f"✅ 可视化图表已保存至: {图表路径}")
+        复用数 = sum(状态 == '复用' for 状态 in 结果.values())
+        print(f"✅ 可视化图表已保存至: {图表目录} (渲染 {len(结果) - 复用数} 张，复用 {复用数} 张)")
         
     except Exception as e:
         print(f"⚠️  图表生成遇到问题: {e}")
         print("💡 建议: 可以稍后安装matplotlib解决")
 
 # 执行业务分析
-if __name__ == "__main__":
+def 主要(参数列表=None):
+    """命令行入口（也由 cli.py 调用）"""
+    parser = argparse.ArgumentParser(description="销售业务分析")
+    parser.add_argument('--thumbnails', choices=['png', 'svg'], default=None, help="在图表旁另存一份缩略图")
+    parser.add_argument('--chart-workers', type=int, default=None, help="并行渲染图表的进程数")
+    parser.add_argument('--sketches', action='store_true', help="输出由按天摘要近似得到的订单金额分位数和Top-K")
+    参数 = parser.parse_args(参数列表)
+    
     print("🎯 开始第三步: 业务分析")
     print("=" * 50)
     
@@ -287,14 +311,18 @@ if __name__ == "__main__":
         # 2. 核心KPI分析
         kpi = 核心KPI分析(df)
         
-        # 3. 销售团队分析
-        销售员业绩 = 销售团队分析(df)
-        
-        # 4. 产品表现分析
-        产品业绩 = 产品表现分析(df)
+        # 3~5. 销售团队、产品、区域分析（分组汇总经聚合缓存，数据未变时直接复用）
+        存储 = 聚合存储(数据库路径)
+        销售员业绩 = 销售团队分析(df, 存储)
+        产品业绩 = 产品表现分析(df, 存储)
+        区域业绩 = 区域市场分析(df, 存储)
+        print(f"\n🗄️  聚合缓存: 命中 {存储.命中} 次，计算 {存储.未命中} 次")
         
-        # 5. 区域市场分析
-        区域业绩 = 区域市场分析(df)
+        # 可选: 订单金额分布（按天摘要保存在数据库旁，数据只追加时增量合并）
+        if 参数.sketches:
+            摘要 = 摘要存储(数据库路径)
+            订单分布分析(摘要.日摘要(清洗表))
+            print(f"📐 订单摘要: 复用 {摘要.复用} 个，增量合并 {摘要.增量合并} 个，重建 {摘要.重建} 个日摘要")
         
         # 6. 时间趋势分析
         月度趋势 = 时间趋势分析(df)
@@ -303,7 +331,7 @@ if __name__ == "__main__":
         生成分析报告(df, kpi, 销售员业绩, 产品业绩, 区域业绩, 月度趋势)
         
         # 8. 创建可视化图表
-        创建可视化图表(df, 销售员业绩, 产品业绩, 区域业绩, 月度趋势)
+        创建可视化图表(df, 销售员业绩, 产品业绩, 区域业绩, 月度趋势, 参数.thumbnails, 参数.chart_workers)
         
         print("\n" + "=" * 50)
         print("🎉 业务分析完成!")
@@ -314,4 +342,7 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"❌ 业务分析过程中出错: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    主要()
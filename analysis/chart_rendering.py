@@ -0,0 +1,129 @@
+# sales_dashboard/analysis/chart_rendering.py
+import os
+import json
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# 绘图逻辑变化时递增，使已缓存的图片全部失效
+图表版本 = 1
+清单文件 = "图表清单.json"
+全图文件名 = "业务分析图表"
+全图尺寸 = (10, 8)
+单图尺寸 = (6, 5)
+全图DPI = 300
+缩略图DPI = 40
+
+def 业务图表面板(销售员业绩, 产品业绩, 区域业绩, 月度趋势):
+    """把分析结果整理成四个面板（只保留绘图用到的序列，便于哈希和传给工作进程）"""
+    月销售额 = 月度趋势['月销售额'].copy()
+    月销售额.index = 月销售额.index.astype(str)
+    return [
+        {'文件名': '销售员业绩分布', '类型': 'pie', '标题': '销售员业绩分布', '数据': 销售员业绩['总销售额']},
+        {'文件名': '产品销售额对比', '类型': 'bar', '标题': '产品销售额对比', '数据': 产品业绩['总销售额']},
+        {'文件名': '区域市场份额', '类型': 'pie', '标题': '区域市场份额', '数据': 区域业绩['总销售额']},
+        {'文件名': '月度销售趋势', '类型': 'line', '标题': '月度销售趋势', '数据': 月销售额},
+    ]
+
+def 面板哈希(面板列表, dpi=全图DPI):
+    """按面板的类型、标题和绘图数据计算哈希，数据不变则哈希不变"""
+    h = hashlib.sha256(repr((图表版本, dpi)).encode())
+    for 面板 in 面板列表:
+        h.update(repr((面板['类型'], 面板['标题'], list(面板['数据'].index.astype(str)))).encode())
+        h.update(pd.util.hash_pandas_object(面板['数据'], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _绘制面板(ax, 面板):
+    """在给定坐标轴上绘制一个面板"""
+    数据 = 面板['数据']
+    if 面板['类型'] == 'pie':
+        ax.pie(数据, labels=数据.index, autopct='%1.1f%%')
+    elif 面板['类型'] == 'bar':
+        数据.plot(kind='bar', ax=ax)
+        ax.tick_params(axis='x', labelrotation=45)
+    else:
+        数据.plot(kind='line', marker='o', ax=ax)
+        ax.tick_params(axis='x', labelrotation=45)
+    ax.set_title(面板['标题'])
+
+def _渲染(任务):
+    """在工作进程中渲染一张图片（单个面板或 2×2 全图），返回 (文件名, 输出路径列表, 耗时秒)"""
+    开始 = time.perf_counter()
+    # 只用非交互式后端，工作进程里不需要也不能打开窗口
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
+    plt.rcParams['axes.unicode_minus'] = False    # 用来正常显示负号
+
+    面板列表 = 任务['面板']
+    if len(面板列表) == 1:
+        fig, ax = plt.subplots(figsize=单图尺寸)
+        _绘制面板(ax, 面板列表[0])
+    else:
+        fig, 坐标轴 = plt.subplots(2, 2, figsize=全图尺寸)
+        for ax, 面板 in zip(坐标轴.flat, 面板列表):
+            _绘制面板(ax, 面板)
+    fig.tight_layout()
+
+    输出路径 = [os.path.join(任务['目录'], f"{任务['文件名']}.png")]
+    fig.savefig(输出路径[0], dpi=任务['dpi'], bbox_inches='tight')
+    if 任务['缩略图']:
+        缩略图路径 = os.path.join(任务['目录'], f"{任务['文件名']}_缩略图.{任务['缩略图']}")
+        fig.savefig(缩略图路径, dpi=缩略图DPI, bbox_inches='tight')
+        输出路径.append(缩略图路径)
+    plt.close(fig)
+    return 任务['文件名'], 输出路径, time.perf_counter() - 开始
+
+def 渲染图表(图表目录, 面板列表, 缩略图=None, 进程数=None, dpi=全图DPI):
+    """渲染各面板的单图和 2×2 全图，数据未变的图片直接复用磁盘上的文件
+
+    缩略图为 None、'png' 或 'svg'，在原图旁边另存一份低分辨率或矢量的小图。
+    需要渲染的图片分配到多个工作进程并行绘制；返回 {文件名: '复用' 或 '渲染'}。
+    """
+    os.makedirs(图表目录, exist_ok=True)
+    清单路径 = os.path.join(图表目录, 清单文件)
+    清单 = {}
+    if os.path.exists(清单路径):
+        with open(清单路径, encoding='utf-8') as f:
+            清单 = json.load(f)
+
+    # 1. 每个面板一张单图，外加原有的 2×2 全图
+    任务列表 = [
+        {'文件名': 面板['文件名'], '面板': [面板]} for 面板 in 面板列表
+    ] + [{'文件名': 全图文件名, '面板': 面板列表}]
+
+    结果, 待渲染 = {}, []
+    for 任务 in 任务列表:
+        任务.update({'目录': 图表目录, 'dpi': dpi, '缩略图': 缩略图})
+        任务['哈希'] = 面板哈希(任务['面板'], dpi)
+        文件齐全 = os.path.exists(os.path.join(图表目录, f"{任务['文件名']}.png")) and (
+            not 缩略图 or os.path.exists(os.path.join(图表目录, f"{任务['文件名']}_缩略图.{缩略图}"))
+        )
+        if 清单.get(任务['文件名']) == 任务['哈希'] and 文件齐全:
+            结果[任务['文件名']] = '复用'
+        else:
+            待渲染.append(任务)
+
+    # 2. 并行渲染变化的图片（只有一张时直接在当前进程绘制，省去启动进程的开销）
+    if len(待渲染) == 1:
+        完成 = [_渲染(待渲染[0])]
+    elif 待渲染:
+        # 可能从流水线的工作线程中调用，使用 spawn 避免在多线程进程中 fork
+        with ProcessPoolExecutor(max_workers=min(进程数 or os.cpu_count(), len(待渲染)),
+                                 mp_context=multiprocessing.get_context('spawn')) as 执行器:
+            完成 = list(执行器.map(_渲染, 待渲染))
+    else:
+        完成 = []
+
+    for 任务, (文件名, _, 耗时) in zip(待渲染, 完成):
+        清单[文件名] = 任务['哈希']
+        结果[文件名] = '渲染'
+        print(f"  🖼️  {文件名}: 渲染完成 ({耗时:.2f} 秒)")
+
+    with open(清单路径, 'w', encoding='utf-8') as f:
+        json.dump(清单, f, ensure_ascii=False, indent=2)
+    return 结果
@@ -0,0 +1,58 @@
+# sales_dashboard/analysis/cleaned_table.py
+import time
+
+# 清洗表的显式结构（列名 -> SQLite类型），列顺序即写入顺序
+清洗表 = "产品销售_清洗后"
+清洗表结构 = {
+    '订单ID': 'TEXT',
+    '销售员ID': 'INTEGER',
+    '销售员姓名': 'TEXT',
+    '产品类别': 'TEXT',
+    '单价': 'REAL',
+    '数量': 'INTEGER',
+    '销售额': 'REAL',
+    '订单日期': 'TEXT',
+    '区域': 'TEXT',
+    '客户类型': 'TEXT',
+}
+
+# 二级索引：订单ID 服务增量清洗的按订单替换，其余服务看板的过滤和键集分页
+清洗表索引 = {
+    'idx_清洗后_订单ID': '订单ID',
+    'idx_清洗后_订单日期_订单ID': '订单日期, 订单ID',
+    'idx_清洗后_区域': '区域',
+    'idx_清洗后_产品类别': '产品类别',
+    'idx_清洗后_销售员ID': '销售员ID',
+}
+
+def 设置写入参数(conn):
+    """批量写入前调整SQLite参数：WAL日志（持久生效）和 synchronous=NORMAL（仅当前连接）"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+def 创建清洗表(conn, 表名=清洗表):
+    """按显式结构创建清洗表（不含索引，索引在数据写完后再建）"""
+    列定义 = ',\n    '.join(f"{列名} {类型}" for 列名, 类型 in 清洗表结构.items())
+    conn.execute(f"DROP TABLE IF EXISTS {表名}")
+    conn.execute(f"CREATE TABLE {表名} (\n    {列定义}\n)")
+
+def 创建清洗表索引(conn, 表名=清洗表):
+    """为清洗表创建全部二级索引（已存在时跳过）"""
+    for 索引名, 列名 in 清洗表索引.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {索引名} ON {表名} ({列名})")
+
+def 批量写入(conn, df, 表名=清洗表, 批大小=50000):
+    """按清洗表结构的列顺序用 executemany 分批插入，不提交事务，返回 (写入行数, 耗时秒)
+
+    事务由调用方控制，整次加载只在最后提交一次；结构中有而数据中没有的列写入 NULL。
+    """
+    开始 = time.perf_counter()
+    列 = [列名 for 列名 in 清洗表结构 if 列名 in df.columns]
+    sql = f"INSERT INTO {表名} ({', '.join(列)}) VALUES ({', '.join('?' * len(列))})"
+    for 起点 in range(0, len(df), 批大小):
+        conn.executemany(sql, df[列].iloc[起点:起点 + 批大小].itertuples(index=False, name=None))
+    return len(df), time.perf_counter() - 开始
+
+def 写入速度(行数, 耗时):
+    """格式化写入速度，用于清洗脚本输出"""
+    return f"{行数} 行 / {耗时:.2f} 秒 ({行数 / 耗时 if 耗时 else 0:,.0f} 行/秒)"
@@ -0,0 +1,57 @@
+# sales_dashboard/analysis/compact_frame.py
+import numpy as np
+import pandas as pd
+
+# 取值个数很少的文本维度，转换为分类类型
+分类列 = ['产品类别', '区域', '销售员姓名', '客户类型']
+# 整数列和金额列（金额保留两位小数）
+整数列 = ['销售员ID', '数量']
+金额列 = ['单价', '销售额']
+
+def _可无损降为float32(列):
+    """金额精确到分时，float32 往返后仍能还原到分才允许降精度"""
+    原值 = 列.to_numpy(dtype='float64')
+    往返 = 原值.astype('float32').astype('float64')
+    return bool(np.all(np.isnan(原值) | (np.round(往返, 2) == np.round(原值, 2))))
+
+def 压缩数据框(df, 订单ID使用Arrow=True, 金额降精度=True):
+    """将销售数据转换为紧凑的内存表示（原地转换并返回同一个DataFrame）
+
+    - 低基数文本维度转为 category
+    - 订单日期只解析一次为 datetime64
+    - 整数列向下转换为最小的整数类型，金额列在不丢失分位精度时转为 float32
+      （需要直接对金额求和的场景应传 金额降精度=False，避免 float32 累加误差）
+    - 订单ID 可选使用 Arrow 存储的字符串类型（未安装 pyarrow 时保持原样）
+    """
+    for 列名 in 分类列:
+        if 列名 in df.columns:
+            df[列名] = df[列名].astype('category')
+
+    if '订单日期' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['订单日期']):
+        df['订单日期'] = pd.to_datetime(df['订单日期'])
+
+    for 列名 in 整数列:
+        if 列名 in df.columns and df[列名].notna().all():
+            df[列名] = pd.to_numeric(df[列名], downcast='integer')
+
+    for 列名 in 金额列 if 金额降精度 else []:
+        if 列名 in df.columns and _可无损降为float32(df[列名]):
+            df[列名] = df[列名].astype('float32')
+
+    if 订单ID使用Arrow and '订单ID' in df.columns:
+        try:
+            df['订单ID'] = df['订单ID'].astype('string[pyarrow]')
+        except ImportError:
+            pass
+
+    return df
+
+def 内存报告(df):
+    """统计每列的实际内存占用（包含字符串对象本身）"""
+    占用 = df.memory_usage(deep=True, index=False)
+    报告 = pd.DataFrame({
+        '类型': df.dtypes.astype(str),
+        '内存(KB)': (占用 / 1024).round(1),
+    })
+    报告.loc['合计'] = ['', round(占用.sum() / 1024, 1)]
+    return 报告
@@ -1,13 +1,25 @@
 # sales_dashboard/analysis/data_cleaning.py
+import io
+import re
+import time
 import sqlite3
+import argparse
+import contextlib
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 import os
 import numpy as np
 from datetime import datetime
 
+from validation_rules import 合理价格范围, 数量上限, 执行校验, 异常统计
+from cleaned_table import 清洗表, 设置写入参数, 创建清洗表, 创建清洗表索引, 批量写入, 写入速度
+from aggregate_store import 递增表版本, 创建版本触发器
+
+数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
+原始表 = "产品销售"
+
 def 获取原始数据():
     """获取需要清洗的原始数据"""
-    数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
     conn = sqlite3.connect(数据库路径)
     
     # 读取所有销售数据
@@ -17,53 +29,50 @@ def 获取原始数据():
     print(f"✅ 读取原始数据: {len(df)} 条记录")
     return df
 
-def 识别数据问题(df):
-    """系统化识别所有数据问题"""
+def 识别数据问题(df, 校验结果=None):
+    """系统化识别所有数据问题
+
+    所有规则在一次校验中完成；校验结果为 执行校验(df) 的返回值，已校验过时传入可避免重复扫描。
+    问题记录中的异常以行位置数组保存（不复制数据行），需要明细时再用 df.iloc[位置] 取出。
+    """
     print("=" * 50)
     print("🔍 数据问题识别")
     print("=" * 50)
     
     问题记录 = {}
+    掩码, 缺失计数 = 校验结果 if 校验结果 is not None else 执行校验(df)
     
-    # 1. 价格异常识别
-    合理价格范围 = {
-        '智能手机': (1000, 10000),
-        '笔记本电脑': (3000, 20000), 
-        '平板电脑': (1000, 8000),
-        '智能手表': (500, 5000),
-        '耳机': (50, 2000)
-    }
-    
+    # 1. 价格异常识别（按产品分批排列位置，批次顺序决定修正价格的抽取顺序）
     print("💰 价格异常检测:")
-    价格异常记录 = []
-    for 产品, (最低价, 最高价) in 合理价格范围.items():
-        异常 = df[(df['产品类别'] == 产品) & ((df['单价'] < 最低价) | (df['单价'] > 最高价))]
-        if len(异常) > 0:
-            print(f"  🚨 {产品}: {len(异常)} 条价格异常")
-            价格异常记录.append(异常)
+    价格异常批次 = []
+    产品类别 = df['产品类别'].to_numpy(dtype=object)
+    未知产品 = ~np.isin(产品类别, list(合理价格范围))
+    for 产品, 产品掩码 in [(产品, 产品类别 == 产品) for 产品 in 合理价格范围] + [('其他类别', 未知产品)]:
+        位置 = np.flatnonzero(掩码['价格异常'] & 产品掩码)
+        if len(位置) > 0:
+            print(f"  🚨 {产品}: {len(位置)} 条价格异常")
+            价格异常批次.append(位置)
     
-    问题记录['价格异常'] = 价格异常记录
+    问题记录['价格异常'] = np.concatenate(价格异常批次) if 价格异常批次 else np.array([], dtype=np.intp)
     
     # 2. 数量异常
     print(f"📦 数量异常检测:")
-    数量异常 = df[df['数量'] > 20]
+    数量异常 = np.flatnonzero(掩码['数量异常'])
     if len(数量异常) > 0:
-        print(f"  🚨 数量异常: {len(数量异常)} 条记录数量>20")
-        问题记录['数量异常'] = [数量异常]
+        print(f"  🚨 数量异常: {len(数量异常)} 条记录数量>{数量上限}")
+        问题记录['数量异常'] = 数量异常
     
     # 3. 销售额计算错误
     print(f"📐 计算准确性检测:")
-    df['计算销售额'] = df['单价'] * df['数量']
-    计算错误 = df[abs(df['销售额'] - df['计算销售额']) > 0.01]
+    计算错误 = np.flatnonzero(掩码['计算错误'])
     if len(计算错误) > 0:
         print(f"  🚨 计算错误: {len(计算错误)} 条记录")
-        问题记录['计算错误'] = [计算错误]
+        问题记录['计算错误'] = 计算错误
     
     # 4. 缺失值检查
     print(f"📭 缺失值检测:")
     缺失列 = []
-    for column in df.columns:
-        缺失数 = df[column].isnull().sum()
+    for column, 缺失数 in 缺失计数.items():
         if 缺失数 > 0:
             print(f"  🚨 {column}: {缺失数} 个空值")
             缺失列.append(column)
@@ -71,77 +80,141 @@ def 识别数据问题(df):
     if 缺失列:
         问题记录['缺失值'] = 缺失列
     
+    # 5. 多条规则命中同一行时只算一次
+    _, 异常行数, 重叠行数 = 异常统计(
+        {规则: 问题记录[规则] for 规则 in ['价格异常', '数量异常', '计算错误'] if 规则 in 问题记录}, len(df)
+    )
+    print(f"🧮 异常记录合计: {异常行数} 条 (其中 {重叠行数} 条命中多条规则)")
+    
     return 问题记录
 
-def 执行数据清洗(df, 问题记录):
-    """执行系统化的数据清洗"""
+# 价格异常的修正区间（与识别用的合理区间不同，修正值取自常见成交价区间）
+价格修正范围 = {
+    '智能手机': (3000, 8000), '笔记本电脑': (5000, 15000),
+    '平板电脑': (2000, 5000), '智能手表': (1000, 3000), '耳机': (200, 1500)
+}
+默认修正范围 = (100, 10000)
+
+class 分区随机数:
+    """按订单月份分别抽取修正价格：每个月份一个独立的随机序列，同一月份内按行的先后顺序抽取
+
+    指定随机种子时整表、分块和按月份并行清洗都使用它：各月份的种子由 SeedSequence(随机种子).spawn
+    按 划分分区 的月份顺序派生，因此同一种子下抽到的修正价格相同，与块大小和进程数无关。
+    """
+
+    def __init__(self, 月份种子, 根种子=None):
+        # 月份种子: {月份: SeedSequence}，订单日期为空的记录月份为 None
+        self.随机数 = {月份: np.random.RandomState(np.random.MT19937(种子)) for 月份, 种子 in 月份种子.items()}
+        self.根种子 = 根种子
+
+    @classmethod
+    def 按月份(cls, 随机种子, 月份列表):
+        根种子 = np.random.SeedSequence(随机种子)
+        return cls(dict(zip(月份列表, 根种子.spawn(len(月份列表)))), 根种子)
+
+    def _月份随机数(self, 月份):
+        if 月份 not in self.随机数:
+            # 不在月份列表中的记录（读取期间新写入的）依次派生新的随机序列
+            self.随机数[月份] = np.random.RandomState(np.random.MT19937(self.根种子.spawn(1)[0]))
+        return self.随机数[月份]
+
+    def 按行抽取(self, 位置, 订单日期, 最低价, 最高价):
+        """为 位置 上的各行抽取修正价格，同一月份的行按位置从小到大（即 rowid 顺序）依次抽取"""
+        代码, 月份取值 = pd.factorize(pd.Series(订单日期, dtype=object).str[:7])
+        修正价格 = np.empty(len(位置))
+        for 编号 in np.unique(代码):
+            行 = np.flatnonzero(代码 == 编号)
+            行 = 行[np.argsort(位置[行], kind='stable')]
+            随机数 = self._月份随机数(月份取值[编号] if 编号 >= 0 else None)
+            修正价格[行] = 随机数.uniform(最低价[行], 最高价[行])
+        return 修正价格
+
+def _修复计算错误(df_clean, 问题记录, 随机数, 填充值):
+    """销售额统一按 单价×数量 重新计算"""
+    df_clean['销售额'] = df_clean['单价'] * df_clean['数量']
+    return f"修复计算错误: {len(问题记录['计算错误'])} 条记录"
+
+def _修正价格异常(df_clean, 问题记录, 随机数, 填充值):
+    """异常价格一次性替换为所属产品修正区间内的随机值"""
+    位置 = 问题记录['价格异常']
+    产品 = df_clean['产品类别'].iloc[位置].astype(object)
+    最低价 = 产品.map({产品名: 区间[0] for 产品名, 区间 in 价格修正范围.items()}).fillna(默认修正范围[0]).to_numpy(dtype=float)
+    最高价 = 产品.map({产品名: 区间[1] for 产品名, 区间 in 价格修正范围.items()}).fillna(默认修正范围[1]).to_numpy(dtype=float)
+
+    if isinstance(随机数, 分区随机数):
+        修正价格 = 随机数.按行抽取(位置, df_clean['订单日期'].to_numpy(dtype=object)[位置], 最低价, 最高价)
+    else:
+        # 按异常出现的顺序整批抽取，与逐行抽取得到的随机序列一致
+        修正价格 = 随机数.uniform(最低价, 最高价)
+
+    数量 = df_clean['数量'].to_numpy()[位置]
+    df_clean.iloc[位置, df_clean.columns.get_loc('单价')] = np.round(修正价格, 2)
+    df_clean.iloc[位置, df_clean.columns.get_loc('销售额')] = np.round(修正价格 * 数量, 2)
+
+    return f"修正价格异常: {len(位置)} 条记录"
+
+def _修正数量异常(df_clean, 问题记录, 随机数, 填充值):
+    """异常数量截断到 1-10，并按修正后的数量重算销售额"""
+    位置 = 问题记录['数量异常']
+    修正数量 = np.clip(df_clean['数量'].to_numpy()[位置], 1, 10)
+
+    df_clean.iloc[位置, df_clean.columns.get_loc('数量')] = 修正数量
+    df_clean.iloc[位置, df_clean.columns.get_loc('销售额')] = df_clean['单价'].to_numpy()[位置] * 修正数量
+
+    return f"修正数量异常: {len(位置)} 条记录"
+
+def _填充缺失值(df_clean, 问题记录, 随机数, 填充值):
+    """区域填"未知区域"，数值列填中位数，其余文本列填众数
+
+    填充值不为 None 时使用预先算好的全局统计量，不再从当前数据计算。
+    """
+    for column in 问题记录['缺失值']:
+        if 填充值 is not None and column in 填充值:
+            df_clean[column] = df_clean[column].fillna(填充值[column])
+        elif column == '区域':
+            df_clean[column] = df_clean[column].fillna('未知区域')
+        elif column in ['单价', '数量', '销售额']:
+            # 数值列用中位数填充
+            df_clean[column] = df_clean[column].fillna(df_clean[column].median())
+        else:
+            # 文本列用众数填充
+            df_clean[column] = df_clean[column].fillna(df_clean[column].mode()[0] if len(df_clean[column].mode()) > 0 else '未知')
+
+    return f"填充缺失值: {len(问题记录['缺失值'])} 个字段"
+
+# 清洗规则按顺序执行: (问题类型, 提示信息, 处理函数)
+清洗规则 = [
+    ('计算错误', "🔧 修复销售额计算错误...", _修复计算错误),  # 优先处理
+    ('价格异常', "🔧 处理价格异常...", _修正价格异常),
+    ('数量异常', "🔧 处理数量异常...", _修正数量异常),
+    ('缺失值', "🔧 处理缺失值...", _填充缺失值),
+]
+
+def 执行数据清洗(df, 问题记录, 随机种子=None, 填充值=None, 原地=False):
+    """执行系统化的数据清洗
+
+    每条规则对所有命中的行做一次列式操作；随机种子为 None 时沿用 numpy 全局随机状态，
+    也可以直接传入 RandomState 或 分区随机数，多次调用共享同一个随机序列。
+    只清洗部分数据时应通过 填充值 传入全量数据的统计量（见 统计填充值）。
+    原地=True 时直接修改传入的 DataFrame，省去一份整表副本。
+    """
     print("\n" + "=" * 50)
     print("🧹 执行数据清洗")
     print("=" * 50)
     
     # 创建清洗后的数据副本
-    df_clean = df.copy()
+    df_clean = df if 原地 else df.copy()
     清洗日志 = []
     原始记录数 = len(df_clean)
+    if isinstance(随机种子, (np.random.RandomState, 分区随机数)):
+        随机数 = 随机种子
+    else:
+        随机数 = np.random.RandomState(随机种子) if 随机种子 is not None else np.random
     
-    # 1. 修复计算错误（优先处理）
-    if '计算错误' in 问题记录:
-        print("🔧 修复销售额计算错误...")
-        df_clean['销售额'] = df_clean['单价'] * df_clean['数量']
-        清洗日志.append(f"修复计算错误: {len(问题记录['计算错误'][0])} 条记录")
-    
-    # 2. 处理价格异常（基于业务规则修正）
-    if '价格异常' in 问题记录:
-        print("🔧 处理价格异常...")
-        修正记录数 = 0
-        
-        for 异常批次 in 问题记录['价格异常']:
-            for _, 异常行 in 异常批次.iterrows():
-                产品 = 异常行['产品类别']
-                合理价格范围 = {
-                    '智能手机': (3000, 8000), '笔记本电脑': (5000, 15000),
-                    '平板电脑': (2000, 5000), '智能手表': (1000, 3000), '耳机': (200, 1500)
-                }
-                
-                合理价格区间 = 合理价格范围.get(产品, (100, 10000))
-                # 将异常价格修正到合理范围内的随机值
-                修正价格 = np.random.uniform(合理价格区间[0], 合理价格区间[1])
-                
-                # 更新数据
-                mask = (df_clean['订单ID'] == 异常行['订单ID'])
-                df_clean.loc[mask, '单价'] = round(修正价格, 2)
-                df_clean.loc[mask, '销售额'] = round(修正价格 * df_clean.loc[mask, '数量'], 2)
-                修正记录数 += 1
-        
-        清洗日志.append(f"修正价格异常: {修正记录数} 条记录")
-    
-    # 3. 处理数量异常
-    if '数量异常' in 问题记录:
-        print("🔧 处理数量异常...")
-        数量异常记录 = 问题记录['数量异常'][0]
-        for _, 异常行 in 数量异常记录.iterrows():
-            # 将异常数量修正为合理值（1-10）
-            修正数量 = min(10, max(1, 异常行['数量']))
-            mask = (df_clean['订单ID'] == 异常行['订单ID'])
-            df_clean.loc[mask, '数量'] = 修正数量
-            df_clean.loc[mask, '销售额'] = df_clean.loc[mask, '单价'] * 修正数量
-        
-        清洗日志.append(f"修正数量异常: {len(数量异常记录)} 条记录")
-    
-    # 4. 处理缺失值
-    if '缺失值' in 问题记录:
-        print("🔧 处理缺失值...")
-        for column in 问题记录['缺失值']:
-            if column == '区域':
-                df_clean[column] = df_clean[column].fillna('未知区域')
-            elif column in ['单价', '数量', '销售额']:
-                # 数值列用中位数填充
-                df_clean[column] = df_clean[column].fillna(df_clean[column].median())
-            else:
-                # 文本列用众数填充
-                df_clean[column] = df_clean[column].fillna(df_clean[column].mode()[0] if len(df_clean[column].mode()) > 0 else '未知')
-        
-        清洗日志.append(f"填充缺失值: {len(问题记录['缺失值'])} 个字段")
+    for 问题类型, 提示, 处理函数 in 清洗规则:
+        if 问题类型 in 问题记录:
+            print(提示)
+            清洗日志.append(处理函数(df_clean, 问题记录, 随机数, 填充值))
     
     # 移除临时列
     if '计算销售额' in df_clean.columns:
@@ -152,8 +225,8 @@ def 执行数据清洗(df, 问题记录):
     
     return df_clean, 清洗日志
 
-def 验证清洗效果(df原始, df清洗后):
-    """验证数据清洗效果"""
+def 验证清洗效果(df原始, df清洗后, 原始掩码=None):
+    """验证数据清洗效果（原始数据已校验过时传入其掩码）"""
     print("\n" + "=" * 50)
     print("✅ 清洗效果验证")
     print("=" * 50)
@@ -168,84 +241,556 @@ def 验证清洗效果(df原始, df清洗后):
     print("\n🎯 数据质量改进:")
     
     # 价格合理性改进
-    合理价格范围 = {
-        '智能手机': (1000, 10000), '笔记本电脑': (3000, 20000),
-        '平板电脑': (1000, 8000), '智能手表': (500, 5000), '耳机': (50, 2000)
-    }
-    
-    原始异常数 = 0
-    清洗后异常数 = 0
-    
-    for 产品, (最低价, 最高价) in 合理价格范围.items():
-        原始异常 = len(df原始[(df原始['产品类别'] == 产品) & ((df原始['单价'] < 最低价) | (df原始['单价'] > 最高价))])
-        清洗后异常 = len(df清洗后[(df清洗后['产品类别'] == 产品) & ((df清洗后['单价'] < 最低价) | (df清洗后['单价'] > 最高价))])
-        
-        原始异常数 += 原始异常
-        清洗后异常数 += 清洗后异常
-        
-        if 原始异常 > 0 or 清洗后异常 > 0:
-            print(f"  {产品}: {原始异常} → {清洗后异常} 条价格异常")
-    
+    if 原始掩码 is None:
+        原始掩码, _ = 执行校验(df原始)
+    清洗后掩码, _ = 执行校验(df清洗后)
+    原始异常 = df原始.loc[原始掩码['价格异常'], '产品类别'].value_counts()
+    清洗后异常 = df清洗后.loc[清洗后掩码['价格异常'], '产品类别'].value_counts()
+    
+    for 产品 in 原始异常.index.union(清洗后异常.index):
+        if 原始异常.get(产品, 0) or 清洗后异常.get(产品, 0):
+            print(f"  {产品}: {原始异常.get(产品, 0)} → {清洗后异常.get(产品, 0)} 条价格异常")
+    
+    原始异常数 = int(原始掩码['价格异常'].sum())
+    清洗后异常数 = int(清洗后掩码['价格异常'].sum())
     print(f"  价格异常减少: {原始异常数} → {清洗后异常数} 条")
     
     # 3. 计算准确性验证
-    df清洗后['验证销售额'] = df清洗后['单价'] * df清洗后['数量']
-    计算错误数 = len(df清洗后[abs(df清洗后['销售额'] - df清洗后['验证销售额']) > 0.01])
+    计算错误数 = int(清洗后掩码['计算错误'].sum())
     print(f"  计算准确性: {计算错误数} 条计算错误")
     
-    df清洗后 = df清洗后.drop('验证销售额', axis=1)
-    
     return 原始异常数, 清洗后异常数, 计算错误数
 
-def 保存清洗数据(df清洗后, 清洗日志):
-    """保存清洗后的数据"""
+def 保存清洗数据(df清洗后, 清洗日志, 原始水位=None):
+    """保存清洗后的数据（全量替换）
+
+    原始水位为读取原始数据前的最大 rowid，记录下来后增量清洗从这里继续。
+    """
     print("\n" + "=" * 50)
     print("💾 保存清洗数据")
     print("=" * 50)
     
-    # 保存到新数据库表
-    数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
-    conn = sqlite3.connect(数据库路径)
-    
-    # 保存清洗后的数据到新表
-    df清洗后.to_sql('产品销售_清洗后', conn, if_exists='replace', index=False)
+    # 保存清洗后的数据到新表（批量写入后替换旧表）
+    conn = sqlite3.connect(数据库路径, isolation_level=None)
+    加载清洗表(conn, [df清洗后], 原始水位)
+    conn.close()
     
     # 保存清洗日志
-    日志路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/reports/数据清洗日志.txt"
-    with open(日志路径, 'w', encoding='utf-8') as f:
-        f.write("=== 数据清洗日志 ===\n")
+    写入清洗日志(清洗日志, len(df清洗后))
+    
+    print(f"✅ 清洗后数据已保存至: {清洗表} 表")
+    print(f"📄 清洗日志已保存至: {日志路径}")
+    print(f"🎯 数据已准备好用于分析!")
+
+日志路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/reports/数据清洗日志.txt"
+
+def 写入清洗日志(清洗日志, 记录数, 模式='全量'):
+    """全量清洗覆盖日志文件，增量清洗追加到日志末尾"""
+    with open(日志路径, 'w' if 模式 == '全量' else 'a', encoding='utf-8') as f:
+        f.write(f"=== 数据清洗日志 ({模式}) ===\n")
         f.write(f"清洗时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"原始记录数: {len(df清洗后)} 条\n\n")
+        f.write(f"{'原始' if 模式 == '全量' else '本次'}记录数: {记录数} 条\n\n")
         f.write("清洗操作:\n")
         for 日志项 in 清洗日志:
             f.write(f"  ✅ {日志项}\n")
+
+# 增量清洗的水位表和变更队列
+水位表 = "清洗水位"
+# 缺失时用中位数填充的数值列，以及两遍清洗时存放修正后数值的临时表
+数值列 = ['单价', '数量', '销售额']
+修正值表 = "修正后数值"
+变更队列表 = "清洗变更队列"
+
+def 准备增量清洗(conn):
+    """创建水位表、变更队列以及记录原始表修改和删除的触发器（已存在时不做改动）
+
+    新增订单由 rowid 水位发现；原地修改和删除的订单ID由触发器写入变更队列。
+    删除当前最大 rowid 的记录时把水位回退，避免新记录复用该 rowid 后被漏掉。
+    """
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {水位表} (
+            源表 TEXT PRIMARY KEY,
+            最大行号 INTEGER NOT NULL,
+            更新时间 TEXT
+        );
+        CREATE TABLE IF NOT EXISTS {变更队列表} (订单ID TEXT PRIMARY KEY);
+
+        CREATE TRIGGER IF NOT EXISTS trg_{原始表}_修改 AFTER UPDATE ON {原始表}
+        BEGIN
+            INSERT OR IGNORE INTO {变更队列表} VALUES (OLD.订单ID);
+            INSERT OR IGNORE INTO {变更队列表} VALUES (NEW.订单ID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{原始表}_删除 AFTER DELETE ON {原始表}
+        BEGIN
+            INSERT OR IGNORE INTO {变更队列表} VALUES (OLD.订单ID);
+            UPDATE {水位表} SET 最大行号 = OLD.rowid - 1
+            WHERE 源表 = '{原始表}' AND 最大行号 >= OLD.rowid
+              AND NOT EXISTS (SELECT 1 FROM {原始表} WHERE rowid > OLD.rowid);
+        END;
+    """)
+    # 原地修改和删除同时使原始表的聚合缓存失效
+    创建版本触发器(conn, 原始表)
+
+def 当前原始水位(conn):
+    """原始表当前的最大 rowid"""
+    return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {原始表}").fetchone()[0]
+
+def _读取水位(conn):
+    行 = conn.execute(f"SELECT 最大行号 FROM {水位表} WHERE 源表 = ?", [原始表]).fetchone()
+    return 行[0] if 行 else 0
+
+def _更新水位(conn, 水位):
+    conn.execute(
+        f"INSERT OR REPLACE INTO {水位表} VALUES (?, ?, ?)",
+        [原始表, 水位, datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+    )
+
+def 统计填充值(conn, 列名列表, 源表=原始表, 已修正=False):
+    """用SQL计算缺失值的全局填充值，与 _填充缺失值 的规则一致
+
+    数值列取中位数，其余文本列取众数（次数相同时取最小值，与 pandas 的 mode() 相同）。
+    源表为原始表时销售额按 单价×数量 计算（与先修复计算错误再填充的顺序一致），
+    单价、数量则是修正价格和数量异常之前的原始值（增量清洗使用，与整表清洗略有不同）；
+    已修正=True 表示源表中已是修正之后的数值（见 统计修正后填充值），直接取各列。
+    """
+    填充值 = {}
+    for 列名 in 列名列表:
+        if 列名 == '区域':
+            填充值[列名] = '未知区域'
+        elif 列名 in 数值列:
+            表达式 = '单价 * 数量' if 列名 == '销售额' and not 已修正 else 列名
+            中间值 = conn.execute(f"""
+                SELECT {表达式} AS 值 FROM {源表} WHERE 值 IS NOT NULL ORDER BY 值
+                LIMIT 2 - (SELECT COUNT({表达式}) FROM {源表}) % 2
+                OFFSET (SELECT (COUNT({表达式}) - 1) / 2 FROM {源表})
+            """).fetchall()
+            if 中间值:
+                填充值[列名] = sum(行[0] for 行 in 中间值) / len(中间值)
+        else:
+            行 = conn.execute(f"""
+                SELECT {列名} FROM {源表} WHERE {列名} IS NOT NULL
+                GROUP BY {列名} ORDER BY COUNT(*) DESC, {列名} LIMIT 1
+            """).fetchone()
+            填充值[列名] = 行[0] if 行 else '未知'
+    return 填充值
+
+def 修正数值(块, 随机数):
+    """静默地修正一块数据的计算错误、价格和数量异常（不填充缺失值），返回修正后的数值列"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        问题记录 = 识别数据问题(块)
+        问题记录.pop('缺失值', None)
+        块, _ = 执行数据清洗(块, 问题记录, 随机数, 原地=True)
+    return 块[数值列]
+
+def 统计修正后填充值(conn, 缺失列, 修正后数值块):
+    """两遍清洗的第一遍：由各块修正之后的数值列统计填充值，与整表清洗先修正再填充的规则一致
+
+    修正后数值块是返回 修正数值 结果序列的函数，只在有数值列缺失时才调用（没有时不做第一遍），
+    逐块写入临时表后用SQL求中位数，内存占用仍由块大小决定。
+    文本列不受异常修正影响，直接在原始表上统计。
+    """
+    填充值 = 统计填充值(conn, [列名 for 列名 in 缺失列 if 列名 not in 数值列])
+    待统计 = [列名 for 列名 in 缺失列 if 列名 in 数值列]
+    if not 待统计:
+        return 填充值
+
+    conn.execute(f"CREATE TEMP TABLE {修正值表} ({', '.join(f'{列名} REAL' for 列名 in 数值列)})")
+    try:
+        for 块 in 修正后数值块():
+            # NaN 写入 SQLite 后为 NULL，与原始表中的空值一样不参与中位数
+            conn.executemany(
+                f"INSERT INTO {修正值表} VALUES ({', '.join('?' * len(数值列))})",
+                块.astype(float).itertuples(index=False, name=None)
+            )
+        填充值.update(统计填充值(conn, 待统计, 修正值表, 已修正=True))
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS temp.{修正值表}")
+    return 填充值
+
+def 增量清洗(随机种子=None):
+    """只清洗水位之后新增的以及变更队列中的原始记录，并在一个事务内写入清洗表"""
+    print("🔄 增量清洗模式")
+    conn = sqlite3.connect(数据库路径, isolation_level=None)
+    准备增量清洗(conn)
+    
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [清洗表]).fetchone():
+        conn.close()
+        print(f"❌ 尚未生成 {清洗表} 表，请先执行一次全量清洗")
+        return None
+    设置写入参数(conn)
+    创建清洗表索引(conn)
+    
+    # 写锁保证读取、清洗和写入看到的是同一份原始数据
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        水位 = _读取水位(conn)
+        新水位 = 当前原始水位(conn)
+        变更订单 = [行[0] for 行 in conn.execute(f"SELECT 订单ID FROM {变更队列表}")]
+        df原始 = pd.read_sql(f"""
+            SELECT * FROM {原始表} WHERE rowid > ?
+            UNION
+            SELECT * FROM {原始表} WHERE 订单ID IN (SELECT 订单ID FROM {变更队列表})
+        """, conn, params=[水位])
+        print(f"✅ 水位 {水位} → {新水位}: 新增或变更 {len(df原始)} 条，变更队列 {len(变更订单)} 条")
+        
+        清洗日志 = []
+        if len(df原始):
+            问题记录 = 识别数据问题(df原始)
+            填充值 = 统计填充值(conn, 问题记录['缺失值']) if '缺失值' in 问题记录 else None
+            df清洗后, 清洗日志 = 执行数据清洗(df原始, 问题记录, 随机种子, 填充值)
+        
+        # 先删除涉及的订单（包括已在原始表中删除的），再插入清洗结果
+        删除订单 = set(变更订单) | set(df原始['订单ID'])
+        删除数 = conn.executemany(
+            f"DELETE FROM {清洗表} WHERE 订单ID = ?", [(订单ID,) for 订单ID in 删除订单]
+        ).rowcount
+        if len(df原始):
+            print(f"⚡ 写入 {写入速度(*批量写入(conn, df清洗后))}")
+        
+        _更新水位(conn, 新水位)
+        conn.execute(f"DELETE FROM {变更队列表}")
+        # 只有新增订单时不递增版本号，日摘要等缓存可以只合并新增的记录
+        if 删除数 > 0:
+            递增表版本(conn, 清洗表)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    
+    if len(df原始):
+        写入清洗日志(清洗日志, len(df原始), 模式='增量')
+    print(f"✅ 增量写入 {len(df原始)} 条，删除 {len(删除订单) - len(df原始)} 条已不存在的订单")
+    return len(df原始)
+
+def 统计缺失列(conn, 源表=原始表):
+    """一次扫描统计原始表中含空值的字段"""
+    列名列表 = [行[1] for 行 in conn.execute(f"PRAGMA table_info({源表})")]
+    缺失数 = conn.execute(
+        f"SELECT {', '.join(f'SUM({列名} IS NULL)' for 列名 in 列名列表)} FROM {源表}"
+    ).fetchone()
+    return [列名 for 列名, 数量 in zip(列名列表, 缺失数) if 数量]
+
+def 合并清洗日志(各块日志, 缺失列=None):
+    """把各数据块的清洗日志按操作合并，记录数求和
+
+    填充字段数不能按块相加，传入全局的缺失列时据此重写该项。
+    """
+    合计 = {}
+    for 日志 in 各块日志:
+        for 日志项 in 日志:
+            操作, 数量, 单位 = re.match(r"(.+?): (\d+) (.+)", 日志项).groups()
+            合计.setdefault(操作, [0, 单位])[0] += int(数量)
+    if 缺失列 is not None and '填充缺失值' in 合计:
+        合计['填充缺失值'][0] = len(缺失列)
+    return [f"{操作}: {数量} {单位}" for 操作, (数量, 单位) in 合计.items()]
+
+def 估算块大小(conn, 内存上限MB, 源表=原始表, 放大系数=4):
+    """按样本行的实际内存占用估算每块行数
+
+    清洗一块数据时同时存在原始块、异常切片、校验掩码和待写入数据，按放大系数预留空间。
+    """
+    样本 = pd.read_sql(f"SELECT * FROM {源表} LIMIT 1000", conn)
+    if not len(样本):
+        return 1000
+    每行字节 = 样本.memory_usage(deep=True, index=False).sum() / len(样本)
+    return max(1000, int(内存上限MB * 1024 * 1024 / (每行字节 * 放大系数)))
+
+def 分块读取原始数据(conn, 块大小, 最大行号, 源表=原始表):
+    """按 rowid 键集分页逐块读取原始记录，每块最多 块大小 行"""
+    上一行号 = 0
+    while True:
+        块 = pd.read_sql(
+            f"SELECT rowid AS _行号, * FROM {源表} WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?",
+            conn, params=[上一行号, 最大行号, 块大小]
+        )
+        if not len(块):
+            return
+        上一行号 = int(块['_行号'].iloc[-1])
+        yield 块.drop(columns='_行号')
+
+def 分块清洗(随机种子=None, 内存上限MB=512):
+    """不把整表读入内存的全量清洗：逐块读取、清洗、校验并写入新表，最后替换清洗表
+
+    第一遍统计缺失字段和填充值：有数值列缺失时逐块修正异常（不填充），
+    由修正后的数值求中位数，与整表清洗一致；第二遍逐块处理，内存占用由块大小决定。
+    两遍从同一个随机状态开始，抽到的修正价格相同。指定随机种子时按订单月份抽取（见 分区随机数），
+    各月份的随机序列跨块延续，结果与同一种子的整表清洗相同，与块大小无关。
+    """
+    print(f"🧱 分块清洗模式 (内存上限 {内存上限MB} MB)")
+    conn = sqlite3.connect(数据库路径, isolation_level=None)
+    
+    # 1. 第一遍：全局统计量（第二遍重新创建随机数或恢复全局随机状态，抽到同样的修正价格）
+    原始水位 = 当前原始水位(conn)
+    缺失列 = 统计缺失列(conn)
+    块大小 = 估算块大小(conn, 内存上限MB)
+    月份列表 = 订单月份(conn, 原始水位)
+    def 创建随机数():
+        return 分区随机数.按月份(随机种子, 月份列表) if 随机种子 is not None else None
+    
+    第一遍随机数 = 创建随机数()
+    随机状态 = np.random.get_state()
+    填充值 = 统计修正后填充值(conn, 缺失列, lambda: (
+        修正数值(块, 第一遍随机数) for 块 in 分块读取原始数据(conn, 块大小, 原始水位)
+    ))
+    np.random.set_state(随机状态)
+    随机数 = 创建随机数()
+    print(f"📊 缺失字段: {缺失列 or '无'}，每块 {块大小} 行")
+    
+    # 2. 第二遍：逐块清洗，在同一个事务内写入并替换清洗表
+    各块日志 = []
+    各块统计 = []
+    
+    def 清洗后数据块():
+        记录数 = 0
+        for 序号, 块 in enumerate(分块读取原始数据(conn, 块大小, 原始水位), start=1):
+            块, 清洗日志, 异常统计 = 清洗并校验(块, 随机数, 填充值)
+            各块日志.append(清洗日志)
+            各块统计.append(异常统计)
+            记录数 += len(块)
+            print(f"  ✅ 第 {序号} 块: {len(块)} 条，累计 {记录数} 条")
+            yield 块
+    
+    记录数 = 加载清洗表(conn, 清洗后数据块(), 原始水位)
+    conn.close()
+    
+    清洗日志 = 合并清洗日志(各块日志, 缺失列)
+    写入清洗日志(清洗日志, 记录数)
+    汇报异常统计(各块统计, 记录数)
+    return 记录数, 清洗日志
+
+def 清洗并校验(块, 随机数, 填充值):
+    """静默地清洗一块原始数据（原地修改），返回 (清洗后数据, 清洗日志, 清洗前后的异常计数)"""
+    原始掩码, 缺失计数 = 执行校验(块)
+    异常统计 = {'原始价格异常': int(原始掩码['价格异常'].sum())}
+    with contextlib.redirect_stdout(io.StringIO()):
+        问题记录 = 识别数据问题(块, (原始掩码, 缺失计数))
+        块, 清洗日志 = 执行数据清洗(块, 问题记录, 随机数, 填充值, 原地=True)
+    
+    清洗后掩码, _ = 执行校验(块)
+    异常统计['清洗后价格异常'] = int(清洗后掩码['价格异常'].sum())
+    异常统计['计算错误'] = int(清洗后掩码['计算错误'].sum())
+    return 块, 清洗日志, 异常统计
+
+def 汇报异常统计(各块统计, 记录数):
+    """汇总各块的清洗前后异常计数并输出"""
+    合计 = pd.DataFrame(各块统计).sum() if 各块统计 else pd.Series(0, index=['原始价格异常', '清洗后价格异常', '计算错误'])
+    print(f"🎯 价格异常 {合计['原始价格异常']} → {合计['清洗后价格异常']} 条，计算错误 {合计['计算错误']} 条")
+    print(f"✅ 清洗后数据已保存至: {清洗表} 表 ({记录数} 条)")
+
+def 加载清洗表(conn, 数据块, 原始水位=None):
+    """在一个事务内把数据块批量写入临时表、建索引并替换清洗表，返回写入行数
+
+    conn 需以 isolation_level=None 打开，由这里显式控制事务；
+    数据块可以是生成器，读取和清洗也在这个事务内逐块进行。
+    """
+    if 原始水位 is not None:
+        准备增量清洗(conn)
+    设置写入参数(conn)
+    临时表 = f"{清洗表}_新"
+    
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        创建清洗表(conn, 临时表)
+        总行数 = 总耗时 = 0
+        for 块 in 数据块:
+            行数, 耗时 = 批量写入(conn, 块, 临时表)
+            总行数 += 行数
+            总耗时 += 耗时
+        
+        # 数据写完后再建索引（索引名全局唯一，需先删除旧表）
+        开始 = time.perf_counter()
+        conn.execute(f"DROP TABLE IF EXISTS {清洗表}")
+        conn.execute(f"ALTER TABLE {临时表} RENAME TO {清洗表}")
+        创建清洗表索引(conn)
+        # 新表上没有旧表的触发器，在同一个事务内重新创建
+        创建版本触发器(conn, 清洗表)
+        建索引耗时 = time.perf_counter() - 开始
+        
+        if 原始水位 is not None:
+            _更新水位(conn, 原始水位)
+            conn.execute(f"DELETE FROM {变更队列表}")
+        # 清洗表整体替换，基于它的聚合缓存随之失效
+        递增表版本(conn, 清洗表)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    
+    print(f"⚡ 写入 {写入速度(总行数, 总耗时)}，建索引 {建索引耗时:.2f} 秒")
+    return 总行数
+
+def 订单月份(conn, 最大行号):
+    """不超过最大行号的原始记录涉及的订单月份（订单日期为空时为 None，排在最前）"""
+    return [行[0] for 行 in conn.execute(
+        f"SELECT DISTINCT substr(订单日期, 1, 7) FROM {原始表} WHERE rowid <= ? ORDER BY 1", [最大行号]
+    )]
+
+def 划分分区(conn, 方式, 最大行号, 分区行数=100000):
+    """把不超过最大行号的原始记录划分为互不重叠的分区，返回 [(分区名, WHERE子句, 参数)]
+
+    - 月份: 每个订单月份一个分区（订单日期为空的记录单独一个分区）
+    - 行号: 每 分区行数 个 rowid 一个连续区间，不依赖任何二级索引
+    分区只取决于数据本身，与进程数无关，这样各分区的随机序列在不同进程数下保持一致。
+    """
+    if 方式 == '月份':
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{原始表}_订单日期 ON {原始表} (订单日期)")
+        分区 = []
+        for 月份 in 订单月份(conn, 最大行号):
+            if 月份 is None:
+                分区.append(('无日期', "订单日期 IS NULL AND rowid <= ?", [最大行号]))
+            else:
+                下月 = (pd.Period(月份, 'M') + 1).strftime('%Y-%m')
+                分区.append((月份, "订单日期 >= ? AND 订单日期 < ? AND rowid <= ?", [月份, 下月, 最大行号]))
+        return 分区
+    
+    return [
+        (f"{起点 + 1}-{min(起点 + 分区行数, 最大行号)}", "rowid > ? AND rowid <= ?",
+         [起点, min(起点 + 分区行数, 最大行号)])
+        for 起点 in range(0, 最大行号, 分区行数)
+    ]
+
+def _读取分区(数据库路径, 条件, 参数, 种子序列, 月份):
+    """读取一个分区，并由该分区的种子序列创建专属的随机数（每次调用得到相同的随机序列）
+
+    按月份分区时使用只含该月份的 分区随机数，与整表清洗中这个月份的随机序列相同。
+    """
+    conn = sqlite3.connect(数据库路径)
+    df = pd.read_sql(f"SELECT * FROM {原始表} WHERE {条件} ORDER BY rowid", conn, params=参数)
+    conn.close()
+    if 月份 is not False:
+        return df, 分区随机数({月份: 种子序列})
+    return df, np.random.RandomState(np.random.MT19937(种子序列))
+
+def _修正分区数值(数据库路径, 条件, 参数, 种子序列, 月份):
+    """进程池中执行：第一遍，返回一个分区修正异常之后的数值列"""
+    return 修正数值(*_读取分区(数据库路径, 条件, 参数, 种子序列, 月份))
+
+def _清洗分区(数据库路径, 条件, 参数, 种子序列, 月份, 填充值):
+    """进程池中执行：读取一个分区并用该分区专属的随机序列清洗"""
+    df, 随机数 = _读取分区(数据库路径, 条件, 参数, 种子序列, 月份)
+    return 清洗并校验(df, 随机数, 填充值)
+
+def 并行清洗(随机种子=None, 进程数=None, 分区方式='月份'):
+    """按分区在多进程中清洗，结果按分区顺序合并写入清洗表
+
+    每个分区的随机序列由 SeedSequence(随机种子).spawn 派生，只取决于种子和分区顺序，
+    因此同一种子下任意进程数（包括 进程数=1 的串行执行）得到完全相同的结果。
+    数值列的缺失值按各分区修正异常之后的数值统计中位数（第一遍，同样并行）。
+    按月份分区时各月份的随机序列与同一种子的整表清洗相同（见 分区随机数），结果与整表清洗一致；
+    按行号分区时一个月份可能跨多个分区，修正价格不一定与整表清洗相同。
+    """
+    进程数 = 进程数 or os.cpu_count()
+    print(f"⚡ 并行清洗模式 ({进程数} 个进程，按{分区方式}分区)")
+    conn = sqlite3.connect(数据库路径, isolation_level=None)
+    设置写入参数(conn)  # WAL 模式下写事务期间各进程仍可读取
+    
+    # 1. 分区和全局统计量
+    原始水位 = 当前原始水位(conn)
+    缺失列 = 统计缺失列(conn)
+    分区 = 划分分区(conn, 分区方式, 原始水位)
+    
+    if 随机种子 is None:
+        随机种子 = np.random.SeedSequence().entropy
+        print(f"🎲 未指定随机种子，本次使用: {随机种子}")
+    种子序列 = np.random.SeedSequence(随机种子).spawn(len(分区))
+    # 按月份分区时把月份（订单日期为空时为 None）交给分区随机数；按行号分区时为 False
+    分区参数 = [
+        (数据库路径, 条件, 参数, 种子, (None if 分区名 == '无日期' else 分区名) if 分区方式 == '月份' else False)
+        for (分区名, 条件, 参数), 种子 in zip(分区, 种子序列)
+    ]
+    
+    进程池 = ProcessPoolExecutor(max_workers=进程数) if 进程数 > 1 else None
+    def 分区执行(函数, 任务参数):
+        if 进程池 is not None:
+            return 进程池.map(函数, *zip(*任务参数))
+        return (函数(*任务) for 任务 in 任务参数)
     
+    try:
+        # 传入函数而不是结果：进程池的 map 会立即提交全部任务，没有数值列缺失时不应执行第一遍
+        填充值 = 统计修正后填充值(conn, 缺失列, lambda: 分区执行(_修正分区数值, 分区参数))
+    except Exception:
+        if 进程池 is not None:
+            进程池.shutdown()
+        raise
+    print(f"📊 缺失字段: {缺失列 or '无'}，共 {len(分区)} 个分区")
+    
+    # 2. 分区清洗，按分区顺序取回结果，在同一个事务内写入并替换清洗表
+    结果 = 分区执行(_清洗分区, [任务 + (填充值,) for 任务 in 分区参数])
+    
+    各分区日志 = []
+    各分区统计 = []
+    
+    def 清洗后数据块():
+        for (分区名, _, _), (df, 清洗日志, 异常统计) in zip(分区, 结果):
+            各分区日志.append(清洗日志)
+            各分区统计.append(异常统计)
+            print(f"  ✅ 分区 {分区名}: {len(df)} 条")
+            yield df
+    
+    try:
+        记录数 = 加载清洗表(conn, 清洗后数据块(), 原始水位)
+    finally:
+        if 进程池 is not None:
+            进程池.shutdown()
     conn.close()
     
-    print(f"✅ 清洗后数据已保存至: 产品销售_清洗后 表")
-    print(f"📄 清洗日志已保存至: {日志路径}")
-    print(f"🎯 数据已准备好用于分析!")
+    清洗日志 = 合并清洗日志(各分区日志, 缺失列)
+    写入清洗日志(清洗日志, 记录数)
+    汇报异常统计(各分区统计, 记录数)
+    return 记录数, 清洗日志
+
+def 全量清洗(随机种子=None):
+    """读取全部原始数据，清洗、验证后整表替换清洗表
+
+    指定随机种子时按订单月份分别抽取修正价格（见 分区随机数），与同一种子的分块清洗和按月份并行清洗结果相同。
+    """
+    # 1. 获取原始数据（先记录水位，之后新增的记录留给下一次增量清洗）
+    conn = sqlite3.connect(数据库路径)
+    原始水位 = 当前原始水位(conn)
+    随机数 = 分区随机数.按月份(随机种子, 订单月份(conn, 原始水位)) if 随机种子 is not None else None
+    conn.close()
+    df原始 = 获取原始数据()
+    
+    # 2. 识别数据问题（原始数据只校验一次，验证阶段复用）
+    校验结果 = 执行校验(df原始)
+    问题记录 = 识别数据问题(df原始, 校验结果)
+    
+    # 3. 执行清洗
+    df清洗后, 清洗日志 = 执行数据清洗(df原始, 问题记录, 随机数)
+    
+    # 4. 验证效果
+    验证清洗效果(df原始, df清洗后, 校验结果[0])
+    
+    # 5. 保存结果
+    保存清洗数据(df清洗后, 清洗日志, 原始水位)
 
 # 执行数据清洗
-if __name__ == "__main__":
+def 主要(参数列表=None):
+    """命令行入口（也由 cli.py 调用）"""
+    parser = argparse.ArgumentParser(description="销售数据清洗")
+    parser.add_argument('--incremental', action='store_true', help="只清洗上次运行之后新增或变更的记录")
+    parser.add_argument('--chunked', action='store_true', help="分块读取和写入，适用于无法整表放入内存的数据")
+    parser.add_argument('--memory-limit', type=int, default=512, help="分块模式的内存上限 (MB)")
+    parser.add_argument('--workers', type=int, default=None, help="按分区并行清洗使用的进程数")
+    parser.add_argument('--partition', choices=['月份', '行号'], default='月份', help="并行清洗的分区方式")
+    parser.add_argument('--seed', type=int, default=None, help="价格修正使用的随机种子")
+    参数 = parser.parse_args(参数列表)
+    
     print("🎯 开始第二步: 数据清洗")
     print("=" * 50)
     
     try:
-        # 1. 获取原始数据
-        df原始 = 获取原始数据()
-        
-        # 2. 识别数据问题
-        问题记录 = 识别数据问题(df原始)
-        
-        # 3. 执行清洗
-        df清洗后, 清洗日志 = 执行数据清洗(df原始, 问题记录)
-        
-        # 4. 验证效果
-        原始异常数, 清洗后异常数, 计算错误数 = 验证清洗效果(df原始, df清洗后)
-        
-        # 5. 保存结果
-        保存清洗数据(df清洗后, 清洗日志)
+        if 参数.incremental:
+            增量清洗(参数.seed)
+        elif 参数.workers:
+            并行清洗(参数.seed, 参数.workers, 参数.partition)
+        elif 参数.chunked:
+            分块清洗(参数.seed, 参数.memory_limit)
+        else:
+            全量清洗(参数.seed)
         
         print("\n" + "=" * 50)
         print("🎉 数据清洗完成!")
@@ -256,4 +801,7 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"❌ 数据清洗过程中出错: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    主要()
@@ -1,13 +1,23 @@
 # sales_dashboard/analysis/data_review.py
 import sqlite3
+import argparse
 import pandas as pd
 import os
 import numpy as np
 from datetime import datetime
 
+from validation_rules import 数量上限, 执行校验, 异常统计
+from quality_stats import 计数指标, 汇总评分, 更新质量统计, 区间质量评分, 评分趋势
+from aggregate_store import 聚合存储, 分组汇总
+
+数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
+原始表 = "产品销售"
+
+# 销售模式审查的度量（区域只看销售额和订单数）
+模式度量 = (('销售额', 'sum'), ('销售额', 'mean'), ('订单ID', 'count'), ('单价', 'mean'))
+
 def 获取数据():
     """连接数据库并获取销售数据"""
-    数据库路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard/data/sales.db"
     conn = sqlite3.connect(数据库路径)
     
     # 读取所有销售数据
@@ -17,63 +27,36 @@ def 获取数据():
     print(f"✅ 成功读取 {len(df)} 条销售记录")
     return df
 
-def 计算数据质量评分(df, 异常记录):
-    """基于多维度指标计算真实的数据质量分数"""
+def 计算数据质量评分(df, 异常记录, 校验结果=None):
+    """基于多维度指标计算真实的数据质量分数（与按天累加的质量统计使用同一套计数和公式）"""
     
-    评分维度 = {}
+    计数 = 计数指标(df, 校验结果)
+    综合分数, 评分维度 = 汇总评分(计数)
     
-    # 1. 完整性评分 (权重30%)
-    完整性分数 = 0
-    for column in df.columns:
-        缺失比例 = df[column].isnull().sum() / len(df)
-        列完整性 = (1 - 缺失比例) * 100
-        完整性分数 += 列完整性
-    
-    完整性分数 = 完整性分数 / len(df.columns)
-    评分维度['完整性'] = 完整性分数
-    print(f"📊 完整性评分: {完整性分数:.1f}%")
-    
-    # 2. 准确性评分 (权重40%)
-    # 检查销售额计算准确性
-    计算销售额 = df['单价'] * df['数量']
-    计算准确率 = (abs(df['销售额'] - 计算销售额) < 0.01).mean() * 100
-    评分维度['计算准确性'] = 计算准确率
-    print(f"📐 计算准确性: {计算准确率:.1f}%")
-    
-    # 3. 合理性评分 (权重30%)
-    # 基于业务规则的价格合理性
-    合理价格范围 = {
-        '智能手机': (1000, 10000),
-        '笔记本电脑': (3000, 20000), 
-        '平板电脑': (1000, 8000),
-        '智能手表': (500, 5000),
-        '耳机': (50, 2000)
-    }
-    
-    合理记录数 = 0
-    for 产品, (最低价, 最高价) in 合理价格范围.items():
-        产品数据 = df[df['产品类别'] == 产品]
-        合理记录 = 产品数据[(产品数据['单价'] >= 最低价) & (产品数据['单价'] <= 最高价)]
-        合理记录数 += len(合理记录)
-    
-    合理性分数 = (合理记录数 / len(df)) * 100
-    评分维度['合理性'] = 合理性分数
-    print(f"🎯 价格合理性: {合理性分数:.1f}%")
-    
-    # 4. 唯一性评分 (额外检查)
-    重复记录 = df.duplicated(subset=['订单ID']).sum()
-    唯一性分数 = (1 - 重复记录 / len(df)) * 100
-    评分维度['唯一性'] = 唯一性分数
-    print(f"🔍 唯一性评分: {唯一性分数:.1f}% (重复记录: {重复记录}条)")
-    
-    # 5. 综合评分 (加权平均)
-    权重配置 = {'完整性': 0.25, '计算准确性': 0.35, '合理性': 0.30, '唯一性': 0.10}
-    综合分数 = sum(评分维度[维度] * 权重配置[维度] for 维度 in 评分维度)
+    print(f"📊 完整性评分: {评分维度['完整性']:.1f}%")
+    print(f"📐 计算准确性: {评分维度['计算准确性']:.1f}%")
+    print(f"🎯 价格合理性: {评分维度['合理性']:.1f}%")
+    print(f"🔍 唯一性评分: {评分维度['唯一性']:.1f}% (重复记录: {计数['重复订单']}条)")
     
     print(f"\n⭐ 综合数据质量评分: {综合分数:.1f}%")
     
     return 综合分数, 评分维度
 
+def 质量趋势审查(粒度='M'):
+    """增量更新按天的质量统计（只扫描有变化的日期），输出总体评分和评分趋势"""
+    print(f"\n📈 数据质量趋势:")
+    conn = sqlite3.connect(数据库路径)
+    变化日期 = 更新质量统计(conn, 原始表)
+    综合分数, _ = 区间质量评分(conn, 原始表)
+    趋势 = 评分趋势(conn, 原始表, 粒度)
+    conn.close()
+    
+    print(f"🔄 本次重新扫描 {len(变化日期)} 天的数据")
+    print(f"⭐ 按天累加的综合评分: {综合分数:.1f}%")
+    print(趋势.round(1))
+    
+    return 综合分数, 趋势
+
 def 基础数据审查(df):
     """执行基础的数据质量审查"""
     print("=" * 50)
@@ -94,64 +77,56 @@ def 基础数据审查(df):
     
     return df
 
-def 业务逻辑审查(df):
-    """基于业务逻辑的数据审查"""
+def 业务逻辑审查(df, 校验结果=None):
+    """基于业务逻辑的数据审查，异常记录为 {规则名: 行位置数组}（不复制数据行）"""
     print(f"\n🔍 业务逻辑审查:")
+    掩码, _ = 校验结果 if 校验结果 is not None else 执行校验(df)
+    异常记录 = {}
     
     # 1. 价格合理性检查
     print(f"💰 价格范围审查:")
-    异常记录列表 = []
+    产品类别 = df['产品类别'].to_numpy(dtype=object)
     
     for 产品 in df['产品类别'].unique():
-        价格数据 = df[df['产品类别'] == 产品]['单价']
-        产品数量 = len(价格数据)
+        产品掩码 = 产品类别 == 产品
+        产品数量 = int(产品掩码.sum())
+        异常数 = int(np.count_nonzero(产品掩码 & 掩码['价格异常']))
         
-        # 定义合理价格范围
-        合理价格范围 = {
-            '智能手机': (1000, 10000),
-            '笔记本电脑': (3000, 20000), 
-            '平板电脑': (1000, 8000),
-            '智能手表': (500, 5000),
-            '耳机': (50, 2000)
-        }
-        
-        最低价, 最高价 = 合理价格范围.get(产品, (0, 100000))
-        价格异常 = df[(df['产品类别'] == 产品) & ((df['单价'] < 最低价) | (df['单价'] > 最高价))]
-        
-        if len(价格异常) > 0:
-            print(f"  🚨 {产品}: {len(价格异常)}/{产品数量} 条价格异常记录")
-            异常记录列表.append(价格异常)
+        if 异常数 > 0:
+            print(f"  🚨 {产品}: {异常数}/{产品数量} 条价格异常记录")
         else:
             print(f"  ✅ {产品}: 价格全部合理")
     
+    if 掩码['价格异常'].any():
+        异常记录['价格异常'] = np.flatnonzero(掩码['价格异常'])
+    
     # 2. 销售额计算验证
-    df['计算销售额'] = df['单价'] * df['数量']
-    计算错误 = df[abs(df['销售额'] - df['计算销售额']) > 0.01]
-    if len(计算错误) > 0:
-        print(f"🚨 销售额计算错误: {len(计算错误)} 条记录")
-        异常记录列表.append(计算错误)
+    if 掩码['计算错误'].any():
+        异常记录['计算错误'] = np.flatnonzero(掩码['计算错误'])
+        print(f"🚨 销售额计算错误: {len(异常记录['计算错误'])} 条记录")
     else:
         print(f"✅ 销售额计算: 全部正确")
     
     # 3. 数量合理性检查
-    数量异常 = df[df['数量'] > 20]  # 单笔订单数量不应超过20
-    if len(数量异常) > 0:
-        print(f"🚨 数量异常: {len(数量异常)} 条记录数量>20")
-        异常记录列表.append(数量异常)
+    if 掩码['数量异常'].any():
+        异常记录['数量异常'] = np.flatnonzero(掩码['数量异常'])
+        print(f"🚨 数量异常: {len(异常记录['数量异常'])} 条记录数量>{数量上限}")
     
-    return df, 异常记录列表
+    return df, 异常记录
 
-def 销售模式审查(df):
+def 模式汇总(df, 维度, 度量, 存储=None):
+    """按维度分组汇总原始数据，传入聚合存储时从缓存读取"""
+    if 存储 is not None:
+        return 存储.分组汇总(原始表, [维度], 度量).round(2)
+    return 分组汇总(df, [维度], 度量).round(2)
+
+def 销售模式审查(df, 存储=None):
     """审查销售业务模式"""
     print(f"\n📈 销售模式分析:")
     
     # 1. 销售员业绩分布
     print(f"👥 销售员业绩排名 (前5):")
-    销售员业绩 = df.groupby('销售员姓名').agg({
-        '销售额': ['sum', 'mean'],
-        '订单ID': 'count',
-        '单价': 'mean'
-    }).round(2)
+    销售员业绩 = 模式汇总(df, '销售员姓名', 模式度量, 存储)
     
     # 重命名列
     销售员业绩.columns = ['总销售额', '平均订单额', '订单数', '平均单价']
@@ -161,10 +136,7 @@ def 销售模式审查(df):
     
     # 2. 区域销售分析
     print(f"\n🌍 区域销售分析:")
-    区域业绩 = df.groupby('区域').agg({
-        '销售额': ['sum', 'mean'],
-        '订单ID': 'count'
-    }).round(2)
+    区域业绩 = 模式汇总(df, '区域', 模式度量[:3], 存储)
     
     区域业绩.columns = ['区域总销售额', '区域平均订单额', '订单数']
     区域业绩 = 区域业绩.sort_values('区域总销售额', ascending=False)
@@ -173,11 +145,7 @@ def 销售模式审查(df):
     
     # 3. 产品表现
     print(f"\n📦 产品类别表现:")
-    产品业绩 = df.groupby('产品类别').agg({
-        '销售额': ['sum', 'mean'], 
-        '订单ID': 'count',
-        '单价': 'mean'
-    }).round(2)
+    产品业绩 = 模式汇总(df, '产品类别', 模式度量, 存储)
     
     产品业绩.columns = ['产品总销售额', '产品平均订单额', '订单数', '平均单价']
     产品业绩 = 产品业绩.sort_values('产品总销售额', ascending=False)
@@ -186,22 +154,22 @@ def 销售模式审查(df):
     
     return 销售员业绩, 区域业绩, 产品业绩
 
-def 生成审查报告(df, 异常记录):
+def 生成审查报告(df, 异常记录, 校验结果=None):
     """生成真实的数据审查报告"""
     print("\n" + "=" * 50)
     print("📋 数据审查总结报告")
     print("=" * 50)
     
     # 使用真实算法计算评分
-    质量评分, 评分明细 = 计算数据质量评分(df, 异常记录)
+    质量评分, 评分明细 = 计算数据质量评分(df, 异常记录, 校验结果)
     
     print(f"✅ 数据质量评分: {质量评分:.1f}% (真实计算)")
     print(f"📊 评分明细: {评分明细}")
     print(f"🚨 发现异常类型: {len(异常记录)} 类")
     
-    # 统计总异常记录数
-    总异常记录数 = sum(len(异常df) for 异常df in 异常记录)
-    print(f"📝 总异常记录: {总异常记录数} 条")
+    # 统计总异常记录数（同一行命中多条规则只算一次）
+    各类条数, 总异常记录数, 重叠记录数 = 异常统计(异常记录, len(df))
+    print(f"📝 总异常记录: {总异常记录数} 条 (其中 {重叠记录数} 条命中多条规则)")
     
     # 质量等级评估
     if 质量评分 >= 90:
@@ -234,7 +202,9 @@ def 生成审查报告(df, 异常记录):
         
         f.write(f"\n异常情况:\n")
         f.write(f"  异常类型数: {len(异常记录)}\n")
-        f.write(f"  总异常记录: {总异常记录数}\n")
+        for 规则名, 条数 in 各类条数.items():
+            f.write(f"  {规则名}: {条数} 条\n")
+        f.write(f"  总异常记录: {总异常记录数} (命中多条规则: {重叠记录数})\n")
         f.write(f"  异常比例: {总异常记录数/len(df)*100:.1f}%\n\n")
         
         f.write(f"处理建议:\n  {建议}\n")
@@ -244,33 +214,50 @@ def 生成审查报告(df, 异常记录):
     return 质量评分, 等级
 
 # 执行数据审查
-if __name__ == "__main__":
+def 主要(参数列表=None):
+    """命令行入口（也由 cli.py 调用）"""
+    parser = argparse.ArgumentParser(description="销售数据审查")
+    parser.add_argument('--quality-only', action='store_true', help="只增量更新质量统计并输出评分趋势（适合高频运行）")
+    parser.add_argument('--freq', choices=['D', 'W', 'M'], default='M', help="评分趋势的周期：天、周或月")
+    参数 = parser.parse_args(参数列表)
+    
     print("🎯 开始第一步: 数据审查")
     print("=" * 50)
     
     try:
-        # 1. 获取数据
-        df = 获取数据()
-        
-        # 2. 基础审查
-        df = 基础数据审查(df)
-        
-        # 3. 业务逻辑审查  
-        df, 异常记录 = 业务逻辑审查(df)
-        
-        # 4. 销售模式审查
-        销售员业绩, 区域业绩, 产品业绩 = 销售模式审查(df)
-        
-        # 5. 生成报告
-        质量评分, 等级 = 生成审查报告(df, 异常记录)
-        
-        print("\n" + "=" * 50)
-        print("🎉 数据审查完成!")
-        print(f"📊 数据质量: {质量评分:.1f}% ({等级})")
-        print("➡️  准备进入第二步: 数据清洗")
-        print("=" * 50)
+        if 参数.quality_only:
+            # 高频模式：不读取明细，只扫描有变化的日期
+            质量趋势审查(参数.freq)
+        else:
+            # 1. 获取数据
+            df = 获取数据()
+            
+            # 2. 基础审查
+            df = 基础数据审查(df)
+            
+            # 3. 业务逻辑审查（数据只校验一次，评分阶段复用）
+            校验结果 = 执行校验(df)
+            df, 异常记录 = 业务逻辑审查(df, 校验结果)
+            
+            # 4. 销售模式审查（分组汇总经聚合缓存，数据未变时直接复用）
+            销售员业绩, 区域业绩, 产品业绩 = 销售模式审查(df, 聚合存储(数据库路径))
+            
+            # 5. 生成报告
+            质量评分, 等级 = 生成审查报告(df, 异常记录, 校验结果)
+            
+            # 6. 更新按天的质量统计
+            质量趋势审查(参数.freq)
+            
+            print("\n" + "=" * 50)
+            print("🎉 数据审查完成!")
+            print(f"📊 数据质量: {质量评分:.1f}% ({等级})")
+            print("➡️  准备进入第二步: 数据清洗")
+            print("=" * 50)
         
     except Exception as e:
         print(f"❌ 数据审查过程中出错: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    主要()
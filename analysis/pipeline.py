@@ -0,0 +1,273 @@
+# sales_dashboard/analysis/pipeline.py
+import io
+import os
+import sys
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from validation_rules import 执行校验
+from aggregate_store import 聚合存储
+from compact_frame import 压缩数据框
+from data_cleaning import 数据库路径, 获取原始数据, 当前原始水位, 识别数据问题, 执行数据清洗, 验证清洗效果, 保存清洗数据
+from data_review import 基础数据审查, 业务逻辑审查, 销售模式审查, 生成审查报告, 质量趋势审查
+from business_analysis import 核心KPI分析, 销售团队分析, 产品表现分析, 区域市场分析, 时间趋势分析, 生成分析报告, 创建可视化图表
+
+# 各阶段的输出和哈希保存在数据库旁边，输入未变的阶段下次直接跳过
+缓存目录 = os.path.join(os.path.dirname(数据库路径), "pipeline_cache")
+状态文件 = "状态.json"
+
+def 内容哈希(对象):
+    """计算阶段输出的内容哈希（DataFrame 按值哈希，容器逐项递归）"""
+    h = hashlib.sha256()
+
+    def 更新(值):
+        if isinstance(值, (pd.DataFrame, pd.Series)):
+            h.update(repr((type(值).__name__, 值.shape, [str(t) for t in np.atleast_1d(值.dtypes)])).encode())
+            if isinstance(值, pd.DataFrame):
+                h.update(repr(list(值.columns)).encode())
+            h.update(pd.util.hash_pandas_object(值, index=True).to_numpy().tobytes())
+        elif isinstance(值, np.ndarray):
+            h.update(repr((值.dtype.str, 值.shape)).encode())
+            h.update(np.ascontiguousarray(值).tobytes())
+        elif isinstance(值, dict):
+            h.update(b'{')
+            for 键 in sorted(值, key=repr):
+                h.update(repr(键).encode())
+                更新(值[键])
+            h.update(b'}')
+        elif isinstance(值, (list, tuple)):
+            h.update(b'[')
+            for 项 in 值:
+                更新(项)
+            h.update(b']')
+        else:
+            h.update(pickle.dumps(值))
+
+    更新(对象)
+    return h.hexdigest()
+
+class _阶段输出:
+    """把工作线程里的 print 暂存到所在阶段的缓冲区，阶段结束后整段输出，避免并发阶段的输出交错"""
+
+    def __init__(self, 原输出):
+        self.原输出 = 原输出
+        self.本地 = threading.local()
+
+    def write(self, 文本):
+        缓冲 = getattr(self.本地, '缓冲', None)
+        return (缓冲 if 缓冲 is not None else self.原输出).write(文本)
+
+    def flush(self):
+        self.原输出.flush()
+
+def _执行阶段(输出, 函数, 输入, 参数):
+    """在工作线程中运行一个阶段，返回 (结果, 输出文本, 耗时秒)"""
+    输出.本地.缓冲 = io.StringIO()
+    开始 = time.perf_counter()
+    try:
+        return 函数(*输入, **参数), 输出.本地.缓冲.getvalue(), time.perf_counter() - 开始
+    except Exception as e:
+        # 把已产生的输出附在异常上，由主线程一并打印
+        e.阶段输出 = 输出.本地.缓冲.getvalue()
+        raise
+    finally:
+        输出.本地.缓冲 = None
+
+def 运行流水线(阶段表, 缓存目录=缓存目录, 线程数=4, 强制=False):
+    """按依赖关系运行阶段表，返回 {阶段名: (状态, 耗时秒)}
+
+    阶段表为 {阶段名: (依赖阶段列表, 函数, 参数)}，函数按依赖顺序接收上游阶段的输出（不得修改它们）。
+    阶段的输入哈希由阶段名、参数和上游输出的内容哈希组成，与上次运行相同时跳过该阶段，
+    需要时再从缓存读取它上次的输出。没有依赖的源头阶段每次都运行，下游是否跳过取决于它读到的数据。
+    依赖都已完成的阶段在线程池中并发运行。
+    """
+    os.makedirs(缓存目录, exist_ok=True)
+    状态路径 = os.path.join(缓存目录, 状态文件)
+    状态 = {}
+    if os.path.exists(状态路径):
+        with open(状态路径, encoding='utf-8') as f:
+            状态 = json.load(f)
+
+    def 读取输出(名称):
+        if 名称 not in 输出:
+            with open(os.path.join(缓存目录, f"{名称}.pkl"), 'rb') as f:
+                输出[名称] = pickle.load(f)
+        return 输出[名称]
+
+    输出, 输出哈希, 运行记录 = {}, {}, {}
+    待运行 = dict(阶段表)
+    进行中 = {}
+    错误 = None
+    阶段输出 = _阶段输出(sys.stdout)
+    sys.stdout = 阶段输出
+    try:
+        with ThreadPoolExecutor(max_workers=线程数) as 执行器:
+            while 待运行 or 进行中:
+                # 1. 提交依赖已完成的阶段（输入未变的直接跳过，可能使更多阶段就绪）
+                就绪 = [名称 for 名称, (依赖, _, _) in 待运行.items() if all(d in 输出哈希 for d in 依赖)]
+                while 就绪 and 错误 is None:
+                    for 名称 in 就绪:
+                        依赖, 函数, 参数 = 待运行.pop(名称)
+                        输入哈希 = 内容哈希([名称, 参数, [输出哈希[d] for d in 依赖]])
+                        上次 = 状态.get(名称, {})
+                        if 依赖 and not 强制 and 上次.get('输入') == 输入哈希 \
+                                and os.path.exists(os.path.join(缓存目录, f"{名称}.pkl")):
+                            输出哈希[名称] = 上次['输出']
+                            运行记录[名称] = ('跳过', 0.0)
+                            print(f"⏭️  {名称}: 输入未变化，跳过")
+                            continue
+                        任务 = 执行器.submit(_执行阶段, 阶段输出, 函数, [读取输出(d) for d in 依赖], 参数)
+                        进行中[任务] = (名称, 输入哈希, bool(依赖))
+                    就绪 = [名称 for 名称, (依赖, _, _) in 待运行.items() if all(d in 输出哈希 for d in 依赖)]
+
+                if not 进行中:
+                    if 待运行 and 错误 is None:
+                        raise ValueError(f"阶段依赖无法满足（缺少依赖或存在循环）: {list(待运行)}")
+                    break
+
+                # 2. 等待任一阶段完成，保存它的输出和哈希
+                完成, _ = wait(进行中, return_when=FIRST_COMPLETED)
+                for 任务 in 完成:
+                    名称, 输入哈希, 保存输出 = 进行中.pop(任务)
+                    try:
+                        结果, 文本, 耗时 = 任务.result()
+                    except Exception as e:
+                        print(getattr(e, '阶段输出', ''), end='')
+                        print(f"❌ {名称}: 运行失败 ({e})")
+                        错误 = 错误 or e
+                        运行记录[名称] = ('失败', 0.0)
+                        continue
+
+                    print(文本, end='')
+                    print(f"✅ {名称}: 完成 ({耗时:.2f} 秒)")
+                    输出[名称] = 结果
+                    输出哈希[名称] = 内容哈希(结果)
+                    运行记录[名称] = ('运行', 耗时)
+                    if 保存输出:
+                        with open(os.path.join(缓存目录, f"{名称}.pkl"), 'wb') as f:
+                            pickle.dump(结果, f)
+                    状态[名称] = {'输入': 输入哈希, '输出': 输出哈希[名称]}
+                    with open(状态路径, 'w', encoding='utf-8') as f:
+                        json.dump(状态, f, ensure_ascii=False, indent=2)
+
+                if 错误 is not None:
+                    # 不再提交新阶段，等已在运行的阶段结束后抛出
+                    待运行.clear()
+    finally:
+        sys.stdout = 阶段输出.原输出
+
+    if 错误 is not None:
+        raise 错误
+    return 运行记录
+
+# ---- 销售数据刷新流程的各阶段 ----
+
+def 读取原始阶段():
+    """先记录水位再读取原始数据（之后新增的记录留给下一次清洗）"""
+    conn = sqlite3.connect(数据库路径)
+    原始水位 = 当前原始水位(conn)
+    conn.close()
+    return {'数据': 获取原始数据(), '水位': 原始水位}
+
+def 数据校验阶段(原始):
+    df = 原始['数据']
+    基础数据审查(df)
+    校验结果 = 执行校验(df)
+    _, 异常记录 = 业务逻辑审查(df, 校验结果)
+    return 校验结果, 异常记录
+
+def 销售模式阶段(原始):
+    return 销售模式审查(原始['数据'], 聚合存储(数据库路径))
+
+def 审查报告阶段(原始, 校验):
+    校验结果, 异常记录 = 校验
+    return 生成审查报告(原始['数据'], 异常记录, 校验结果)
+
+def 数据清洗阶段(原始, 校验, 随机种子=None):
+    df原始 = 原始['数据']
+    校验结果, _ = 校验
+    问题记录 = 识别数据问题(df原始, 校验结果)
+    df清洗后, 清洗日志 = 执行数据清洗(df原始, 问题记录, 随机种子)
+    验证清洗效果(df原始, df清洗后, 校验结果[0])
+    保存清洗数据(df清洗后, 清洗日志, 原始['水位'])
+    return df清洗后
+
+def 质量趋势阶段(原始, 清洗后, 粒度='M'):
+    # 依赖清洗阶段只为排在清洗表写入之后，避免两个写事务争用数据库锁
+    综合分数, 趋势 = 质量趋势审查(粒度)
+    return 综合分数, 趋势
+
+def 业务分析阶段(清洗后):
+    df = 压缩数据框(清洗后.copy(), 金额降精度=False)
+    存储 = 聚合存储(数据库路径)
+    return {
+        'df': df,
+        'kpi': 核心KPI分析(df),
+        '销售员业绩': 销售团队分析(df, 存储),
+        '产品业绩': 产品表现分析(df, 存储),
+        '区域业绩': 区域市场分析(df, 存储),
+        '月度趋势': 时间趋势分析(df),
+    }
+
+def 分析报告阶段(分析):
+    生成分析报告(分析['df'], 分析['kpi'], 分析['销售员业绩'], 分析['产品业绩'], 分析['区域业绩'], 分析['月度趋势'])
+
+def 可视化图表阶段(分析, 缩略图=None):
+    创建可视化图表(分析['df'], 分析['销售员业绩'], 分析['产品业绩'], 分析['区域业绩'], 分析['月度趋势'], 缩略图)
+
+def 刷新流程(随机种子=None, 粒度='M', 缩略图=None):
+    """审查 → 清洗 → 分析 → 报告/图表 的阶段表"""
+    return {
+        '原始数据': ([], 读取原始阶段, {}),
+        '数据校验': (['原始数据'], 数据校验阶段, {}),
+        '销售模式': (['原始数据'], 销售模式阶段, {}),
+        '审查报告': (['原始数据', '数据校验'], 审查报告阶段, {}),
+        '数据清洗': (['原始数据', '数据校验'], 数据清洗阶段, {'随机种子': 随机种子}),
+        '质量趋势': (['原始数据', '数据清洗'], 质量趋势阶段, {'粒度': 粒度}),
+        '业务分析': (['数据清洗'], 业务分析阶段, {}),
+        '分析报告': (['业务分析'], 分析报告阶段, {}),
+        '可视化图表': (['业务分析'], 可视化图表阶段, {'缩略图': 缩略图}),
+    }
+
+# 执行完整刷新流程
+def 主要(参数列表=None):
+    """命令行入口（也由 cli.py 调用）"""
+    parser = argparse.ArgumentParser(description="销售数据刷新流水线（审查、清洗、分析、报告）")
+    parser.add_argument('--seed', type=int, default=None, help="价格修正使用的随机种子")
+    parser.add_argument('--freq', choices=['D', 'W', 'M'], default='M', help="质量评分趋势的周期")
+    parser.add_argument('--thumbnails', choices=['png', 'svg'], default=None, help="在图表旁另存一份缩略图")
+    parser.add_argument('--threads', type=int, default=4, help="并发运行独立阶段的线程数")
+    parser.add_argument('--force', action='store_true', help="忽略缓存，重新运行全部阶段")
+    参数 = parser.parse_args(参数列表)
+
+    print("🎯 开始销售数据刷新流水线")
+    print("=" * 50)
+
+    try:
+        开始 = time.perf_counter()
+        运行记录 = 运行流水线(刷新流程(参数.seed, 参数.freq, 参数.thumbnails), 线程数=参数.threads, 强制=参数.force)
+        总耗时 = time.perf_counter() - 开始
+
+        print("\n" + "=" * 50)
+        print("🎉 流水线运行完成!")
+        for 名称, (状态, 耗时) in 运行记录.items():
+            print(f"  {名称}: {状态} ({耗时:.2f} 秒)")
+        print(f"⏱️  总耗时: {总耗时:.2f} 秒")
+        print("=" * 50)
+
+    except Exception as e:
+        print(f"❌ 流水线运行出错: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    主要()
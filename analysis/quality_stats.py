@@ -0,0 +1,187 @@
+# sales_dashboard/analysis/quality_stats.py
+import numpy as np
+import pandas as pd
+
+from validation_rules import 执行校验
+
+# 按天保存的质量计数（长表：每天每个指标一行，可直接按任意日期范围求和）
+质量统计表 = "质量日统计"
+# 每天数据的指纹，用于判断哪些天需要重新扫描
+质量指纹表 = "质量日指纹"
+无日期 = "无日期"
+
+# 按行计数的规则（完整性另按各列缺失数计算）
+计数规则 = ['计算错误', '价格异常', '数量异常', '重复订单']
+# 各行自身即可判断的规则；重复订单跨天出现，另在整表上按天统计
+单行规则 = ['计算错误', '价格异常', '数量异常']
+# 综合评分的权重
+权重配置 = {'完整性': 0.25, '计算准确性': 0.35, '合理性': 0.30, '唯一性': 0.10}
+
+def 准备质量统计(conn):
+    """创建质量统计表和指纹表（已存在时不做改动）"""
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {质量统计表} (
+            源表 TEXT NOT NULL,
+            日期 TEXT NOT NULL,
+            指标 TEXT NOT NULL,
+            数值 INTEGER NOT NULL,
+            PRIMARY KEY (源表, 日期, 指标)
+        );
+        CREATE TABLE IF NOT EXISTS {质量指纹表} (
+            源表 TEXT NOT NULL,
+            日期 TEXT NOT NULL,
+            记录数 INTEGER,
+            最大行号 INTEGER,
+            校验和 REAL,
+            PRIMARY KEY (源表, 日期)
+        );
+    """)
+
+def 计数指标(df, 校验结果=None):
+    """把一份数据的校验结果转换为可累加的计数 {指标: 数值}"""
+    掩码, 缺失计数 = 校验结果 if 校验结果 is not None else 执行校验(df)
+    计数 = {'总数': len(df)}
+    for 规则名 in 计数规则:
+        计数[规则名] = int(掩码[规则名].sum())
+    for 列名, 数量 in 缺失计数.items():
+        计数[f'缺失:{列名}'] = int(数量)
+    return 计数
+
+def 汇总评分(计数):
+    """由累加后的计数计算各维度分数和加权综合分，返回 (综合分数, 评分维度)"""
+    总数 = 计数['总数']
+    if not 总数:
+        return 0.0, {维度: 0.0 for 维度 in 权重配置}
+
+    缺失 = [数值 for 指标, 数值 in 计数.items() if 指标.startswith('缺失:')]
+    评分维度 = {
+        '完整性': float(np.mean([(1 - 数量 / 总数) * 100 for 数量 in 缺失])) if 缺失 else 100.0,
+        '计算准确性': (1 - 计数['计算错误'] / 总数) * 100,
+        '合理性': (1 - 计数['价格异常'] / 总数) * 100,
+        '唯一性': (1 - 计数['重复订单'] / 总数) * 100,
+    }
+    综合分数 = sum(评分维度[维度] * 权重配置[维度] for 维度 in 评分维度)
+    return 综合分数, 评分维度
+
+def _日期键(列):
+    """订单日期的天部分，空值归入“无日期”"""
+    return 列.astype(str).str[:10].where(列.notna(), 无日期)
+
+def 读取日指纹(conn, 源表):
+    """用一次SQL聚合得到每天的 (记录数, 最大行号, 校验和)
+
+    校验和覆盖数值列和 rowid，能发现新增、删除和数值修改；只改文本列的原地更新无法发现，
+    这种情况需要全部重算。
+    """
+    return pd.read_sql(f"""
+        SELECT COALESCE(substr(订单日期, 1, 10), '{无日期}') AS 日期,
+               COUNT(*) AS 记录数, MAX(rowid) AS 最大行号,
+               TOTAL(rowid + COALESCE(单价, 0) + COALESCE(数量, 0) + COALESCE(销售额, 0)) AS 校验和
+        FROM {源表} GROUP BY 1
+    """, conn).set_index('日期')
+
+def 读取日重复数(conn, 源表):
+    """整表中重复的订单ID按天计数：每个订单ID的第一条（rowid 最小）之外都算重复，
+    与 duplicated() 按表顺序的结果一致
+    """
+    return pd.read_sql(f"""
+        SELECT COALESCE(substr(记录.订单日期, 1, 10), '{无日期}') AS 日期, COUNT(*) AS 数值
+        FROM {源表} AS 记录
+        JOIN (SELECT 订单ID, MIN(rowid) AS 首行 FROM {源表} GROUP BY 订单ID HAVING COUNT(*) > 1) AS 重复
+          ON 记录.订单ID IS 重复.订单ID AND 记录.rowid > 重复.首行
+        GROUP BY 1
+    """, conn).set_index('日期')['数值']
+
+def 更新质量统计(conn, 源表, 全部重算=False):
+    """只重新扫描指纹变化的日期，更新按天的质量计数，返回重新扫描的日期列表
+
+    重复订单每次在整表上统计（见 读取日重复数），跨天的重复也会计入，
+    各天求和与 计算数据质量评分 的结果一致。
+    """
+    准备质量统计(conn)
+    当前 = 读取日指纹(conn, 源表)
+    已存 = pd.read_sql(
+        f"SELECT 日期, 记录数, 最大行号, 校验和 FROM {质量指纹表} WHERE 源表 = ?", conn, params=[源表]
+    ).set_index('日期')
+
+    if 全部重算:
+        变化日期 = list(当前.index)
+    else:
+        对比 = 当前.join(已存, rsuffix='_已存', how='left')
+        变化 = (对比['记录数'] != 对比['记录数_已存']) | (对比['最大行号'] != 对比['最大行号_已存']) \
+            | ~np.isclose(对比['校验和'], 对比['校验和_已存'].astype(float), rtol=0, atol=1e-6)
+        变化日期 = list(对比.index[变化])
+    删除日期 = list(已存.index.difference(当前.index))
+
+    # 只读取变化日期的记录（全部变化时直接整表读取）
+    if len(变化日期) == len(当前):
+        df = pd.read_sql(f"SELECT * FROM {源表}", conn)
+    elif 变化日期:
+        df = pd.read_sql(
+            f"SELECT * FROM {源表} WHERE COALESCE(substr(订单日期, 1, 10), '{无日期}') IN "
+            f"({', '.join('?' * len(变化日期))})", conn, params=变化日期
+        )
+    else:
+        df = None
+
+    记录 = []
+    if df is not None and len(df):
+        # 各规则掩码和各列空值标记按天一次分组求和
+        掩码, _ = 执行校验(df)
+        标记 = pd.DataFrame({规则名: 掩码[规则名] for 规则名 in 单行规则}, index=df.index)
+        标记 = 标记.join(df.isna().add_prefix('缺失:'))
+        标记['总数'] = 1
+        日计数 = 标记.groupby(_日期键(df['订单日期']).to_numpy()).sum()
+        记录 = [
+            (源表, 当天, 指标, int(数值))
+            for (当天, 指标), 数值 in 日计数.stack().items()
+        ]
+
+    # 一个订单的重复记录可能在未变化的日期，重复数按天整体替换
+    重复数 = 读取日重复数(conn, 源表).reindex(当前.index, fill_value=0)
+    记录 += [(源表, 当天, '重复订单', int(数值)) for 当天, 数值 in 重复数.items()]
+
+    with conn:
+        conn.execute(f"DELETE FROM {质量统计表} WHERE 源表 = ? AND 指标 = '重复订单'", [源表])
+        for 当天 in 变化日期 + 删除日期:
+            conn.execute(f"DELETE FROM {质量统计表} WHERE 源表 = ? AND 日期 = ?", [源表, 当天])
+            conn.execute(f"DELETE FROM {质量指纹表} WHERE 源表 = ? AND 日期 = ?", [源表, 当天])
+        conn.executemany(f"INSERT INTO {质量统计表} VALUES (?, ?, ?, ?)", 记录)
+        conn.executemany(
+            f"INSERT INTO {质量指纹表} VALUES (?, ?, ?, ?, ?)",
+            [(源表, 当天, int(当前.at[当天, '记录数']), int(当前.at[当天, '最大行号']),
+              float(当前.at[当天, '校验和'])) for 当天 in 变化日期]
+        )
+
+    return 变化日期
+
+def 读取日统计(conn, 源表, 开始日期=None, 结束日期=None):
+    """读取按天的质量计数，返回 行=日期、列=指标 的宽表"""
+    条件, 参数 = "源表 = ?", [源表]
+    if 开始日期 is not None:
+        条件 += " AND 日期 >= ?"
+        参数.append(str(开始日期))
+    if 结束日期 is not None:
+        条件 += " AND 日期 <= ?"
+        参数.append(str(结束日期))
+    长表 = pd.read_sql(f"SELECT 日期, 指标, 数值 FROM {质量统计表} WHERE {条件}", conn, params=参数)
+    return 长表.pivot(index='日期', columns='指标', values='数值').fillna(0).sort_index()
+
+def 区间质量评分(conn, 源表, 开始日期=None, 结束日期=None):
+    """对日期范围内的按天计数求和后计算评分，返回 (综合分数, 评分维度)"""
+    日统计 = 读取日统计(conn, 源表, 开始日期, 结束日期)
+    return 汇总评分(日统计.sum().to_dict() if len(日统计) else {'总数': 0})
+
+def 评分趋势(conn, 源表, 粒度='M'):
+    """按天 (D)、周 (W) 或月 (M) 汇总计数并计算每个周期的评分"""
+    日统计 = 读取日统计(conn, 源表).drop(index=无日期, errors='ignore')
+    if not len(日统计):
+        return pd.DataFrame(columns=list(权重配置) + ['综合评分'])
+
+    周期 = pd.PeriodIndex(pd.to_datetime(日统计.index), freq=粒度)
+    周期统计 = 日统计.groupby(周期).sum()
+    趋势 = []
+    for 当期, 计数 in 周期统计.iterrows():
+        综合分数, 评分维度 = 汇总评分(计数.to_dict())
+        趋势.append({'周期': str(当期), **评分维度, '综合评分': 综合分数})
+    return pd.DataFrame(趋势).set_index('周期')
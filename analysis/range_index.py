@@ -0,0 +1,149 @@
+# sales_dashboard/analysis/range_index.py
+import numpy as np
+import pandas as pd
+
+# 每个单元格保存的度量（均为可直接相加的合计）
+索引度量 = ['销售额', '订单数', '数量']
+索引维度 = ['销售员姓名', '产品类别', '区域', '客户类型']
+全部 = ('全部', '全部')
+
+class 区间索引:
+    """按 天 × 单元格 的前缀和索引（树状数组），任意日期区间的合计只需两次前缀查询
+
+    单元格为全部订单以及每个维度的每个取值（如 区域=华北），各自保存 销售额、订单数、数量。
+    新订单按天做点更新，每天 O(log 天数)；日期超出容量时容量翻倍后重建。
+    跨多个维度的组合条件（如 区域=华北 且 产品类别=耳机）无法由单维度的单元格回答。
+    """
+
+    def __init__(self, 起始日期, 维度列=索引维度, 容量=64):
+        self.起始日期 = np.datetime64(起始日期, 'D')
+        self.维度列 = list(维度列)
+        self.单元格 = {全部: 0}  # (维度, 取值) -> 列号
+        self.容量 = 容量
+        self.天数 = 0  # 已有数据的最后一天的位置 + 1
+        # 日值保留每天的原始合计，用于扩容和批量更新时重建树
+        self.日值 = np.zeros((容量, 1, len(索引度量)))
+        self.树 = np.zeros((容量 + 1, 1, len(索引度量)))  # 下标从1开始
+
+    @classmethod
+    def 从记录构建(cls, 记录, 维度列=索引维度):
+        """由订单明细或按 (订单日期, 维度...) 汇总的记录构建（没有订单数列时每行算一单）"""
+        日期 = pd.to_datetime(记录['订单日期']).dropna()
+        起始日期 = 日期.min() if len(日期) else pd.Timestamp.today()
+        索引 = cls(起始日期.to_datetime64(), 维度列)
+        索引.累加(记录)
+        return 索引
+
+    def _重建(self):
+        """由每天的合计重建整棵树：树[i] = 前缀和[i] - 前缀和[i - lowbit(i)]，O(容量)"""
+        前缀和 = np.concatenate([np.zeros((1,) + self.日值.shape[1:]), np.cumsum(self.日值, axis=0)])
+        i = np.arange(1, self.容量 + 1)
+        self.树 = np.concatenate([np.zeros((1,) + self.日值.shape[1:]), 前缀和[i] - 前缀和[i - (i & -i)]])
+
+    def _扩展日期轴(self, 最早, 最晚):
+        """新日期早于起始日期时向前补齐，超出容量时容量翻倍，然后重建"""
+        前补 = max(0, int((self.起始日期 - 最早).astype(int)))
+        需要 = int((最晚 - 最早 if 前补 else 最晚 - self.起始日期).astype(int)) + 1
+        需要 = max(需要, self.天数 + 前补, self.容量 + 前补 if 前补 else 0)
+        if not 前补 and 需要 <= self.容量:
+            return
+        新容量 = self.容量
+        while 新容量 < 需要:
+            新容量 *= 2
+        self.日值 = np.pad(self.日值, [(前补, 新容量 - self.容量 - 前补), (0, 0), (0, 0)])
+        self.起始日期 -= 前补
+        self.天数 += 前补 if self.天数 else 0
+        self.容量 = 新容量
+        self._重建()
+
+    def _列号(self, 维度, 取值):
+        """维度取值对应的列号，新取值在末尾追加全零的列（树状数组是线性的，补零仍然成立）"""
+        新值 = [值 for 值 in pd.unique(取值) if (维度, 值) not in self.单元格]
+        if 新值:
+            for 值 in 新值:
+                self.单元格[(维度, 值)] = len(self.单元格)
+            self.日值 = np.pad(self.日值, [(0, 0), (0, len(新值)), (0, 0)])
+            self.树 = np.pad(self.树, [(0, 0), (0, len(新值)), (0, 0)])
+        return np.array([self.单元格[(维度, 值)] for 值 in 取值], dtype=np.intp)
+
+    def 累加(self, 记录):
+        """把新增记录累加进索引：先按天合并，再对每个涉及的日期做一次点更新"""
+        日期 = pd.to_datetime(记录['订单日期']).values.astype('datetime64[D]')
+        有效 = ~np.isnat(日期)
+        if not 有效.any():
+            return
+        记录, 日期 = 记录[有效], 日期[有效]
+        self._扩展日期轴(日期.min(), 日期.max())
+
+        位置 = (日期 - self.起始日期).astype(np.int64)
+        值 = np.column_stack([
+            记录[m].fillna(0).to_numpy(dtype=float) if m in 记录 else np.ones(len(记录))
+            for m in 索引度量
+        ])
+        各列号 = [np.zeros(len(记录), dtype=np.intp)] + [
+            self._列号(维度, 记录[维度].astype(object).fillna('未知').to_numpy()) for 维度 in self.维度列
+        ]
+
+        天, 逆 = np.unique(位置, return_inverse=True)
+        增量 = np.zeros((len(天),) + self.日值.shape[1:])
+        for 列号 in 各列号:
+            np.add.at(增量, (逆, 列号), 值)
+        self.日值[天] += 增量
+        self.天数 = max(self.天数, int(天[-1]) + 1)
+
+        # 涉及的天数很多时整体重建比逐天点更新更快
+        if len(天) * np.log2(self.容量) > self.容量:
+            self._重建()
+            return
+        for 天位置, 当天增量 in zip(天, 增量):
+            i = int(天位置) + 1
+            while i <= self.容量:
+                self.树[i] += 当天增量
+                i += i & -i
+
+    def _前缀(self, 位置):
+        """第 0..位置 天的合计，形状为 (单元格数, 度量数)"""
+        合计 = np.zeros(self.树.shape[1:])
+        i = min(位置, self.容量 - 1) + 1
+        while i > 0:
+            合计 += self.树[i]
+            i -= i & -i
+        return 合计
+
+    def 日期范围(self):
+        """索引覆盖的 (第一天, 最后一天)"""
+        return self.起始日期, self.起始日期 + max(self.天数 - 1, 0)
+
+    def _区间(self, 开始, 结束):
+        """开始到结束（含）每个单元格的合计，两次前缀查询"""
+        开始 = int((np.datetime64(开始, 'D') - self.起始日期).astype(int))
+        结束 = int((np.datetime64(结束, 'D') - self.起始日期).astype(int))
+        if 结束 < 0 or 开始 > 结束:
+            return np.zeros(self.树.shape[1:])
+        return self._前缀(结束) - (self._前缀(开始 - 1) if 开始 > 0 else 0)
+
+    def 区间合计(self, 开始, 结束, 条件=None):
+        """日期区间内的 {度量: 合计}
+
+        条件为 {维度: [取值, ...]}，最多只能限定一个维度（同一维度的多个取值互不重叠，可直接相加）。
+        """
+        条件 = {维度: 取值 for 维度, 取值 in (条件 or {}).items() if 取值}
+        if len(条件) > 1:
+            raise ValueError(f"区间索引只能按单个维度过滤，收到: {list(条件)}")
+        if 条件:
+            (维度, 取值), = 条件.items()
+            列 = [self.单元格[(维度, 值)] for 值 in 取值 if (维度, 值) in self.单元格]
+        else:
+            列 = [self.单元格[全部]]
+        合计 = self._区间(开始, 结束)[列].sum(axis=0)
+        return dict(zip(索引度量, 合计.tolist()))
+
+    def 环比(self, 开始, 结束, 条件=None):
+        """所选区间与紧邻其前的等长区间的合计，返回 (本期, 上期)"""
+        开始, 结束 = np.datetime64(开始, 'D'), np.datetime64(结束, 'D')
+        天数 = 结束 - 开始 + 1
+        return self.区间合计(开始, 结束, 条件), self.区间合计(开始 - 天数, 开始 - 1, 条件)
+
+def 变化率(本期, 上期):
+    """本期相对上期的变化 (%)，上期为0时返回 None"""
+    return (本期 / 上期 - 1) * 100 if 上期 else None
@@ -0,0 +1,335 @@
+# sales_dashboard/analysis/sketches.py
+import os
+import pickle
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aggregate_store import 读取表版本
+
+摘要缓存表 = "订单摘要"
+# 每天除全部订单外，再按这些维度的每个取值各保存一份摘要
+摘要维度 = ['销售员姓名', '产品类别', '区域', '客户类型']
+全部 = ('全部', '全部')
+读取列 = ['订单ID', '订单日期', '销售额', *摘要维度]
+
+class 基数估计:
+    """HyperLogLog 去重计数：2^精度 个寄存器，标准误差约 1.04/√(2^精度)，合并取逐个寄存器的最大值"""
+
+    def __init__(self, 精度=10):
+        self.精度 = 精度
+        self.寄存器 = np.zeros(1 << 精度, dtype=np.uint8)
+
+    def 添加(self, 值):
+        self.添加哈希(pd.util.hash_array(np.asarray(值, dtype=object)))
+
+    def 添加哈希(self, 哈希):
+        """添加已计算好的 64 位哈希（批量构建时整块只哈希一次）"""
+        桶 = (哈希 >> np.uint64(64 - self.精度)).astype(np.intp)
+        # 桶号之后的32位中第一个1出现的位置（全为0时记为33）
+        余位 = ((哈希 >> np.uint64(32 - self.精度)) & np.uint64(0xFFFFFFFF)).astype(float)
+        with np.errstate(divide='ignore'):
+            位置 = np.where(余位 > 0, 32 - np.floor(np.log2(余位)), 33).astype(np.uint8)
+        np.maximum.at(self.寄存器, 桶, 位置)
+
+    def 合并(self, 其他):
+        np.maximum(self.寄存器, 其他.寄存器, out=self.寄存器)
+        return self
+
+    def 估计(self):
+        m = len(self.寄存器)
+        估计值 = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -self.寄存器.astype(float))
+        空寄存器 = int(np.count_nonzero(self.寄存器 == 0))
+        # 小基数时改用线性计数
+        if 估计值 <= 2.5 * m and 空寄存器:
+            估计值 = m * np.log(m / 空寄存器)
+        return 估计值
+
+class 分位数摘要:
+    """按对数分桶的分位数摘要：每个桶覆盖 [γ^(i-1), γ^i)，分位数的相对误差不超过 相对误差
+
+    桶数只与数值跨越的数量级有关，与记录数无关；合并即逐桶相加。
+    桶数超过上限时把最小的桶并入一起（只影响最低端的分位数）。
+    """
+
+    def __init__(self, 相对误差=0.01, 最大桶数=2048):
+        self.相对误差 = 相对误差
+        self.最大桶数 = 最大桶数
+        self.γ = (1 + 相对误差) / (1 - 相对误差)
+        self.桶 = {}  # 桶号 -> 计数
+        self.零值 = 0  # 小于等于0的值
+        self.计数 = 0
+        self.最小值 = np.inf
+        self.最大值 = -np.inf
+
+    def 添加(self, 值):
+        值 = np.asarray(值, dtype=float)
+        值 = 值[~np.isnan(值)]
+        if not len(值):
+            return
+        self.计数 += len(值)
+        self.最小值 = min(self.最小值, 值.min())
+        self.最大值 = max(self.最大值, 值.max())
+        正值 = 值[值 > 0]
+        self.零值 += len(值) - len(正值)
+        桶号, 次数 = np.unique(np.ceil(np.log(正值) / np.log(self.γ)).astype(np.int64), return_counts=True)
+        for i, n in zip(桶号.tolist(), 次数.tolist()):
+            self.桶[i] = self.桶.get(i, 0) + n
+        self._压缩()
+
+    def 合并(self, 其他):
+        for i, n in 其他.桶.items():
+            self.桶[i] = self.桶.get(i, 0) + n
+        self.零值 += 其他.零值
+        self.计数 += 其他.计数
+        self.最小值 = min(self.最小值, 其他.最小值)
+        self.最大值 = max(self.最大值, 其他.最大值)
+        self._压缩()
+        return self
+
+    def _压缩(self):
+        if len(self.桶) <= self.最大桶数:
+            return
+        桶号 = sorted(self.桶)
+        多余 = 桶号[:len(桶号) - self.最大桶数 + 1]
+        self.桶[多余[-1]] = sum(self.桶.pop(i) for i in 多余)
+
+    def 分位数(self, q):
+        """第 q 分位数（0~1），没有数据时返回 NaN"""
+        if not self.计数:
+            return np.nan
+        位次 = q * (self.计数 - 1)
+        if 位次 < self.零值:
+            return min(self.最小值, 0.0)
+        累计 = self.零值
+        for i in sorted(self.桶):
+            累计 += self.桶[i]
+            if 累计 > 位次:
+                # 取桶的中点，并限制在实际的最小值和最大值之间
+                return float(np.clip(2 * self.γ ** i / (self.γ + 1), self.最小值, self.最大值))
+        return self.最大值
+
+class 频繁项:
+    """Space-Saving Top-K：最多保存 容量 个计数器，每个计数的高估不超过其误差
+
+    新项在计数器已满时替换当前最小的计数器，并继承其计数作为误差上界。
+    """
+
+    def __init__(self, 容量=32):
+        self.容量 = 容量
+        self.计数器 = {}  # 项 -> [计数, 误差]
+
+    def 添加(self, 项, 权重=None):
+        权重 = np.ones(len(项)) if 权重 is None else np.asarray(权重, dtype=float)
+        唯一项, 逆 = np.unique(np.asarray(项, dtype=object), return_inverse=True)
+        for 值, w in zip(唯一项.tolist(), np.bincount(逆, weights=权重).tolist()):
+            if 值 in self.计数器:
+                self.计数器[值][0] += w
+            elif len(self.计数器) < self.容量:
+                self.计数器[值] = [w, 0.0]
+            else:
+                最小项 = min(self.计数器, key=lambda k: self.计数器[k][0])
+                最小计数 = self.计数器.pop(最小项)[0]
+                self.计数器[值] = [最小计数 + w, 最小计数]
+
+    def 合并(self, 其他):
+        """合并两个摘要：一方没有的项按该方的最小计数补上计数和误差，合并后计数和误差仍是有效的上界
+
+        未满的摘要是精确计数，没有的项计数为0。
+        """
+        本方最小, 对方最小 = self._最小计数(), 其他._最小计数()
+        合并后 = {}
+        for 值 in list(self.计数器) + [值 for 值 in 其他.计数器 if 值 not in self.计数器]:
+            计数1, 误差1 = self.计数器.get(值, (本方最小, 本方最小))
+            计数2, 误差2 = 其他.计数器.get(值, (对方最小, 对方最小))
+            合并后[值] = [计数1 + 计数2, 误差1 + 误差2]
+        # 舍弃的项计数不超过保留的最小计数，之后按最小计数补上时仍是上界
+        保留 = sorted(合并后, key=lambda k: 合并后[k][0], reverse=True)[:self.容量]
+        self.计数器 = {k: 合并后[k] for k in 保留}
+        return self
+
+    def _最小计数(self):
+        """没有计数器的项的计数上界：已满时为最小计数，未满时为0"""
+        if len(self.计数器) < self.容量:
+            return 0.0
+        return min(计数 for 计数, _ in self.计数器.values())
+
+    def 前N(self, n=5):
+        """计数最大的 n 项，DataFrame 包含 计数 和 误差上界"""
+        结果 = pd.DataFrame.from_dict(self.计数器, orient='index', columns=['计数', '误差上界'])
+        return 结果.sort_values('计数', ascending=False).head(n)
+
+class 订单摘要:
+    """一组订单的可合并摘要：去重订单数、订单金额分位数、销售员和产品的销售额 Top-K"""
+
+    def __init__(self):
+        self.订单 = 基数估计()
+        self.金额 = 分位数摘要()
+        self.销售员 = 频繁项()
+        self.产品 = 频繁项()
+
+    def 添加(self, df):
+        return self._添加数组(_摘要数组(df))
+
+    def _添加数组(self, 数组):
+        哈希, 金额, 销售员, 产品 = 数组
+        self.订单.添加哈希(哈希)
+        self.金额.添加(金额)
+        self.销售员.添加(销售员, np.nan_to_num(金额))
+        self.产品.添加(产品, np.nan_to_num(金额))
+        return self
+
+    def 合并(self, 其他):
+        self.订单.合并(其他.订单)
+        self.金额.合并(其他.金额)
+        self.销售员.合并(其他.销售员)
+        self.产品.合并(其他.产品)
+        return self
+
+    def 分位数(self, 分位点=(0.5, 0.9, 0.99)):
+        return {f"P{round(q * 100)}": self.金额.分位数(q) for q in 分位点}
+
+def _摘要数组(df):
+    """订单摘要需要的列：订单ID哈希、销售额、销售员、产品类别"""
+    return (
+        pd.util.hash_array(df['订单ID'].to_numpy(dtype=object)),
+        df['销售额'].to_numpy(dtype=float),
+        df['销售员姓名'].astype(object).fillna('未知').to_numpy(),
+        df['产品类别'].astype(object).fillna('未知').to_numpy(),
+    )
+
+def 按日构建(df, 摘要表=None):
+    """把订单按天、按 全部/各维度取值 累加进摘要表 {(日期, 维度, 取值): 订单摘要}
+
+    整块数据只哈希和取列一次，各单元格按分组下标切出自己的行。
+    """
+    摘要表 = {} if 摘要表 is None else 摘要表
+    数组 = _摘要数组(df)
+    日期 = pd.to_datetime(df['订单日期']).dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+
+    分组 = [('全部', np.full(len(df), '全部', dtype=object))] + [
+        (维度, df[维度].astype(object).fillna('未知').to_numpy()) for 维度 in 摘要维度
+    ]
+    for 维度, 取值 in 分组:
+        代码, 唯一键 = pd.factorize(pd.MultiIndex.from_arrays([日期, 取值]))
+        顺序 = np.argsort(代码, kind='stable')
+        边界 = np.flatnonzero(np.diff(代码[顺序])) + 1
+        for 行号 in np.split(顺序, 边界) if len(顺序) else []:
+            日, 值 = 唯一键[代码[行号[0]]]
+            摘要表.setdefault((日, 维度, 值), 订单摘要())._添加数组(tuple(a[行号] for a in 数组))
+    return 摘要表
+
+def 合并摘要(摘要表, 开始=None, 结束=None, 条件=None):
+    """合并日期区间内（含两端）的日摘要；条件同区间索引，最多限定一个维度"""
+    条件 = {维度: 取值 for 维度, 取值 in (条件 or {}).items() if 取值}
+    if len(条件) > 1:
+        raise ValueError(f"摘要只能按单个维度过滤，收到: {list(条件)}")
+    if 条件:
+        (维度, 取值), = 条件.items()
+        单元格 = {(维度, 值) for 值 in 取值}
+    else:
+        单元格 = {全部}
+    开始 = str(pd.Timestamp(开始).date()) if 开始 is not None else ''
+    结束 = str(pd.Timestamp(结束).date()) if 结束 is not None else '9999'
+
+    结果 = 订单摘要()
+    for (日, 维度, 取值), 摘要 in 摘要表.items():
+        if 开始 <= 日 <= 结束 and (维度, 取值) in 单元格:
+            结果.合并(摘要)
+    return 结果
+
+class 摘要存储:
+    """按天保存订单摘要的磁盘存储，与聚合缓存一样放在数据库旁边的独立文件中
+
+    表只有追加（版本号和已有记录不变）时只读取新增记录并合并进对应日期的摘要，
+    其他变化（版本号递增、删除）时全部重建。复用、增量合并和重建的日摘要数累计在同名属性中。
+    """
+
+    def __init__(self, 数据库路径, 缓存路径=None, 分块行数=50000):
+        self.数据库路径 = 数据库路径
+        self.缓存路径 = 缓存路径 or os.path.join(os.path.dirname(os.path.abspath(数据库路径)), "sketch_cache.db")
+        self.分块行数 = 分块行数
+        self.复用 = 0
+        self.增量合并 = 0
+        self.重建 = 0
+
+        conn = sqlite3.connect(self.缓存路径)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {摘要缓存表} (
+                表名 TEXT NOT NULL,
+                表版本 TEXT NOT NULL,
+                日期 TEXT NOT NULL,
+                维度 TEXT NOT NULL,
+                取值 TEXT NOT NULL,
+                摘要 BLOB NOT NULL,
+                更新时间 TEXT,
+                PRIMARY KEY (表名, 日期, 维度, 取值)
+            )
+        """)
+        conn.close()
+
+    def _读取新增(self, 数据库, 表名, 起始行号):
+        """分块读取 rowid 大于起始行号的记录，逐块累加进新的日摘要"""
+        新摘要 = {}
+        for 块 in pd.read_sql(
+            f"SELECT {', '.join(读取列)} FROM {表名} WHERE rowid > ?",
+            数据库, params=[起始行号], chunksize=self.分块行数
+        ):
+            按日构建(块, 新摘要)
+        return 新摘要
+
+    def 日摘要(self, 表名):
+        """返回表当前版本的 {(日期, 维度, 取值): 订单摘要}，必要时增量更新或重建"""
+        数据库 = sqlite3.connect(self.数据库路径)
+        缓存 = sqlite3.connect(self.缓存路径)
+        try:
+            表版本 = 读取表版本(数据库, 表名)
+            旧版本 = {行[0] for 行 in 缓存.execute(f"SELECT DISTINCT 表版本 FROM {摘要缓存表} WHERE 表名 = ?", [表名])}
+            摘要表 = {
+                (日, 维度, 取值): pickle.loads(摘要) for 日, 维度, 取值, 摘要 in 缓存.execute(
+                    f"SELECT 日期, 维度, 取值, 摘要 FROM {摘要缓存表} WHERE 表名 = ?", [表名]
+                )
+            }
+            if 旧版本 == {表版本}:
+                self.复用 += len(摘要表)
+                return 摘要表
+
+            # 只有追加：版本号相同、原有记录数不变、新增记录全部在旧的最大 rowid 之后
+            版本号, 记录数, 最大行号 = 表版本.split(':')
+            增量 = False
+            if len(旧版本) == 1:
+                旧版本号, 旧记录数, 旧最大行号 = next(iter(旧版本)).split(':')
+                新增数 = 数据库.execute(
+                    f"SELECT COUNT(*) FROM {表名} WHERE rowid > ?", [int(旧最大行号)]
+                ).fetchone()[0]
+                增量 = 旧版本号 == 版本号 and int(记录数) - int(旧记录数) == 新增数
+
+            新摘要 = self._读取新增(数据库, 表名, int(旧最大行号) if 增量 else 0)
+            if 增量:
+                for 键, 摘要 in 新摘要.items():
+                    摘要表[键] = 摘要表[键].合并(摘要) if 键 in 摘要表 else 摘要
+                变化键 = set(新摘要)
+            else:
+                摘要表, 变化键 = 新摘要, set(新摘要)
+
+            时间 = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            with 缓存:
+                if 增量:
+                    缓存.execute(f"UPDATE {摘要缓存表} SET 表版本 = ? WHERE 表名 = ?", [表版本, 表名])
+                else:
+                    缓存.execute(f"DELETE FROM {摘要缓存表} WHERE 表名 = ?", [表名])
+                缓存.executemany(
+                    f"INSERT OR REPLACE INTO {摘要缓存表} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(表名, 表版本, *键, pickle.dumps(摘要表[键]), 时间) for 键 in 变化键]
+                )
+            if 增量:
+                self.复用 += len(摘要表) - len(变化键)
+                self.增量合并 += len(变化键)
+            else:
+                self.重建 += len(变化键)
+            return 摘要表
+        finally:
+            数据库.close()
+            缓存.close()
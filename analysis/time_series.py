@@ -0,0 +1,71 @@
+# sales_dashboard/analysis/time_series.py
+import numpy as np
+import pandas as pd
+
+# 支持的汇总粒度（pandas 周期代码 -> 名称）
+粒度名称 = {'D': '日', 'W': '周', 'M': '月', 'Q': '季'}
+# 同比时向前回溯的周期数（日、周按 365 天、52 周近似一年）
+每年周期数 = {'D': 365, 'W': 52, 'M': 12, 'Q': 4}
+
+class 时间序列:
+    """按天的基础序列，日、周、月、季汇总以及滚动窗口和增长率都由它推导
+
+    日期轴连续（没有订单的日期为0），每个度量一列，指定维度时每个 (度量, 维度组合) 一列。
+    构建时扫描一次订单，之后任意粒度的计算只与天数有关，与订单数量无关。
+    度量与销售立方体一致：订单数为计数，其余度量为合计（平均值由 合计/订单数 得到）。
+    """
+
+    def __init__(self, 日数据):
+        # 日数据: 以连续的按天 DatetimeIndex 为索引
+        self.日数据 = 日数据
+
+    @classmethod
+    def 从明细构建(cls, df, 度量=('销售额', '订单数'), 维度=()):
+        """扫描一次订单明细，按 (日期, 维度组合) 汇总得到基础序列"""
+        表 = pd.DataFrame({
+            m: np.ones(len(df)) if m == '订单数' else df[m].to_numpy(dtype=float)
+            for m in 度量
+        })
+        键 = [pd.to_datetime(df['订单日期']).dt.normalize().to_numpy()]
+        键 += [df[列名].astype(object).fillna('未知').to_numpy() for 列名 in 维度]
+        日汇总 = 表.groupby(键).sum()
+        if 维度:
+            日汇总 = 日汇总.unstack(list(range(1, len(维度) + 1)), fill_value=0)
+            日汇总.columns = 日汇总.columns.set_names(['度量', *维度])
+        return cls.从日汇总构建(日汇总)
+
+    @classmethod
+    def 从日汇总构建(cls, 日汇总):
+        """由已按天汇总的结果构建（如销售立方体的按日期切片），补齐没有订单的日期"""
+        日汇总 = 日汇总.copy()
+        日汇总.index = pd.to_datetime(日汇总.index).normalize()
+        日汇总 = 日汇总[日汇总.index.notna()]
+        if not len(日汇总):
+            return cls(日汇总)
+        日期轴 = pd.date_range(日汇总.index.min(), 日汇总.index.max(), freq='D', name='日期')
+        return cls(日汇总.groupby(level=0).sum().reindex(日期轴, fill_value=0))
+
+    def 汇总(self, 粒度='M'):
+        """按 日(D)、周(W)、月(M)、季(Q) 汇总，索引为对应的 PeriodIndex"""
+        if 粒度 not in 粒度名称:
+            raise ValueError(f"不支持的粒度: {粒度}，可选 {list(粒度名称)}")
+        return self.日数据.groupby(self.日数据.index.to_period(粒度)).sum()
+
+    def 滚动(self, 天数=7, 方式='sum'):
+        """按天的滚动窗口合计 (sum) 或日均 (mean)，窗口未满的日期为 NaN"""
+        return self.日数据.rolling(天数, min_periods=天数).agg(方式)
+
+    def 环比(self, 粒度='M'):
+        """相邻周期的增长率 (%)，上期为0时为 NaN"""
+        周期汇总 = self.汇总(粒度)
+        return self._增长率(周期汇总, 周期汇总.shift(1))
+
+    def 同比(self, 粒度='M'):
+        """与上一年同一周期相比的增长率 (%)，没有上年数据时为 NaN"""
+        周期汇总 = self.汇总(粒度)
+        上年 = 周期汇总.reindex(周期汇总.index - 每年周期数[粒度]).set_axis(周期汇总.index)
+        return self._增长率(周期汇总, 上年)
+
+    @staticmethod
+    def _增长率(本期, 上期):
+        return ((本期 / 上期.where(上期 != 0) - 1) * 100).round(2)
@@ -0,0 +1,58 @@
+# sales_dashboard/analysis/validation_rules.py
+import numpy as np
+import pandas as pd
+
+# 各产品的合理单价区间（审查、清洗、验证共用同一份规则）
+合理价格范围 = {
+    '智能手机': (1000, 10000),
+    '笔记本电脑': (3000, 20000),
+    '平板电脑': (1000, 8000),
+    '智能手表': (500, 5000),
+    '耳机': (50, 2000)
+}
+# 不在上表中的产品类别只检查明显离谱的价格
+未知产品价格范围 = (0, 100000)
+
+数量上限 = 20  # 单笔订单数量不应超过20
+计算误差 = 0.01
+
+def 价格区间(产品类别):
+    """按产品类别返回每行的 (最低价数组, 最高价数组)，未知类别使用宽松区间"""
+    代码, 取值 = pd.factorize(产品类别)
+    # 末尾追加未知类别的区间，空值的代码 -1 正好取到它
+    区间 = [合理价格范围.get(产品, 未知产品价格范围) for 产品 in 取值] + [未知产品价格范围]
+    最低价 = np.array([低 for 低, _ in 区间], dtype=float)
+    最高价 = np.array([高 for _, 高 in 区间], dtype=float)
+    return 最低价[代码], 最高价[代码]
+
+def 执行校验(df):
+    """单次扫描数据集，返回 (各规则的行掩码, 各列缺失数)
+
+    行掩码为与 df 等长的布尔数组，True 表示该行违反规则；不修改传入的 DataFrame。
+    """
+    单价 = df['单价'].to_numpy(dtype=float)
+    数量 = df['数量'].to_numpy(dtype=float)
+    销售额 = df['销售额'].to_numpy(dtype=float)
+
+    最低价, 最高价 = 价格区间(df['产品类别'])
+    缺失表 = df.isna()
+
+    掩码 = {
+        '价格异常': (单价 < 最低价) | (单价 > 最高价),
+        '数量异常': 数量 > 数量上限,
+        '计算错误': np.abs(销售额 - 单价 * 数量) > 计算误差,
+        '缺失值': 缺失表.to_numpy().any(axis=1),
+        '重复订单': df['订单ID'].duplicated().to_numpy(),
+    }
+    return 掩码, 缺失表.sum()
+
+def 异常统计(各规则位置, 行数):
+    """由各规则命中的行位置计算 (各规则条数, 并集条数, 重叠条数)
+
+    重叠指同时命中两条及以上规则的行；只做计数，不复制任何数据行。
+    """
+    命中次数 = np.zeros(行数, dtype=np.int16)
+    for 位置 in 各规则位置.values():
+        命中次数[位置] += 1
+    各规则条数 = {规则名: len(位置) for 规则名, 位置 in 各规则位置.items()}
+    return 各规则条数, int(np.count_nonzero(命中次数)), int(np.count_nonzero(命中次数 > 1))
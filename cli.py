@@ -0,0 +1,87 @@
+# sales_dashboard/cli.py
+"""销售数据系统的统一命令行入口
+
+各子命令只在运行时才导入对应模块，pandas、matplotlib 等重型库只由需要它们的子命令加载：
+    python cli.py verify                  # 只依赖 sqlite3，适合定时健康检查
+    python cli.py clean --incremental     # 子命令之后的参数原样交给对应脚本
+    python cli.py --import-report review  # 结束后输出各模块的导入耗时
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+import subprocess
+
+项目目录 = os.path.dirname(os.path.abspath(__file__))
+
+# 子命令 -> (所在目录, 模块名, 说明)
+子命令表 = {
+    'init': ('scripts', 'initialize_database', "创建数据库并生成测试数据"),
+    'verify': ('scripts', 'verify_data', "检查数据库表和记录数"),
+    'review': ('analysis', 'data_review', "数据质量审查"),
+    'clean': ('analysis', 'data_cleaning', "数据清洗（全量/增量/分块/并行）"),
+    'analyze': ('analysis', 'business_analysis', "业务分析、报告和图表"),
+    'pipeline': ('analysis', 'pipeline', "审查、清洗、分析的完整刷新流水线"),
+}
+看板脚本 = os.path.join(项目目录, 'streamlit_app', 'sales_dashboard.py')
+
+# 导入耗时报告中单独列出的重型库
+重型库 = ['pandas', 'numpy', 'pyarrow', 'matplotlib', 'plotly', 'streamlit']
+导入记录 = []
+
+def 导入模块(目录, 模块名):
+    """把模块所在目录加入搜索路径后导入，并记录耗时和新加载的重型库"""
+    路径 = os.path.join(项目目录, 目录)
+    if 路径 not in sys.path:
+        sys.path.insert(0, 路径)
+
+    已加载 = set(sys.modules)
+    开始 = time.perf_counter()
+    模块 = importlib.import_module(模块名)
+    耗时 = time.perf_counter() - 开始
+    导入记录.append((模块名, 耗时, [库 for 库 in 重型库 if 库 in sys.modules and 库 not in 已加载]))
+    return 模块
+
+def 输出导入报告(总耗时):
+    """输出各模块的导入耗时（更细的明细可用 python -X importtime cli.py ...）"""
+    print("\n⏱️  导入耗时报告:", file=sys.stderr)
+    for 模块名, 耗时, 新加载 in 导入记录:
+        附注 = f" (加载 {', '.join(新加载)})" if 新加载 else ""
+        print(f"  {模块名}: {耗时 * 1000:.0f} ms{附注}", file=sys.stderr)
+    已加载 = [库 for 库 in 重型库 if 库 in sys.modules]
+    print(f"  已加载的重型库: {', '.join(已加载) if 已加载 else '无'}", file=sys.stderr)
+    print(f"  子命令总耗时: {总耗时:.2f} 秒", file=sys.stderr)
+
+def 运行看板(参数列表):
+    """在子进程中启动 Streamlit 看板（当前进程不导入 streamlit）"""
+    return subprocess.call([sys.executable, '-m', 'streamlit', 'run', 看板脚本, *参数列表], cwd=项目目录)
+
+def 主要(参数列表=None):
+    parser = argparse.ArgumentParser(description="销售数据系统命令行工具")
+    parser.add_argument('--import-report', action='store_true', help="结束后输出各模块的导入耗时")
+    子命令 = parser.add_subparsers(dest='命令', required=True, metavar='命令')
+    # 子命令不处理参数（包括 -h），全部交给对应脚本自己的参数解析
+    for 名称, (_, _, 说明) in 子命令表.items():
+        子命令.add_parser(名称, help=说明, add_help=False)
+    子命令.add_parser('dashboard', help="启动 Streamlit 看板", add_help=False)
+    参数, 剩余参数 = parser.parse_known_args(参数列表)
+
+    开始 = time.perf_counter()
+    if 参数.命令 == 'dashboard':
+        结果 = 运行看板(剩余参数)
+    else:
+        目录, 模块名, _ = 子命令表[参数.命令]
+        模块 = 导入模块(目录, 模块名)
+        结果 = 模块.主要(剩余参数) if 参数.命令 != 'init' else 模块.主要()
+
+    if 参数.import_report:
+        输出导入报告(time.perf_counter() - 开始)
+
+    # verify 返回 False、看板返回非零退出码时以失败状态退出，便于定时任务判断
+    if isinstance(结果, bool):
+        return 0 if 结果 else 1
+    return 结果 if isinstance(结果, int) else 0
+
+if __name__ == "__main__":
+    sys.exit(主要())
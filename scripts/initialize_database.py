@@ -102,7 +102,8 @@ def 生成真实测试数据(conn):
     return records
 
 # 执行初始化
-if __name__ == "__main__":
+def 主要():
+    """命令行入口（也由 cli.py 调用）"""
     print("=== 开始环境搭建 ===")
     conn = 创建数据库结构()
     生成真实测试数据(conn)
@@ -113,4 +114,7 @@ if __name__ == "__main__":
     print(df)
     
     conn.close()
-    print("🎉 环境搭建完成!")
\ No newline at end of file
+    print("🎉 环境搭建完成!")
+
+if __name__ == "__main__":
+    主要()
@@ -1,12 +1,13 @@
 # sales_dashboard/scripts/verify_data.py
 import sqlite3
-import pandas as pd
+import argparse
 import os
 
-def 验证数据():
+def 验证数据(数据库路径=None):
+    """检查数据库文件、各表记录数和数据样本（只依赖 sqlite3，适合定时健康检查）"""
     # 使用绝对路径
     项目根路径 = "/Users/ruimantan/Desktop/作品集/销售数据分析看板/企业销售决策支持系统/sales_dashboard"
-    数据库路径 = os.path.join(项目根路径, 'data', 'sales.db')
+    数据库路径 = 数据库路径 or os.path.join(项目根路径, 'data', 'sales.db')
     
     print(f"🔍 检查数据库路径: {数据库路径}")
     print(f"📁 文件是否存在: {os.path.exists(数据库路径)}")
@@ -20,18 +21,20 @@ def 验证数据():
         print("✅ 数据库连接成功!")
         
         # 检查表结构
-        tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table'", conn)
-        print("✅ 数据库表:", list(tables['name']))
+        tables = [行[0] for 行 in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        print("✅ 数据库表:", tables)
         
         # 检查数据量
-        for table in tables['name']:
-            count = pd.read_sql(f"SELECT COUNT(*) as 记录数 FROM {table}", conn)
-            print(f"✅ {table}: {count.iloc[0,0]} 条记录")
+        for table in tables:
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"✅ {table}: {count} 条记录")
         
         # 查看数据样本
         print("\n📊 销售数据样本:")
-        sample = pd.read_sql("SELECT * FROM 产品销售 ORDER BY RANDOM() LIMIT 3", conn)
-        print(sample)
+        cursor = conn.execute("SELECT * FROM 产品销售 ORDER BY RANDOM() LIMIT 3")
+        print("  ".join(列[0] for 列 in cursor.description))
+        for 行 in cursor:
+            print("  ".join(str(值) for 值 in 行))
         
         conn.close()
         print("🎉 数据验证完成!")
@@ -41,5 +44,12 @@ def 验证数据():
         print(f"❌ 错误: {e}")
         return False
 
+def 主要(参数列表=None):
+    """命令行入口（也由 cli.py 调用）"""
+    parser = argparse.ArgumentParser(description="验证销售数据库")
+    parser.add_argument('--db', default=None, help="数据库路径（默认使用项目目录下的 data/sales.db）")
+    参数 = parser.parse_args(参数列表)
+    return 验证数据(参数.db)
+
 if __name__ == "__main__":
-    验证数据()
\ No newline at end of file
+    主要()
\ No newline at end of file
@@ -0,0 +1,204 @@
+# sales_dashboard/streamlit_app/data_access.py
+import os
+import io
+import sys
+import gzip
+import sqlite3
+import pandas as pd
+from datetime import date, timedelta
+
+# 与分析脚本共享的模块位于 analysis 目录
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+from compact_frame import 压缩数据框
+# 清洗表及其二级索引由清洗脚本定义（订单日期索引同时服务明细表的键集分页）
+from cleaned_table import 清洗表, 创建清洗表索引
+from aggregate_store import 创建版本触发器
+
+数据库路径 = "data/sales.db"
+
+def 数据版本(数据库路径=数据库路径):
+    """返回数据库的版本标识：数据库文件及其WAL日志的修改时间和大小"""
+    版本 = []
+    for 路径 in (数据库路径, 数据库路径 + "-wal"):
+        try:
+            状态 = os.stat(路径)
+        except FileNotFoundError:
+            continue
+        版本.append((状态.st_mtime_ns, 状态.st_size))
+    return tuple(版本)
+
+def _预处理(df):
+    """统一的数据预处理：解析订单日期"""
+    df['订单日期'] = pd.to_datetime(df['订单日期'])
+    return df
+
+def 读取清洗数据(数据库路径=数据库路径, 最大行号=None):
+    """从数据库读取清洗后的全部数据，转换为紧凑的内存表示并按订单日期排序
+
+    指定最大行号时只读取 rowid 不超过该值的记录，用于与增量刷新的水位对齐。
+    """
+    条件 = "" if 最大行号 is None else " WHERE rowid <= ?"
+    conn = sqlite3.connect(数据库路径)
+    df = pd.read_sql(f"SELECT * FROM {清洗表}{条件}", conn,
+                     params=[] if 最大行号 is None else [最大行号])
+    conn.close()
+
+    # 按 (订单日期, 订单ID) 排序，日期范围过滤可以直接二分查找
+    df = 压缩数据框(df).sort_values(['订单日期', '订单ID'], kind='stable', ignore_index=True)
+
+    return df
+
+def 日期范围切片(df, 开始日期, 结束日期):
+    """在按订单日期排序的数据上二分查找日期范围，返回不复制数据的位置切片"""
+    开始 = df['订单日期'].searchsorted(pd.Timestamp(开始日期), side='left')
+    结束 = df['订单日期'].searchsorted(pd.Timestamp(结束日期) + pd.Timedelta(days=1), side='left')
+    return df.iloc[开始:结束]
+
+def 确保索引(数据库路径=数据库路径):
+    """为过滤字段创建索引和清洗表的版本触发器（已存在时不做任何写入）"""
+    conn = sqlite3.connect(数据库路径)
+    创建清洗表索引(conn)
+    创建版本触发器(conn, 清洗表)
+    conn.commit()
+    conn.close()
+
+def 读取过滤选项(数据库路径=数据库路径):
+    """从数据库读取侧边栏过滤器的可选值（日期范围和各维度取值）"""
+    conn = sqlite3.connect(数据库路径)
+    最早日期, 最晚日期 = conn.execute(
+        f"SELECT MIN(订单日期), MAX(订单日期) FROM {清洗表}"
+    ).fetchone()
+
+    # 同一姓名可能对应多个销售员ID，映射到全部ID，SQL过滤与按姓名过滤的立方体结果一致
+    销售员ID = {}
+    for 姓名, 编号 in conn.execute(
+        f"SELECT DISTINCT 销售员姓名, 销售员ID FROM {清洗表} WHERE 销售员姓名 IS NOT NULL ORDER BY 销售员ID"
+    ):
+        销售员ID.setdefault(姓名, []).append(编号)
+    选项 = {
+        '日期范围': (date.fromisoformat(最早日期[:10]), date.fromisoformat(最晚日期[:10])),
+        '销售员ID': 销售员ID,
+    }
+    for 列名 in ['销售员姓名', '产品类别', '区域']:
+        选项[列名] = sorted(
+            行[0] for 行 in conn.execute(
+                f"SELECT DISTINCT {列名} FROM {清洗表} WHERE {列名} IS NOT NULL"
+            )
+        )
+    conn.close()
+
+    return 选项
+
+def 构建过滤条件SQL(过滤条件, 销售员ID映射):
+    """将侧边栏选择转换为参数化的WHERE子句，返回 (SQL片段, 参数列表)"""
+    子句 = []
+    参数 = []
+
+    # 日期过滤（右开区间，兼容带时间部分的日期字符串）
+    日期范围 = 过滤条件.get('日期范围')
+    if 日期范围 and len(日期范围) == 2:
+        子句.append("订单日期 >= ? AND 订单日期 < ?")
+        参数 += [日期范围[0].isoformat(), (日期范围[1] + timedelta(days=1)).isoformat()]
+
+    # 销售员过滤（走销售员ID索引，每个姓名展开为它的全部ID）
+    if 过滤条件.get('销售员'):
+        销售员ID = [编号 for 姓名 in 过滤条件['销售员'] for 编号 in 销售员ID映射.get(姓名, [])]
+        子句.append(f"销售员ID IN ({','.join('?' * len(销售员ID)) or 'NULL'})")
+        参数 += 销售员ID
+
+    # 产品和区域过滤
+    for 条件键, 列名 in [('产品类别', '产品类别'), ('区域', '区域')]:
+        if 过滤条件.get(条件键):
+            子句.append(f"{列名} IN ({','.join('?' * len(过滤条件[条件键]))})")
+            参数 += list(过滤条件[条件键])
+
+    where = (" WHERE " + " AND ".join(子句)) if 子句 else ""
+    return where, 参数
+
+def 分块读取过滤数据(过滤条件, 销售员ID映射, 块大小=50000, 数据库路径=数据库路径):
+    """在SQLite中执行过滤，并按块逐批产出满足条件的原始记录"""
+    where, 参数 = 构建过滤条件SQL(过滤条件, 销售员ID映射)
+
+    conn = sqlite3.connect(数据库路径)
+    try:
+        yield from pd.read_sql(f"SELECT * FROM {清洗表}{where}", conn, params=参数, chunksize=块大小)
+    finally:
+        conn.close()
+
+def 分块切分数据框(df, 块大小=50000):
+    """按块逐批产出内存中的数据（位置切片，不复制整表）"""
+    for 开始 in range(0, len(df), 块大小):
+        yield df.iloc[开始:开始 + 块大小]
+
+# 明细表可用的排序字段，均以订单ID作为次级排序键保证顺序唯一
+明细排序字段 = ['订单日期', '销售额', '单价', '数量']
+
+def 查询明细页(过滤条件, 销售员ID映射, 游标=None, 页大小=50, 排序列='订单日期', 降序=False,
+             数据库路径=数据库路径):
+    """按 (排序列, 订单ID) 做键集分页，只从数据库读取当前页的记录
+
+    游标为上一页最后一行的 (排序列值, 订单ID)，None 表示第一页。
+    返回 (当前页数据, 下一页游标)，没有下一页时游标为 None。
+    """
+    if 排序列 not in 明细排序字段:
+        raise ValueError(f"不支持的排序字段: {排序列}")
+
+    where, 参数 = 构建过滤条件SQL(过滤条件, 销售员ID映射)
+    if 游标 is not None:
+        where += (" AND " if where else " WHERE ") + f"({排序列}, 订单ID) {'<' if 降序 else '>'} (?, ?)"
+        参数 = 参数 + list(游标)
+    方向 = "DESC" if 降序 else "ASC"
+
+    # 多取一行用于判断是否还有下一页
+    conn = sqlite3.connect(数据库路径)
+    df = pd.read_sql(
+        f"SELECT * FROM {清洗表}{where} ORDER BY {排序列} {方向}, 订单ID {方向} LIMIT ?",
+        conn, params=参数 + [页大小 + 1]
+    )
+    conn.close()
+
+    下一游标 = None
+    if len(df) > 页大小:
+        df = df.iloc[:页大小]
+        下一游标 = (df[排序列].iloc[-1], df['订单ID'].iloc[-1])
+        下一游标 = tuple(v.item() if hasattr(v, 'item') else v for v in 下一游标)
+
+    return _预处理(df), 下一游标
+
+# 导出格式: 显示名称 -> (文件扩展名, MIME类型)
+导出格式 = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip压缩)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+def 写入导出文件(数据块, 文件对象, 格式):
+    """将数据块逐块写入二进制文件对象，任何时刻只有一个数据块在内存中"""
+    if 格式 == 'Parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet导出需要安装pyarrow")
+
+        writer = None
+        for 块 in 数据块:
+            if writer is None:
+                表 = pa.Table.from_pandas(块, preserve_index=False)
+                writer = pq.ParquetWriter(文件对象, 表.schema, compression='snappy')
+            else:
+                表 = pa.Table.from_pandas(块, schema=writer.schema, preserve_index=False)
+            writer.write_table(表)
+        if writer is not None:
+            writer.close()
+        return
+
+    # CSV: 只在第一个数据块写表头，gzip格式边写边压缩
+    二进制输出 = gzip.GzipFile(fileobj=文件对象, mode='wb') if 格式 == 'CSV (gzip压缩)' else 文件对象
+    文本输出 = io.TextIOWrapper(二进制输出, encoding='utf-8', newline='')
+    for i, 块 in enumerate(数据块):
+        块.to_csv(文本输出, index=False, header=(i == 0))
+    文本输出.flush()
+    文本输出.detach()
+    if 二进制输出 is not 文件对象:
+        二进制输出.close()
@@ -0,0 +1,112 @@
+# sales_dashboard/streamlit_app/live_data.py
+import sqlite3
+import threading
+import pandas as pd
+
+from data_access import 数据库路径, 清洗表, 读取清洗数据
+from sales_cube import 读取汇总记录, 构建销售立方体, 构建区间索引
+from compact_frame import 压缩数据框, 分类列
+
+class 实时数据集:
+    """实时刷新模式下常驻内存的数据：按 rowid 水位增量追加新订单
+
+    - 立方体和区间索引在创建时构建，之后只累加新增订单
+    - 明细DataFrame在首次需要时才加载（SQL下推模式不会加载）
+    - 表被重建（schema_version 变化）或有记录被删除/替换时退回全量加载
+    - 原地 UPDATE 不改变 rowid 和记录数，无法被水位察觉，需要关闭再开启实时刷新
+    """
+
+    def __init__(self, 数据库路径=数据库路径):
+        self.数据库路径 = 数据库路径
+        self.序号 = 0  # 每次数据变化加一，供各会话判断是否需要重新渲染
+        self._锁 = threading.Lock()
+        self._全量加载()
+
+    def _读取表状态(self, conn):
+        """返回 (schema_version, 最大rowid, 记录数)"""
+        模式版本 = conn.execute("PRAGMA schema_version").fetchone()[0]
+        最大行号, 记录数 = conn.execute(f"SELECT MAX(rowid), COUNT(*) FROM {清洗表}").fetchone()
+        return 模式版本, 最大行号 or 0, 记录数
+
+    def _水位订单(self, conn, 行号):
+        """水位所在行的订单ID，用于发现末尾记录被删除后 rowid 被复用的情况"""
+        行 = conn.execute(f"SELECT 订单ID FROM {清洗表} WHERE rowid = ?", [行号]).fetchone()
+        return 行[0] if 行 else None
+
+    def _全量加载(self):
+        """重新读取表状态并构建立方体和区间索引，明细数据延迟到需要时加载"""
+        conn = sqlite3.connect(self.数据库路径)
+        self.模式版本, self.水位, self.记录数 = self._读取表状态(conn)
+        self.水位订单 = self._水位订单(conn, self.水位)
+        conn.close()
+
+        汇总记录 = 读取汇总记录(self.数据库路径, 最大行号=self.水位)
+        self.立方体 = 构建销售立方体(汇总记录=汇总记录)
+        self.区间索引 = 构建区间索引(汇总记录=汇总记录)
+        self._数据框 = None
+        self.序号 += 1
+
+    def 数据框(self):
+        """返回与立方体同一水位的明细数据（按订单日期排序）"""
+        with self._锁:
+            if self._数据框 is None:
+                self._数据框 = 读取清洗数据(self.数据库路径, 最大行号=self.水位)
+            return self._数据框
+
+    def 刷新(self):
+        """拉取水位之后新增的订单并增量更新，返回新增记录数（全量重载时返回 None）"""
+        with self._锁:
+            conn = sqlite3.connect(self.数据库路径)
+            模式版本, 最大行号, 记录数 = self._读取表状态(conn)
+
+            # 表被重建、记录减少或水位行被替换：无法增量处理
+            if (模式版本 != self.模式版本 or 最大行号 < self.水位
+                    or self._水位订单(conn, self.水位) != self.水位订单):
+                conn.close()
+                self._全量加载()
+                return None
+
+            if 最大行号 == self.水位 and 记录数 == self.记录数:
+                conn.close()
+                return 0
+
+            新行 = pd.read_sql(
+                f"SELECT * FROM {清洗表} WHERE rowid > ? AND rowid <= ?",
+                conn, params=[self.水位, 最大行号]
+            )
+            水位订单 = self._水位订单(conn, 最大行号)
+            conn.close()
+
+            # 记录数对不上说明有旧记录被删除或替换，旧值已不可得，只能全量重载
+            if 记录数 != self.记录数 + len(新行):
+                self._全量加载()
+                return None
+
+            self.立方体.累加明细(新行)
+            self.区间索引.累加(新行)
+            if self._数据框 is not None:
+                self._数据框 = self._追加明细(self._数据框, 新行)
+            self.水位, self.记录数, self.水位订单 = 最大行号, 记录数, 水位订单
+            self.序号 += 1
+
+            return len(新行)
+
+    def _追加明细(self, df, 新行):
+        """把新增订单并入已排序的明细数据"""
+        新行 = 压缩数据框(新行)
+
+        # 对齐分类取值，新取值追加在末尾，已有数据的编码不变（浅拷贝，不修改共享的旧数据）
+        df = df.copy(deep=False)
+        for 列名 in 分类列:
+            if 列名 in df.columns:
+                新取值 = 新行[列名].cat.categories.difference(df[列名].cat.categories)
+                if len(新取值):
+                    df[列名] = df[列名].cat.add_categories(新取值)
+                新行[列名] = 新行[列名].astype(df[列名].dtype)
+
+        # 新订单通常晚于已有数据，直接拼接即可保持有序；否则重新排序
+        合并 = pd.concat([df, 新行], ignore_index=True)
+        if not 合并['订单日期'].is_monotonic_increasing:
+            合并 = 合并.sort_values(['订单日期', '订单ID'], kind='stable', ignore_index=True)
+
+        return 合并
@@ -0,0 +1,111 @@
+# sales_dashboard/streamlit_app/perf_monitor.py
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+# 每个会话保留的历史采样数
+历史上限 = 100
+
+# tracemalloc 是进程级的，各会话共用：按开启内存记录的会话数计数，最后一个会话关闭内存记录时才停止跟踪
+# （会话在开启状态下直接断开时不会注销，跟踪保持到进程结束）
+_跟踪锁 = threading.Lock()
+_跟踪会话数 = 0
+_由本模块启动 = False
+
+def _设置内存跟踪(需要):
+    """登记或注销当前会话对内存跟踪的使用（每个会话最多登记一次）"""
+    global _跟踪会话数, _由本模块启动
+    if st.session_state.get('_使用内存跟踪', False) == 需要:
+        return
+    with _跟踪锁:
+        if 需要:
+            if _跟踪会话数 == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _由本模块启动 = True
+            _跟踪会话数 += 1
+        else:
+            _跟踪会话数 -= 1
+            # 只停止由这里启动的跟踪（进程以 PYTHONTRACEMALLOC 等方式启动的跟踪不受影响）
+            if _跟踪会话数 == 0 and _由本模块启动:
+                tracemalloc.stop()
+                _由本模块启动 = False
+    st.session_state['_使用内存跟踪'] = 需要
+
+class 性能记录器:
+    """记录一次页面运行中各阶段的耗时和（可选的）内存峰值
+
+    内存峰值按进程统计，多个会话同时运行时会包含其他会话的分配。
+    """
+
+    def __init__(self, 启用=False, 记录内存=False, 日志路径=None):
+        self.启用 = 启用
+        self.记录内存 = 启用 and 记录内存
+        self.日志路径 = 日志路径
+        self.阶段 = []
+        self._开始 = time.perf_counter()
+
+        _设置内存跟踪(self.记录内存)
+
+    @contextmanager
+    def 计时(self, 阶段名):
+        """统计代码块的耗时；开启内存记录时同时统计该阶段的Python内存分配峰值"""
+        if not self.启用:
+            yield
+            return
+
+        if self.记录内存:
+            tracemalloc.reset_peak()
+            起始内存 = tracemalloc.get_traced_memory()[0]
+        开始 = time.perf_counter()
+        try:
+            yield
+        finally:
+            记录 = {'阶段': 阶段名, '耗时(ms)': round((time.perf_counter() - 开始) * 1000, 2)}
+            if self.记录内存:
+                记录['内存峰值(KB)'] = round((tracemalloc.get_traced_memory()[1] - 起始内存) / 1024, 1)
+            self.阶段.append(记录)
+
+    def 完成(self):
+        """结束本次运行：生成采样，写入会话历史并按需追加到JSONL日志"""
+        if not self.启用:
+            return None
+
+        采样 = {
+            '时间': datetime.now().isoformat(timespec='seconds'),
+            '总耗时(ms)': round((time.perf_counter() - self._开始) * 1000, 2),
+            '阶段': self.阶段,
+        }
+
+        历史 = st.session_state.setdefault('性能历史', [])
+        历史.append(采样)
+        del 历史[:-历史上限]
+
+        if self.日志路径:
+            with open(self.日志路径, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(采样, ensure_ascii=False) + "\n")
+
+        return 采样
+
+def 显示性能面板(容器, 采样):
+    """在给定容器中展示本次运行的阶段耗时和会话内的历史趋势"""
+    if 采样 is None:
+        return
+
+    with 容器:
+        st.write(f"本次运行总耗时: {采样['总耗时(ms)']} ms")
+        st.dataframe(pd.DataFrame(采样['阶段']), hide_index=True, use_container_width=True)
+
+        历史 = st.session_state.get('性能历史', [])
+        if len(历史) > 1:
+            趋势 = pd.DataFrame([
+                {'运行': i + 1, **{记录['阶段']: 记录['耗时(ms)'] for 记录 in 样本['阶段']}}
+                for i, 样本 in enumerate(历史)
+            ]).set_index('运行')
+            st.caption(f"最近 {len(历史)} 次运行各阶段耗时 (ms)")
+            st.line_chart(趋势)
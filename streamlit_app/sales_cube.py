@@ -0,0 +1,228 @@
+# sales_dashboard/streamlit_app/sales_cube.py
+import sqlite3
+import numpy as np
+import pandas as pd
+
+from data_access import 数据库路径, 清洗表
+from range_index import 区间索引
+
+# 立方体的维度轴（第一个轴固定为按天的日期轴）和度量
+维度列 = ['订单日期', '销售员姓名', '产品类别', '区域', '客户类型']
+度量列 = ['销售额', '订单数', '数量', '单价']
+
+def 编码维度(df, 维度列表):
+    """将维度列编码为从0开始的整数代码，返回 (代码字典, 取值字典)"""
+    编码 = {}
+    取值 = {}
+    for 列名 in 维度列表:
+        代码, 唯一值 = pd.factorize(df[列名].fillna('未知'), sort=True)
+        编码[列名] = 代码
+        取值[列名] = np.asarray(唯一值, dtype=object)
+    return 编码, 取值
+
+def 稠密聚合(编码, 基数, 度量, 行数):
+    """按整数代码做一次 bincount 聚合，返回形状为 (各维度基数..., 度量数) 的稠密数组
+
+    编码: 各维度的整数代码数组列表；度量: {度量名: 权重数组}，权重为 None 表示计数
+    """
+    数据 = np.zeros(tuple(基数) + (len(度量),))
+    if 行数 == 0:
+        return 数据
+
+    平坦数据 = 数据.reshape(-1, len(度量))
+    平坦索引 = np.ravel_multi_index(编码, 基数) if 编码 else np.zeros(行数, dtype=np.intp)
+
+    for i, 权重 in enumerate(度量.values()):
+        平坦数据[:, i] = np.bincount(平坦索引, weights=权重, minlength=平坦数据.shape[0])
+
+    return 数据
+
+def 按规格归约(数据, 维度列表, 维度取值, 度量列表, 规格列表):
+    """从同一个细粒度稠密数组归约出多个面板的结果
+
+    规格列表: {面板名: (分组键元组, 度量元组)}，返回 {面板名: DataFrame}。
+    每个面板只保留订单数大于0的分组；同时请求了 单价 和 订单数 时附带 平均单价。
+    """
+    结果 = {}
+    for 面板名, (分组键, 度量) in 规格列表.items():
+        轴 = [维度列表.index(键) for 键 in 分组键]
+        其余轴 = tuple(i for i in range(len(维度列表)) if i not in 轴)
+        归约 = 数据.sum(axis=其余轴) if 其余轴 else 数据
+        # 按请求的分组键顺序排列剩余轴
+        归约 = np.moveaxis(归约, list(np.argsort(np.argsort(轴))), list(range(len(轴)))) if 轴 else 归约
+        平坦 = 归约.reshape(-1, len(度量列表))
+
+        if 分组键:
+            索引 = pd.MultiIndex.from_product([维度取值[键] for 键 in 分组键], names=list(分组键))
+            if len(分组键) == 1:
+                索引 = 索引.get_level_values(0)
+        else:
+            索引 = pd.RangeIndex(1)
+
+        表 = pd.DataFrame(平坦, index=索引, columns=度量列表)
+        表 = 表[表['订单数'] > 0].astype({'订单数': int})
+        列 = list(度量)
+        if '单价' in 度量 and '订单数' in 度量:
+            表['平均单价'] = 表['单价'] / 表['订单数']
+            列.append('平均单价')
+        结果[面板名] = 表[列]
+
+    return 结果
+
+class 销售立方体:
+    """日期 × 销售员 × 产品类别 × 区域 × 客户类型 的稠密预聚合立方体
+
+    每个单元格保存该组合下的 销售额合计、订单数、数量合计、单价合计，
+    立方体大小只取决于各维度的取值个数，与订单数量无关。
+    """
+
+    def __init__(self, 维度取值, 数据):
+        # 维度取值: {维度列: 取值数组}，日期轴为连续的 datetime64[D] 数组
+        self.维度取值 = 维度取值
+        # 数据: 形状为 (各维度基数..., 度量数) 的 float64 数组
+        self.数据 = 数据
+
+    @classmethod
+    def 从汇总记录构建(cls, 汇总记录):
+        """由 (维度列 + 度量列) 的汇总记录构建立方体，同一单元格的记录会被累加"""
+        维度取值 = {}
+        编码 = []
+
+        # 日期轴取连续的日期范围，便于按位置切片
+        日期 = pd.to_datetime(汇总记录['订单日期']).values.astype('datetime64[D]')
+        if len(日期):
+            日期轴 = np.arange(日期.min(), 日期.max() + 1)
+        else:
+            日期轴 = np.array([], dtype='datetime64[D]')
+        维度取值['订单日期'] = 日期轴
+        编码.append((日期 - 日期轴[0]).astype(np.int64) if len(日期) else np.array([], dtype=np.int64))
+
+        代码, 取值 = 编码维度(汇总记录, 维度列[1:])
+        维度取值.update(取值)
+        编码 += [代码[列名] for 列名 in 维度列[1:]]
+
+        基数 = [len(维度取值[列名]) for 列名 in 维度列]
+        度量 = {m: 汇总记录[m].fillna(0).to_numpy(dtype=float) for m in 度量列}
+        数据 = 稠密聚合(编码, 基数, 度量, len(汇总记录))
+
+        return cls(维度取值, 数据)
+
+    def 累加明细(self, 明细):
+        """把新增订单明细累加进立方体，出现新日期或新维度取值时扩展对应的轴
+
+        只对新增订单所在的单元格做散点累加，耗时与新增订单数成正比。
+        """
+        if not len(明细):
+            return
+
+        # 扩展日期轴（保持连续，前后按需补齐）
+        日期 = pd.to_datetime(明细['订单日期']).values.astype('datetime64[D]')
+        日期轴 = self.维度取值['订单日期']
+        起点 = min(日期.min(), 日期轴[0]) if len(日期轴) else 日期.min()
+        终点 = max(日期.max(), 日期轴[-1]) if len(日期轴) else 日期.max()
+        前补 = int((日期轴[0] - 起点).astype(int)) if len(日期轴) else 0
+        后补 = int((终点 - 起点).astype(int)) + 1 - len(日期轴) - 前补
+        self.数据 = np.pad(self.数据, [(前补, 后补)] + [(0, 0)] * (self.数据.ndim - 1))
+        self.维度取值['订单日期'] = np.arange(起点, 终点 + 1)
+        编码 = [(日期 - 起点).astype(np.int64)]
+
+        # 其余维度：新取值追加在末尾，已有取值的位置不变
+        for 轴, 列名 in enumerate(维度列[1:], start=1):
+            值 = pd.Index(明细[列名].astype(object).fillna('未知'))
+            取值 = pd.Index(self.维度取值[列名])
+            新值 = 值.unique().difference(取值)
+            if len(新值):
+                补齐 = [(0, 0)] * self.数据.ndim
+                补齐[轴] = (0, len(新值))
+                self.数据 = np.pad(self.数据, 补齐)
+                取值 = 取值.append(新值)
+                self.维度取值[列名] = np.asarray(取值, dtype=object)
+            编码.append(取值.get_indexer(值))
+
+        平坦索引 = np.ravel_multi_index(编码, self.数据.shape[:-1])
+        平坦数据 = self.数据.reshape(-1, len(度量列))
+        for i, 度量 in enumerate(度量列):
+            权重 = np.ones(len(明细)) if 度量 == '订单数' else 明细[度量].fillna(0).to_numpy(dtype=float)
+            np.add.at(平坦数据[:, i], 平坦索引, 权重)
+
+    def 切片(self, 过滤条件):
+        """按侧边栏过滤条件截取子立方体"""
+        索引 = []
+
+        # 日期范围：在有序日期轴上二分查找
+        日期轴 = self.维度取值['订单日期']
+        日期范围 = 过滤条件.get('日期范围')
+        if 日期范围 and len(日期范围) == 2:
+            开始 = np.searchsorted(日期轴, np.datetime64(日期范围[0], 'D'), side='left')
+            结束 = np.searchsorted(日期轴, np.datetime64(日期范围[1], 'D'), side='right')
+            索引.append(np.arange(开始, 结束))
+        else:
+            索引.append(np.arange(len(日期轴)))
+
+        for 列名, 条件键 in [('销售员姓名', '销售员'), ('产品类别', '产品类别'),
+                            ('区域', '区域'), ('客户类型', '客户类型')]:
+            取值 = self.维度取值[列名]
+            选中 = 过滤条件.get(条件键)
+            if 选中:
+                索引.append(np.flatnonzero(np.isin(取值, list(选中))))
+            else:
+                索引.append(np.arange(len(取值)))
+
+        新取值 = {列名: self.维度取值[列名][idx] for 列名, idx in zip(维度列, 索引)}
+        return 销售立方体(新取值, self.数据[np.ix_(*索引)])
+
+    def 多重汇总(self, 规格列表):
+        """一次性回答多个面板的聚合请求
+
+        先沿所有面板都不需要的维度归约一次，再从这份共享的中间结果得到各面板。
+        """
+        涉及维度 = list(dict.fromkeys(键 for 分组键, _ in 规格列表.values() for 键 in 分组键))
+        轴 = [维度列.index(键) for 键 in 涉及维度]
+        其余轴 = tuple(i for i in range(len(维度列)) if i not in 轴)
+        共享 = self.数据.sum(axis=其余轴) if 其余轴 else self.数据
+        共享 = np.moveaxis(共享, list(np.argsort(np.argsort(轴))), list(range(len(轴)))) if 轴 else 共享
+
+        return 按规格归约(共享, 涉及维度, self.维度取值, 度量列, 规格列表)
+
+    def KPI(self):
+        """核心KPI：总销售额、总订单数、平均订单金额、销售员数量"""
+        汇总 = self.多重汇总({
+            '合计': ((), ('销售额', '订单数')),
+            '销售员': (('销售员姓名',), ('订单数',)),
+        })
+        总销售额 = 汇总['合计']['销售额'].sum()
+        总订单数 = int(汇总['合计']['订单数'].sum())
+        return {
+            '总销售额': 总销售额,
+            '总订单数': 总订单数,
+            '平均订单金额': 总销售额 / 总订单数 if 总订单数 else 0,
+            '销售员数量': len(汇总['销售员']),
+        }
+
+def 读取汇总记录(数据库路径=数据库路径, 最大行号=None):
+    """在SQLite中按全部维度分组汇总（不读取明细订单）
+
+    指定最大行号时只汇总 rowid 不超过该值的记录，用于与增量刷新的水位对齐。
+    """
+    条件 = "" if 最大行号 is None else " WHERE rowid <= ?"
+    conn = sqlite3.connect(数据库路径)
+    汇总记录 = pd.read_sql(f"""
+        SELECT substr(订单日期, 1, 10) AS 订单日期, 销售员姓名, 产品类别, 区域, 客户类型,
+               SUM(销售额) AS 销售额, COUNT(*) AS 订单数, SUM(数量) AS 数量, SUM(单价) AS 单价
+        FROM {清洗表}{条件}
+        GROUP BY 1, 2, 3, 4, 5
+    """, conn, params=[] if 最大行号 is None else [最大行号])
+    conn.close()
+    return 汇总记录
+
+def 构建销售立方体(数据库路径=数据库路径, 最大行号=None, 汇总记录=None):
+    """由分组汇总记录构建立方体，未传入汇总记录时从数据库读取"""
+    if 汇总记录 is None:
+        汇总记录 = 读取汇总记录(数据库路径, 最大行号)
+    return 销售立方体.从汇总记录构建(汇总记录)
+
+def 构建区间索引(数据库路径=数据库路径, 最大行号=None, 汇总记录=None):
+    """由分组汇总记录构建按天的前缀和索引，用于任意日期区间的KPI和环比"""
+    if 汇总记录 is None:
+        汇总记录 = 读取汇总记录(数据库路径, 最大行号)
+    return 区间索引.从记录构建(汇总记录)
@@ -1,11 +1,22 @@
 # sales_dashboard/streamlit_app/sales_dashboard.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import os
+import tempfile
+from data_access import (数据库路径, 清洗表, 数据版本, 读取清洗数据, 日期范围切片, 确保索引, 读取过滤选项,
+                         分块读取过滤数据, 分块切分数据框, 查询明细页, 明细排序字段, 导出格式, 写入导出文件)
+from sales_cube import 构建销售立方体, 构建区间索引
+from live_data import 实时数据集
+from perf_monitor import 性能记录器, 显示性能面板
+from compact_frame import 内存报告
+from time_series import 时间序列
+from range_index import 变化率
+from sketches import 摘要存储, 合并摘要
 
 # 页面配置
 st.set_page_config(
@@ -39,28 +50,132 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(max_entries=2, show_spinner="正在加载销售数据...")
+def _缓存数据(数据库路径, 版本):
+    """按数据版本缓存清洗后的数据，版本不变时直接复用内存中的DataFrame"""
+    return 读取清洗数据(数据库路径)
+
 def 获取数据():
-    """从数据库获取清洗后的数据"""
-    数据库路径 = "data/sales.db"
-    conn = sqlite3.connect(数据库路径)
-    df = pd.read_sql("SELECT * FROM 产品销售_清洗后", conn)
-    conn.close()
-    
-    # 数据预处理
-    df['订单日期'] = pd.to_datetime(df['订单日期'])
-    df['年月'] = df['订单日期'].dt.to_period('M')
+    """从数据库获取清洗后的数据（仅在数据表发生变化时重新读取）"""
+    return _缓存数据(数据库路径, 数据版本(数据库路径))
+
+@st.cache_resource(max_entries=2)
+def _缓存过滤选项(数据库路径, 版本):
+    """按数据版本缓存过滤器可选值"""
+    return 读取过滤选项(数据库路径)
+
+def 获取过滤选项():
+    """获取侧边栏过滤器的可选值"""
+    # 先确保过滤字段的索引和版本触发器存在再计算版本：创建它们会改变数据库文件，
+    # 放在版本计算之后会让所有按版本缓存的数据在下一次运行时多重载一次（已存在时不写入）
+    确保索引(数据库路径)
+    return _缓存过滤选项(数据库路径, 数据版本(数据库路径))
+
+@st.cache_resource(max_entries=2, show_spinner="正在构建聚合立方体...")
+def _缓存销售立方体(数据库路径, 版本):
+    """按数据版本缓存预聚合立方体，所有图表和KPI都从立方体切片计算"""
+    return 构建销售立方体(数据库路径)
+
+def 获取销售立方体():
+    """获取当前数据版本的销售立方体"""
+    return _缓存销售立方体(数据库路径, 数据版本(数据库路径))
+
+@st.cache_resource(max_entries=2)
+def _缓存区间索引(数据库路径, 版本):
+    """按数据版本缓存按天的前缀和索引，KPI卡片的区间合计和环比由它回答"""
+    return 构建区间索引(数据库路径)
+
+def 获取区间索引():
+    """获取当前数据版本的区间索引"""
+    return _缓存区间索引(数据库路径, 数据版本(数据库路径))
+
+@st.cache_resource(max_entries=2, show_spinner="正在更新订单摘要...")
+def _缓存订单摘要(数据库路径, 版本):
+    """按数据版本缓存按天的订单摘要（磁盘上的摘要只在数据追加或重建时更新）"""
+    return 摘要存储(数据库路径).日摘要(清洗表)
+
+def 获取订单摘要():
+    """获取当前数据版本的按天订单摘要"""
+    return _缓存订单摘要(数据库路径, 数据版本(数据库路径))
+
+@st.cache_resource
+def 获取实时数据集(数据库路径=数据库路径):
+    """实时刷新模式使用的常驻数据集（所有会话共享，按水位增量更新）"""
+    return 实时数据集(数据库路径)
+
+def 实时刷新面板(数据集, 间隔):
+    """在侧边栏按固定间隔检查新订单，数据有变化时重新运行整个页面"""
+    @st.fragment(run_every=间隔)
+    def _检查新数据():
+        新增 = 数据集.刷新()
+        if 新增 is None:
+            st.caption(f"🕒 {datetime.now().strftime('%H:%M:%S')} 数据表已重建，已全量重新加载")
+        else:
+            st.caption(f"🕒 {datetime.now().strftime('%H:%M:%S')} 新增 {新增} 条订单")
+        
+        # 其他会话已经拉取过的更新同样需要重新渲染
+        if st.session_state.get('已显示数据序号') != 数据集.序号:
+            st.rerun()
     
-    return df
+    with st.sidebar:
+        _检查新数据()
+
+# 所有图表面板的聚合需求，由立方体一次性回答
+面板规格 = {
+    '销售趋势': (('订单日期',), ('销售额', '订单数')),
+    '销售团队': (('销售员姓名',), ('销售额', '订单数', '单价')),
+    '产品业绩': (('产品类别',), ('销售额', '订单数')),
+    '区域业绩': (('区域',), ('销售额', '订单数')),
+}
+
+def 区间KPI(索引, 立方体, 立方体切片, 过滤条件):
+    """所选日期区间的核心KPI，以及相对紧邻其前的等长区间的变化率 (%)
+
+    至多按一个维度过滤时由区间索引两次查询得到；同时过滤多个维度时
+    由立方体切出上期。销售员数量始终来自当前的立方体切片。
+    """
+    date_range = 过滤条件['日期范围']
+    if len(date_range) == 2:
+        开始, 结束 = (np.datetime64(日期, 'D') for 日期 in date_range)
+    else:
+        开始, 结束 = 索引.日期范围()
+    上期开始, 上期结束 = 开始 - (结束 - 开始 + 1), 开始 - 1
+
+    维度条件 = {列名: 过滤条件[条件键] for 条件键, 列名 in
+                [('销售员', '销售员姓名'), ('产品类别', '产品类别'), ('区域', '区域')] if 过滤条件[条件键]}
+    本期指标 = 立方体切片.KPI()
+    if len(维度条件) <= 1:
+        本期, 上期 = 索引.环比(开始, 结束, 维度条件)
+        上期 = {'总销售额': 上期['销售额'], '总订单数': 上期['订单数']}
+        本期指标.update({
+            '总销售额': 本期['销售额'],
+            '总订单数': int(本期['订单数']),
+            '平均订单金额': 本期['销售额'] / 本期['订单数'] if 本期['订单数'] else 0,
+        })
+    else:
+        上期 = 立方体.切片({**过滤条件, '日期范围': (上期开始, 上期结束)}).KPI()
+
+    上期平均 = 上期['总销售额'] / 上期['总订单数'] if 上期['总订单数'] else 0
+    变化 = {
+        '总销售额': 变化率(本期指标['总销售额'], 上期['总销售额']),
+        '总订单数': 变化率(本期指标['总订单数'], 上期['总订单数']),
+        '平均订单金额': 变化率(本期指标['平均订单金额'], 上期平均),
+    }
+    return 本期指标, 变化
 
-def 显示KPI指标(df):
-    """显示核心KPI指标卡片"""
+def 显示KPI指标(指标, 变化=None):
+    """显示核心KPI指标卡片（变化为相对上一等长区间的百分比，无上期数据时显示图标）"""
     st.markdown('<div class="main-header">📊 智能销售监控系统</div>', unsafe_allow_html=True)
     
-    # 计算核心指标
-    总销售额 = df['销售额'].sum()
-    总订单数 = len(df)
-    平均订单金额 = df['销售额'].mean()
-    销售员数量 = df['销售员姓名'].nunique()
+    # 核心指标
+    总销售额 = 指标['总销售额']
+    总订单数 = 指标['总订单数']
+    平均订单金额 = 指标['平均订单金额']
+    销售员数量 = 指标['销售员数量']
+    变化 = 变化 or {}
+    
+    def 变化说明(名称, 图标):
+        return f"{变化[名称]:+.1f}%" if 变化.get(名称) is not None else 图标
     
     # 创建指标列
     col1, col2, col3, col4 = st.columns(4)
@@ -69,21 +184,21 @@ def 显示KPI指标(df):
         st.metric(
             label="总销售额",
             value=f"¥{总销售额:,.0f}",
-            delta="📈"
+            delta=变化说明('总销售额', "📈")
         )
     
     with col2:
         st.metric(
             label="总订单数", 
             value=f"{总订单数}",
-            delta="📦"
+            delta=变化说明('总订单数', "📦")
         )
     
     with col3:
         st.metric(
             label="平均订单金额",
             value=f"¥{平均订单金额:,.0f}",
-            delta="💰"
+            delta=变化说明('平均订单金额', "💰")
         )
     
     with col4:
@@ -93,13 +208,12 @@ def 显示KPI指标(df):
             delta="👥"
         )
 
-def 侧边栏过滤器(df):
-    """创建侧边栏过滤器"""
+def 侧边栏过滤器(选项):
+    """创建侧边栏过滤器，返回过滤条件"""
     st.sidebar.title("🔧 数据过滤器")
     
     # 日期范围过滤
-    min_date = df['订单日期'].min().date()
-    max_date = df['订单日期'].max().date()
+    min_date, max_date = 选项['日期范围']
     
     date_range = st.sidebar.date_input(
         "选择日期范围",
@@ -109,7 +223,7 @@ def 侧边栏过滤器(df):
     )
     
     # 销售员多选
-    所有销售员 = ['全部'] + sorted(df['销售员姓名'].unique().tolist())
+    所有销售员 = ['全部'] + 选项['销售员姓名']
     选中销售员 = st.sidebar.multiselect(
         "选择销售员",
         所有销售员,
@@ -117,7 +231,7 @@ def 侧边栏过滤器(df):
     )
     
     # 产品类别过滤
-    所有产品 = ['全部'] + sorted(df['产品类别'].unique().tolist())
+    所有产品 = ['全部'] + 选项['产品类别']
     选中产品 = st.sidebar.multiselect(
         "选择产品类别",
         所有产品, 
@@ -125,84 +239,104 @@ def 侧边栏过滤器(df):
     )
     
     # 区域过滤
-    所有区域 = ['全部'] + sorted(df['区域'].unique().tolist())
+    所有区域 = ['全部'] + 选项['区域']
     选中区域 = st.sidebar.multiselect(
         "选择区域",
         所有区域,
         default=['全部']
     )
     
-    # 应用过滤
-    过滤后数据 = df.copy()
-    
-    # 日期过滤
+    # 选择"全部"或未选择时不过滤该维度
+    return {
+        '日期范围': tuple(date_range),
+        '销售员': [] if '全部' in 选中销售员 else 选中销售员,
+        '产品类别': [] if '全部' in 选中产品 else 选中产品,
+        '区域': [] if '全部' in 选中区域 else 选中区域,
+    }
+
+def 应用过滤(df, 过滤条件):
+    """在内存中按过滤条件筛选数据（df 需按订单日期排序）"""
+    # 日期过滤：二分查找得到位置切片，不逐行构造日期对象
+    date_range = 过滤条件['日期范围']
     if len(date_range) == 2:
-        过滤后数据 = 过滤后数据[
-            (过滤后数据['订单日期'].dt.date >= date_range[0]) & 
-            (过滤后数据['订单日期'].dt.date <= date_range[1])
-        ]
+        过滤后数据 = 日期范围切片(df, date_range[0], date_range[1])
+    else:
+        过滤后数据 = df
     
-    # 销售员过滤
-    if '全部' not in 选中销售员 and 选中销售员:
-        过滤后数据 = 过滤后数据[过滤后数据['销售员姓名'].isin(选中销售员)]
+    # 销售员、产品和区域过滤合并为一次布尔索引
+    mask = None
+    for 条件键, 列名 in [('销售员', '销售员姓名'), ('产品类别', '产品类别'), ('区域', '区域')]:
+        if 过滤条件[条件键]:
+            条件 = 过滤后数据[列名].isin(过滤条件[条件键])
+            mask = 条件 if mask is None else (mask & 条件)
     
-    # 产品过滤  
-    if '全部' not in 选中产品 and 选中产品:
-        过滤后数据 = 过滤后数据[过滤后数据['产品类别'].isin(选中产品)]
-    
-    # 区域过滤
-    if '全部' not in 选中区域 and 选中区域:
-        过滤后数据 = 过滤后数据[过滤后数据['区域'].isin(选中区域)]
+    if mask is not None:
+        过滤后数据 = 过滤后数据[mask]
     
     return 过滤后数据
 
-def 销售趋势分析(过滤后数据):
+# 趋势图可选的时间粒度
+趋势粒度 = {'日': 'D', '周': 'W', '月': 'M', '季': 'Q'}
+
+def 销售趋势分析(每日汇总):
     """销售趋势分析图表"""
     st.subheader("📈 销售趋势分析")
     
-    # 月度趋势
-    月度数据 = 过滤后数据.groupby(过滤后数据['订单日期'].dt.to_period('M')).agg({
-        '销售额': 'sum',
-        '订单ID': 'count'
-    }).reset_index()
-    月度数据['订单日期'] = 月度数据['订单日期'].astype(str)
+    # 由每日汇总构建按天的基础序列，任意粒度的汇总和滚动窗口只与天数有关
+    序列 = 时间序列.从日汇总构建(每日汇总[['销售额', '订单数']])
+    粒度 = st.radio("时间粒度", list(趋势粒度), index=2, horizontal=True)
+    周期数据 = 序列.汇总(趋势粒度[粒度])
+    周期数据.index = 周期数据.index.astype(str)
+    周期数据 = 周期数据.rename(columns={'订单数': '订单ID'}).rename_axis('订单日期').reset_index()
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # 销售额趋势
+        # 销售额趋势（按日查看时叠加 7/30 天滚动日均）
         fig_sales = px.line(
-            月度数据, 
+            周期数据, 
             x='订单日期', 
             y='销售额',
-            title='月度销售额趋势',
-            labels={'销售额': '销售额 (元)', '订单日期': '月份'}
+            title=f'按{粒度}销售额趋势',
+            labels={'销售额': '销售额 (元)', '订单日期': 粒度}
         )
         fig_sales.update_traces(line=dict(color='#1f77b4', width=3))
+        if 粒度 == '日':
+            for 天数, 颜色 in [(7, '#ff7f0e'), (30, '#2ca02c')]:
+                滚动 = 序列.滚动(天数, 'mean')['销售额']
+                fig_sales.add_trace(go.Scatter(
+                    x=滚动.index.strftime('%Y-%m-%d'), y=滚动, mode='lines',
+                    name=f'{天数}日滚动日均', line=dict(color=颜色, width=2)
+                ))
         st.plotly_chart(fig_sales, use_container_width=True)
     
     with col2:
         # 订单数趋势
         fig_orders = px.bar(
-            月度数据,
+            周期数据,
             x='订单日期',
             y='订单ID', 
-            title='月度订单数趋势',
-            labels={'订单ID': '订单数', '订单日期': '月份'}
+            title=f'按{粒度}订单数趋势',
+            labels={'订单ID': '订单数', '订单日期': 粒度}
         )
         fig_orders.update_traces(marker_color='#ff7f0e')
         st.plotly_chart(fig_orders, use_container_width=True)
+    
+    # 最近一个周期的环比和同比
+    if len(周期数据) > 1:
+        环比 = 序列.环比(趋势粒度[粒度])['销售额'].iloc[-1]
+        同比 = 序列.同比(趋势粒度[粒度])['销售额'].iloc[-1]
+        st.caption(
+            f"最近一{粒度}销售额环比: {'—' if pd.isna(环比) else f'{环比:+.2f}%'}，"
+            f"同比: {'数据不足一年' if pd.isna(同比) else f'{同比:+.2f}%'}"
+        )
 
-def 销售团队分析(过滤后数据):
+def 销售团队分析(销售员汇总):
     """销售团队表现分析"""
     st.subheader("👥 销售团队表现")
     
     # 销售员业绩排名
-    销售员业绩 = 过滤后数据.groupby('销售员姓名').agg({
-        '销售额': 'sum',
-        '订单ID': 'count',
-        '单价': 'mean'
-    }).round(2).sort_values('销售额', ascending=False)
+    销售员业绩 = 销售员汇总[['销售额', '订单数', '平均单价']].round(2).sort_values('销售额', ascending=False)
     
     col1, col2 = st.columns(2)
     
@@ -226,7 +360,7 @@ def 销售团队分析(过滤后数据):
         fig_bar.update_traces(marker_color='#2ca02c')
         st.plotly_chart(fig_bar, use_container_width=True)
 
-def 产品区域分析(过滤后数据):
+def 产品区域分析(产品汇总, 区域汇总):
     """产品和区域分析"""
     st.subheader("📦 产品与区域分析")
     
@@ -234,10 +368,7 @@ def 产品区域分析(过滤后数据):
     
     with col1:
         # 产品类别分析
-        产品业绩 = 过滤后数据.groupby('产品类别').agg({
-            '销售额': 'sum',
-            '订单ID': 'count'
-        }).sort_values('销售额', ascending=False)
+        产品业绩 = 产品汇总.sort_values('销售额', ascending=False)
         
         fig_products = px.bar(
             x=产品业绩.index,
@@ -249,10 +380,7 @@ def 产品区域分析(过滤后数据):
     
     with col2:
         # 区域销售分析
-        区域业绩 = 过滤后数据.groupby('区域').agg({
-            '销售额': 'sum',
-            '订单ID': 'count' 
-        }).sort_values('销售额', ascending=False)
+        区域业绩 = 区域汇总.sort_values('销售额', ascending=False)
         
         fig_regions = px.pie(
             values=区域业绩['销售额'],
@@ -261,16 +389,69 @@ def 产品区域分析(过滤后数据):
         )
         st.plotly_chart(fig_regions, use_container_width=True)
 
-def 详细数据表格(过滤后数据):
-    """显示详细数据表格"""
+def 订单分布分析(日摘要, 过滤条件):
+    """订单金额分位数和销售额 Top-5，由所选日期内的按天摘要合并得到，不读取明细订单"""
+    st.subheader("📐 订单金额分布（近似）")
+    
+    维度条件 = {列名: 过滤条件[条件键] for 条件键, 列名 in
+                [('销售员', '销售员姓名'), ('产品类别', '产品类别'), ('区域', '区域')] if 过滤条件[条件键]}
+    if len(维度条件) > 1:
+        st.info("近似分布只支持按单个维度过滤，请只保留销售员、产品类别、区域中的一个条件")
+        return
+    
+    date_range = 过滤条件['日期范围']
+    开始, 结束 = date_range if len(date_range) == 2 else (None, None)
+    摘要 = 合并摘要(日摘要, 开始, 结束, 维度条件)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    分位数 = 摘要.分位数()
+    for col, (名称, 值) in zip([col1, col2, col3], 分位数.items()):
+        col.metric(f"订单金额 {名称}", f"¥{值:,.0f}" if 摘要.金额.计数 else "-")
+    col4.metric("去重订单数", f"≈{摘要.订单.估计():,.0f}")
+    
+    col1, col2 = st.columns(2)
+    for col, (名称, 频繁) in zip([col1, col2], [('销售员', 摘要.销售员), ('产品类别', 摘要.产品)]):
+        前五 = 频繁.前N(5).rename_axis(名称).rename(columns={'计数': '销售额'})
+        col.dataframe(前五.round(2), use_container_width=True)
+
+def _翻页(游标):
+    """翻页按钮回调：游标为 None 表示返回上一页，否则前进到该游标对应的页"""
+    if 游标 is None:
+        st.session_state['明细游标栈'].pop()
+    else:
+        st.session_state['明细游标栈'].append(游标)
+
+def 详细数据表格(过滤条件, 销售员ID映射, 记录数):
+    """显示详细数据表格（服务端分页，只读取当前页）"""
     st.subheader("📋 详细数据")
     
+    # 分页与排序设置
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        页大小 = st.selectbox("每页行数", [20, 50, 100, 200], index=1)
+    with col2:
+        排序列 = st.selectbox("排序字段", 明细排序字段)
+    with col3:
+        降序 = st.toggle("降序排列")
+    
+    # 过滤、排序或数据变化时回到第一页
+    查询签名 = (过滤条件, 页大小, 排序列, 降序, 数据版本(数据库路径))
+    if st.session_state.get('明细查询签名') != 查询签名:
+        st.session_state['明细查询签名'] = 查询签名
+        st.session_state['明细游标栈'] = [None]
+    游标栈 = st.session_state['明细游标栈']
+    
+    页数据, 下一游标 = 查询明细页(
+        过滤条件, 销售员ID映射, 游标=游标栈[-1], 页大小=页大小, 排序列=排序列, 降序=降序
+    )
+    
     # 数据统计
-    st.write(f"显示 {len(过滤后数据)} 条记录")
+    总页数 = max(1, -(-记录数 // 页大小))
+    st.write(f"共 {记录数} 条记录，第 {len(游标栈)}/{总页数} 页")
     
     # 交互式数据表格
     st.dataframe(
-        过滤后数据,
+        页数据,
         use_container_width=True,
         hide_index=True,
         column_config={
@@ -285,42 +466,137 @@ def 详细数据表格(过滤后数据):
         }
     )
     
-    # 数据下载
-    csv = 过滤后数据.to_csv(index=False)
-    st.download_button(
-        label="📥 下载CSV数据",
-        data=csv,
-        file_name=f"销售数据_{datetime.now().strftime('%Y%m%d')}.csv",
-        mime="text/csv"
-    )
+    # 翻页按钮
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        st.button("⬅️ 上一页", on_click=_翻页, args=(None,), disabled=len(游标栈) == 1)
+    with col_next:
+        st.button("下一页 ➡️", on_click=_翻页, args=(下一游标,), disabled=下一游标 is None)
+    
+def 数据导出(导出数据源):
+    """按需生成导出文件：点击生成后才从数据源逐块读取并写入临时文件"""
+    col1, col2 = st.columns(2)
+    with col1:
+        格式 = st.selectbox("导出格式", list(导出格式))
+    with col2:
+        st.write("")
+        生成 = st.button("📦 生成导出文件")
+    
+    if not 生成:
+        return
+    
+    扩展名, mime = 导出格式[格式]
+    with tempfile.TemporaryDirectory() as 临时目录:
+        路径 = os.path.join(临时目录, f"导出.{扩展名}")
+        try:
+            with st.spinner("正在生成导出文件..."), open(路径, 'wb') as 文件:
+                写入导出文件(导出数据源(), 文件, 格式)
+        except RuntimeError as e:
+            st.error(f"⚠️ {e}")
+            return
+        
+        # 直接把只读的文件句柄交给下载按钮，脚本里不再另外持有一份文件内容。
+        # 注意 Streamlit 的媒体存储仍会把整个导出文件（压缩后的大小）读入服务器内存
+        with open(路径, 'rb') as 文件:
+            st.download_button(
+                label=f"📥 下载{格式}数据",
+                data=文件,
+                file_name=f"销售数据_{datetime.now().strftime('%Y%m%d')}.{扩展名}",
+                mime=mime
+            )
+
+# 性能采样日志（开启"写入日志"时追加）
+性能日志路径 = "reports/看板性能采样.jsonl"
 
 def 主要():
     """主函数"""
-    # 加载数据
-    df = 获取数据()
-    
-    # 显示KPI指标
-    显示KPI指标(df)
+    # 性能监测：按需记录各阶段耗时和内存，结果在页面末尾填充到同一个面板
+    性能面板 = st.sidebar.expander("🩺 性能监测")
+    with 性能面板:
+        启用监测 = st.toggle("记录各阶段耗时")
+        记录内存 = st.checkbox("同时记录内存峰值 (tracemalloc)", disabled=not 启用监测)
+        写入日志 = st.checkbox("写入JSONL日志", disabled=not 启用监测)
+    记录器 = 性能记录器(启用监测, 记录内存, 性能日志路径 if 写入日志 else None)
     
     # 侧边栏过滤器
-    过滤后数据 = 侧边栏过滤器(df)
+    with 记录器.计时('过滤器'):
+        选项 = 获取过滤选项()
+        过滤条件 = 侧边栏过滤器(选项)
+    
+    # 查询模式：内存过滤需要加载全表，SQL下推只读取匹配的记录
+    查询模式 = st.sidebar.radio(
+        "⚙️ 查询模式",
+        ["内存过滤", "SQL下推"],
+        help="SQL下推模式将过滤条件转换为WHERE子句在数据库中执行，适合数据量大、筛选范围窄的场景"
+    )
+    
+    # 实时刷新：按水位增量拉取新订单，不重新读取历史数据
+    实时刷新 = st.sidebar.toggle("🔄 实时刷新", help="定时拉取新增订单并增量更新图表和KPI")
+    with 记录器.计时('加载数据'):
+        if 实时刷新:
+            间隔 = st.sidebar.number_input("刷新间隔(秒)", min_value=5, max_value=3600, value=30, step=5)
+            数据集 = 获取实时数据集()
+            st.session_state['已显示数据序号'] = 数据集.序号
+            实时刷新面板(数据集, 间隔)
+            立方体, 区间索引, 加载明细 = 数据集.立方体, 数据集.区间索引, 数据集.数据框
+        else:
+            立方体, 区间索引, 加载明细 = 获取销售立方体(), 获取区间索引(), 获取数据
+        
+        df = 加载明细() if 查询模式 == "内存过滤" else None
+    
+    with 记录器.计时('过滤'):
+        # KPI和图表都由预聚合立方体回答
+        立方体切片 = 立方体.切片(过滤条件)
+        
+        if 查询模式 == "SQL下推":
+            记录数 = 立方体切片.KPI()['总订单数']
+            导出数据源 = lambda: 分块读取过滤数据(过滤条件, 选项['销售员ID'])
+        else:
+            过滤后数据 = 应用过滤(df, 过滤条件)
+            记录数 = len(过滤后数据)
+            导出数据源 = lambda: 分块切分数据框(过滤后数据)
+    
+    if df is not None:
+        with st.sidebar.expander("🧮 内存占用"):
+            st.dataframe(内存报告(df), use_container_width=True)
+    
+    # 显示KPI指标
+    with 记录器.计时('KPI指标'):
+        显示KPI指标(*区间KPI(区间索引, 立方体, 立方体切片, 过滤条件))
     
     # 显示过滤后数据量
-    st.sidebar.write(f"📊 过滤后数据: {len(过滤后数据)} 条记录")
+    st.sidebar.write(f"📊 过滤后数据: {记录数} 条记录")
     
     # 分析图表
-    销售趋势分析(过滤后数据)
-    销售团队分析(过滤后数据) 
-    产品区域分析(过滤后数据)
+    with 记录器.计时('面板聚合'):
+        面板汇总 = 立方体切片.多重汇总(面板规格)
+    with 记录器.计时('销售趋势分析'):
+        销售趋势分析(面板汇总['销售趋势'])
+    with 记录器.计时('销售团队分析'):
+        销售团队分析(面板汇总['销售团队']) 
+    with 记录器.计时('产品区域分析'):
+        产品区域分析(面板汇总['产品业绩'], 面板汇总['区域业绩'])
+    
+    # 可选: 由按天摘要近似的订单金额分布
+    if st.sidebar.toggle("📐 订单金额分布", help="由按天保存的可合并摘要近似计算分位数和Top-K，不读取明细订单"):
+        with 记录器.计时('订单分布分析'):
+            订单分布分析(获取订单摘要(), 过滤条件)
     
     # 详细数据表格
-    详细数据表格(过滤后数据)
+    with 记录器.计时('详细数据表格'):
+        详细数据表格(过滤条件, 选项['销售员ID'], 记录数)
+    
+    # 数据下载
+    with 记录器.计时('数据导出'):
+        数据导出(导出数据源)
     
     # 页脚
     st.markdown("---")
     st.markdown("**智能销售监控系统** | 基于真实业务数据分析 | 生成时间: {}".format(
         datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     ))
+    
+    显示性能面板(性能面板, 记录器.完成())
 
 if __name__ == "__main__":
-    主要()
\ No newline at end of file
+    主要()
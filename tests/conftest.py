@@ -0,0 +1,41 @@
+# sales_dashboard/tests/conftest.py
+import os
+import sys
+import shutil
+import sqlite3
+
+import pytest
+
+项目目录 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(项目目录, 'analysis'))
+sys.path.insert(0, os.path.join(项目目录, 'streamlit_app'))
+
+import data_cleaning
+
+示例数据库 = os.path.join(项目目录, 'data', 'sales.db')
+
+def 注入数据问题(conn):
+    """按固定的 rowid 间隔制造价格异常、数量异常、计算错误和缺失值（结果可复现）"""
+    conn.executescript("""
+        UPDATE 产品销售 SET 单价 = 单价 * 100 WHERE rowid % 37 = 0;
+        UPDATE 产品销售 SET 数量 = 50 WHERE rowid % 53 = 0;
+        UPDATE 产品销售 SET 单价 = NULL WHERE rowid % 41 = 0;
+        UPDATE 产品销售 SET 数量 = NULL WHERE rowid % 59 = 0;
+        UPDATE 产品销售 SET 销售额 = NULL WHERE rowid % 67 = 0;
+        UPDATE 产品销售 SET 区域 = NULL WHERE rowid % 43 = 0;
+        UPDATE 产品销售 SET 客户类型 = NULL WHERE rowid % 61 = 0;
+    """)
+    conn.commit()
+
+@pytest.fixture
+def 数据库(tmp_path, monkeypatch):
+    """示例数据库的副本（已注入数据问题），清洗脚本的数据库和日志路径都指向临时目录"""
+    路径 = str(tmp_path / 'sales.db')
+    shutil.copy(示例数据库, 路径)
+    conn = sqlite3.connect(路径)
+    注入数据问题(conn)
+    conn.close()
+
+    monkeypatch.setattr(data_cleaning, '数据库路径', 路径)
+    monkeypatch.setattr(data_cleaning, '日志路径', str(tmp_path / '数据清洗日志.txt'))
+    return 路径
@@ -0,0 +1,65 @@
+# sales_dashboard/tests/test_aggregate_store.py
+import sqlite3
+
+import pytest
+
+import data_cleaning
+from aggregate_store import 聚合存储, 读取表版本
+from cleaned_table import 清洗表
+
+度量 = (('销售额', 'sum'), ('订单ID', 'count'))
+
+def 销售员合计(路径, 姓名):
+    conn = sqlite3.connect(路径)
+    合计 = conn.execute("SELECT SUM(销售额) FROM 产品销售 WHERE 销售员姓名 = ?", [姓名]).fetchone()[0]
+    conn.close()
+    return 合计
+
+def test_原地修改和删除使缓存失效(数据库, tmp_path):
+    # 清洗时在原始表和新的清洗表上创建版本触发器
+    data_cleaning.全量清洗(随机种子=1)
+    存储 = 聚合存储(数据库, str(tmp_path / 'aggregate_cache.db'))
+    结果 = 存储.分组汇总('产品销售', ['销售员姓名'], 度量)
+    assert 存储.分组汇总('产品销售', ['销售员姓名'], 度量).equals(结果)
+    assert (存储.命中, 存储.未命中) == (1, 1)
+
+    # 外部程序原地修改一条记录：记录数和最大rowid都不变
+    conn = sqlite3.connect(数据库)
+    姓名 = conn.execute("SELECT 销售员姓名 FROM 产品销售 WHERE rowid = 2").fetchone()[0]
+    conn.execute("UPDATE 产品销售 SET 销售额 = 销售额 + 1000000 WHERE rowid = 2")
+    conn.commit()
+    结果 = 存储.分组汇总('产品销售', ['销售员姓名'], 度量)
+    assert 存储.未命中 == 2
+    assert 结果.loc[姓名, '销售额_sum'] == pytest.approx(销售员合计(数据库, 姓名))
+
+    # 删除最大rowid的记录后再追加一条：记录数和最大rowid又回到原样
+    conn.execute("DELETE FROM 产品销售 WHERE rowid = (SELECT MAX(rowid) FROM 产品销售)")
+    conn.execute("INSERT INTO 产品销售 SELECT 'NEW1', 销售员ID, 销售员姓名, 产品类别, 单价, 数量, 销售额 * 2, "
+                 "订单日期, 区域, 客户类型 FROM 产品销售 WHERE rowid = 2")
+    conn.commit()
+    conn.close()
+    结果 = 存储.分组汇总('产品销售', ['销售员姓名'], 度量)
+    assert 存储.未命中 == 3
+    assert 结果.loc[姓名, '销售额_sum'] == pytest.approx(销售员合计(数据库, 姓名))
+
+def test_清洗表整表替换后仍能发现原地修改(数据库, tmp_path):
+    存储 = 聚合存储(数据库, str(tmp_path / 'aggregate_cache.db'))
+    for 种子 in (1, 2):
+        data_cleaning.全量清洗(随机种子=种子)
+        存储.分组汇总(清洗表, ['区域'], 度量)
+        conn = sqlite3.connect(数据库)
+        conn.execute(f"UPDATE {清洗表} SET 销售额 = 销售额 + 1 WHERE rowid = 1")
+        conn.commit()
+        conn.close()
+        未命中 = 存储.未命中
+        存储.分组汇总(清洗表, ['区域'], 度量)
+        assert 存储.未命中 == 未命中 + 1
+
+def test_读取表版本不修改数据库(数据库):
+    with open(数据库, 'rb') as 文件:
+        原内容 = 文件.read()
+    conn = sqlite3.connect(数据库)
+    读取表版本(conn, '产品销售')
+    conn.close()
+    with open(数据库, 'rb') as 文件:
+        assert 文件.read() == 原内容
@@ -0,0 +1,34 @@
+# sales_dashboard/tests/test_business_analysis.py
+import sqlite3
+
+import pandas as pd
+import pandas.testing as pdt
+
+from business_analysis import 时间趋势分析
+
+def test_月度趋势与按月分组的结果一致(数据库):
+    conn = sqlite3.connect(数据库)
+    # 去掉一个中间月份：没有订单的月份不出现在结果中；注入的缺失单价不参与平均单价
+    df = pd.read_sql("SELECT * FROM 产品销售 WHERE 订单日期 NOT LIKE '2025-06%'", conn)
+    conn.close()
+    assert df['单价'].isna().any()
+
+    月度 = df.assign(订单日期=pd.to_datetime(df['订单日期']))
+    期望 = 月度.groupby(月度['订单日期'].dt.to_period('M').rename('年月')).agg({
+        '销售额': 'sum', '订单ID': 'count', '单价': 'mean'
+    }).round(2)
+    期望.columns = ['月销售额', '月订单数', '月平均单价']
+
+    pdt.assert_frame_equal(时间趋势分析(df), 期望)
+
+def test_上月没有销售额时环比显示为短横线(数据库, capsys):
+    conn = sqlite3.connect(数据库)
+    df = pd.read_sql("SELECT * FROM 产品销售", conn)
+    conn.close()
+    月份 = df['订单日期'].str[:7]
+    df = df[月份 != sorted(月份.unique())[-2]]
+
+    时间趋势分析(df)
+    输出 = capsys.readouterr().out
+    assert "末月环比: -\n" in 输出
+    assert "nan" not in 输出
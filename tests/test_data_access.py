@@ -0,0 +1,24 @@
+# sales_dashboard/tests/test_data_access.py
+import sqlite3
+
+import pandas as pd
+
+import data_cleaning
+from cleaned_table import 清洗表
+from data_access import 读取过滤选项, 分块读取过滤数据
+
+def test_同名销售员的全部ID都参与SQL过滤(数据库):
+    data_cleaning.全量清洗(随机种子=1)
+    conn = sqlite3.connect(数据库)
+    姓名, 原ID = conn.execute(f"SELECT 销售员姓名, 销售员ID FROM {清洗表} WHERE rowid = 1").fetchone()
+    # 同一姓名的部分订单记在另一个ID下
+    conn.execute(f"UPDATE {清洗表} SET 销售员ID = 999 WHERE 销售员姓名 = ? AND rowid % 2 = 0", [姓名])
+    conn.commit()
+    期望 = conn.execute(f"SELECT COUNT(*) FROM {清洗表} WHERE 销售员姓名 = ?", [姓名]).fetchone()[0]
+    conn.close()
+
+    映射 = 读取过滤选项(数据库)['销售员ID']
+    assert sorted(映射[姓名]) == sorted([原ID, 999])
+    结果 = pd.concat(分块读取过滤数据({'销售员': [姓名]}, 映射, 数据库路径=数据库))
+    assert len(结果) == 期望
+    assert (结果['销售员姓名'] == 姓名).all()
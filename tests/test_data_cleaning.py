@@ -0,0 +1,173 @@
+# sales_dashboard/tests/test_data_cleaning.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+import data_cleaning
+from cleaned_table import 清洗表
+from validation_rules import 合理价格范围, 数量上限
+
+def 读取表(路径, 表名):
+    conn = sqlite3.connect(路径)
+    df = pd.read_sql(f"SELECT * FROM {表名} ORDER BY 订单ID", conn)
+    conn.close()
+    return df.set_index('订单ID')
+
+def 逐行清洗(df):
+    """向量化之前的逐行实现（iterrows + 按订单ID定位），作为等价性的参照"""
+    df = df.copy()
+    问题记录 = {}
+    价格异常批次 = []
+    for 产品, (最低价, 最高价) in 合理价格范围.items():
+        异常 = df[(df['产品类别'] == 产品) & ((df['单价'] < 最低价) | (df['单价'] > 最高价))]
+        if len(异常) > 0:
+            价格异常批次.append(异常)
+    问题记录['价格异常'] = 价格异常批次
+    数量异常 = df[df['数量'] > 数量上限]
+    if len(数量异常) > 0:
+        问题记录['数量异常'] = 数量异常
+    if (abs(df['销售额'] - df['单价'] * df['数量']) > 0.01).any():
+        问题记录['计算错误'] = True
+    缺失列 = [列名 for 列名 in df.columns if df[列名].isnull().sum() > 0]
+
+    df_clean = df.copy()
+    if '计算错误' in 问题记录:
+        df_clean['销售额'] = df_clean['单价'] * df_clean['数量']
+    for 异常批次 in 问题记录['价格异常']:
+        for _, 异常行 in 异常批次.iterrows():
+            区间 = data_cleaning.价格修正范围.get(异常行['产品类别'], data_cleaning.默认修正范围)
+            修正价格 = np.random.uniform(区间[0], 区间[1])
+            mask = (df_clean['订单ID'] == 异常行['订单ID'])
+            df_clean.loc[mask, '单价'] = round(修正价格, 2)
+            df_clean.loc[mask, '销售额'] = round(修正价格 * df_clean.loc[mask, '数量'], 2)
+    if '数量异常' in 问题记录:
+        for _, 异常行 in 问题记录['数量异常'].iterrows():
+            修正数量 = min(10, max(1, 异常行['数量']))
+            mask = (df_clean['订单ID'] == 异常行['订单ID'])
+            df_clean.loc[mask, '数量'] = 修正数量
+            df_clean.loc[mask, '销售额'] = df_clean.loc[mask, '单价'] * 修正数量
+    for 列名 in 缺失列:
+        if 列名 == '区域':
+            df_clean[列名] = df_clean[列名].fillna('未知区域')
+        elif 列名 in ['单价', '数量', '销售额']:
+            df_clean[列名] = df_clean[列名].fillna(df_clean[列名].median())
+        else:
+            众数 = df_clean[列名].mode()
+            df_clean[列名] = df_clean[列名].fillna(众数[0] if len(众数) > 0 else '未知')
+    return df_clean
+
+def test_向量化清洗与逐行清洗结果一致(数据库):
+    conn = sqlite3.connect(数据库)
+    df = pd.read_sql("SELECT * FROM 产品销售", conn)
+    conn.close()
+
+    np.random.seed(7)
+    期望 = 逐行清洗(df)
+    问题记录 = data_cleaning.识别数据问题(df)
+    assert set(问题记录) == {'价格异常', '数量异常', '计算错误', '缺失值'}
+    np.random.seed(7)
+    实际, _ = data_cleaning.执行数据清洗(df, 问题记录)
+
+    pdt.assert_frame_equal(实际, 期望)
+
+def test_增量清洗处理新增修改和删除(数据库):
+    data_cleaning.全量清洗(随机种子=1)
+    清洗前 = 读取表(数据库, 清洗表)
+
+    conn = sqlite3.connect(数据库)
+    # rowid 2、3 不在注入问题的间隔上，是干净的记录
+    修改订单, 删除订单 = [conn.execute("SELECT 订单ID FROM 产品销售 WHERE rowid = ?", [行号]).fetchone()[0] for 行号 in (2, 3)]
+    conn.execute("UPDATE 产品销售 SET 数量 = 数量 + 1, 销售额 = 单价 * (数量 + 1) WHERE 订单ID = ?", [修改订单])
+    conn.execute("DELETE FROM 产品销售 WHERE 订单ID = ?", [删除订单])
+    conn.execute("""
+        INSERT INTO 产品销售
+        SELECT 'NEW' || rowid, 销售员ID, 销售员姓名, 产品类别, 单价 * (rowid = 4) * 99 + 单价, 数量, 销售额,
+               '2025-10-16', 区域, 客户类型
+        FROM 产品销售 WHERE rowid IN (4, 5, 6)
+    """)
+    conn.commit()
+    原始 = pd.read_sql("SELECT * FROM 产品销售", conn).set_index('订单ID')
+    conn.close()
+
+    assert data_cleaning.增量清洗(随机种子=2) == 4
+    清洗后 = 读取表(数据库, 清洗表)
+
+    # 清洗表与原始表的订单一致：删除的订单消失，新增订单出现
+    assert set(清洗后.index) == set(原始.index)
+    assert 删除订单 not in 清洗后.index
+    assert 清洗后.loc[修改订单, '数量'] == 原始.loc[修改订单, '数量']
+
+    # 新增订单中的价格异常被修正，销售额与单价×数量一致
+    新增 = 清洗后[清洗后.index.str.startswith('NEW')]
+    assert len(新增) == 3
+    assert ((新增['单价'] >= 200) & (新增['单价'] <= 15000)).all()
+    assert np.allclose(新增['销售额'], 新增['单价'] * 新增['数量'], atol=0.01)
+
+    # 其余订单保持不变
+    未涉及 = 清洗前.index.difference([修改订单, 删除订单])
+    pdt.assert_frame_equal(清洗后.loc[未涉及], 清洗前.loc[未涉及])
+
+def 填充值与修正后中位数一致(数据库):
+    """缺失的数值被填为其余记录修正之后的中位数（整表清洗的规则）"""
+    原始 = 读取表(数据库, '产品销售')
+    清洗后 = 读取表(数据库, 清洗表)
+    for 列名, 原为空 in [('单价', 原始['单价'].isna()), ('数量', 原始['数量'].isna()),
+                        ('销售额', 原始['单价'].isna() | 原始['数量'].isna())]:
+        期望 = 清洗后.loc[~原为空, 列名].median()
+        assert np.allclose(清洗后.loc[原为空, 列名], 期望), 列名
+
+def test_分块清洗只有一块时与整表清洗一致(数据库):
+    data_cleaning.全量清洗(随机种子=3)
+    整表 = 读取表(数据库, 清洗表)
+    data_cleaning.分块清洗(随机种子=3)
+    分块 = 读取表(数据库, 清洗表)
+
+    pdt.assert_frame_equal(分块, 整表)
+
+def test_分块清洗用修正后的数值统计填充值且与块大小无关(数据库, monkeypatch):
+    data_cleaning.全量清洗(随机种子=3)
+    整表 = 读取表(数据库, 清洗表)
+
+    monkeypatch.setattr(data_cleaning, '估算块大小', lambda *参数: 200)
+    data_cleaning.分块清洗(随机种子=3)
+    填充值与修正后中位数一致(数据库)
+    pdt.assert_frame_equal(读取表(数据库, 清洗表), 整表)
+
+def test_并行清洗用修正后的数值统计填充值且与进程数无关(数据库):
+    data_cleaning.并行清洗(随机种子=4, 进程数=1)
+    串行 = 读取表(数据库, 清洗表)
+    填充值与修正后中位数一致(数据库)
+
+    data_cleaning.并行清洗(随机种子=4, 进程数=2)
+    pdt.assert_frame_equal(读取表(数据库, 清洗表), 串行)
+
+def test_按月份并行清洗与同一种子的整表清洗一致(数据库):
+    # 注入的价格异常分布在各个月份，需要随机修正价格
+    原始 = 读取表(数据库, '产品销售')
+    价格异常月份 = 原始.loc[原始['单价'] > 100000, '订单日期'].str[:7]
+    assert 价格异常月份.nunique() > 1
+
+    data_cleaning.全量清洗(随机种子=6)
+    整表 = 读取表(数据库, 清洗表)
+    data_cleaning.并行清洗(随机种子=6, 进程数=2, 分区方式='月份')
+    pdt.assert_frame_equal(读取表(数据库, 清洗表), 整表)
+
+def test_没有数值列缺失时不执行第一遍(数据库, monkeypatch, tmp_path):
+    conn = sqlite3.connect(数据库)
+    conn.execute("UPDATE 产品销售 SET 单价 = COALESCE(单价, 100), 数量 = COALESCE(数量, 1), "
+                 "销售额 = COALESCE(销售额, 100)")
+    conn.commit()
+    conn.close()
+
+    # 进程池中的任务即使结果没有被读取也会执行，用标记文件记录是否调用过
+    标记 = tmp_path / '执行了第一遍'
+    def 记录调用(块, 随机数):
+        标记.touch()
+        return 块[data_cleaning.数值列]
+    monkeypatch.setattr(data_cleaning, '修正数值', 记录调用)
+
+    data_cleaning.分块清洗(随机种子=5)
+    data_cleaning.并行清洗(随机种子=5, 进程数=2)
+    assert not 标记.exists()
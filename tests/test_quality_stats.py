@@ -0,0 +1,36 @@
+# sales_dashboard/tests/test_quality_stats.py
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from quality_stats import 计数指标, 汇总评分, 更新质量统计, 读取日统计, 区间质量评分
+
+def 检查与整表评分一致(conn, 表名):
+    计数 = 计数指标(pd.read_sql(f"SELECT * FROM {表名}", conn))
+    assert 读取日统计(conn, 表名)['重复订单'].sum() == 计数['重复订单']
+    assert 区间质量评分(conn, 表名)[0] == pytest.approx(汇总评分(计数)[0])
+    return 计数['重复订单']
+
+def test_按天累加的评分计入跨天的重复订单(数据库):
+    conn = sqlite3.connect(数据库)
+    # 副本没有主键约束，可以写入重复的订单ID
+    conn.execute("CREATE TABLE 副本 AS SELECT * FROM 产品销售")
+    更新质量统计(conn, '副本')
+
+    # 把两个已有订单复制到新的一天：重复记录只出现在新的一天
+    conn.execute("""
+        INSERT INTO 副本 SELECT 订单ID, 销售员ID, 销售员姓名, 产品类别, 单价, 数量, 销售额,
+                                '2099-01-01', 区域, 客户类型
+        FROM 副本 WHERE rowid IN (10, 20)
+    """)
+    conn.commit()
+    assert 更新质量统计(conn, '副本') == ['2099-01-01']
+    assert 检查与整表评分一致(conn, '副本') == 2
+
+    # 删除其中一个订单较早的记录：只有原来那天重新扫描，新的一天不再算重复
+    conn.execute("DELETE FROM 副本 WHERE rowid = 10")
+    conn.commit()
+    assert '2099-01-01' not in 更新质量统计(conn, '副本')
+    assert 检查与整表评分一致(conn, '副本') == 1
+    conn.close()
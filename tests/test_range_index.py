@@ -0,0 +1,63 @@
+# sales_dashboard/tests/test_range_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from range_index import 区间索引, 索引度量, 变化率
+
+def 随机订单(随机数, 行数, 最早天, 最晚天):
+    日期 = pd.Timestamp('2025-01-01') + pd.to_timedelta(随机数.integers(最早天, 最晚天, 行数), unit='D')
+    return pd.DataFrame({
+        '订单日期': 日期.strftime('%Y-%m-%d'),
+        '销售员姓名': 随机数.choice(['张三', '李四', '王五'], 行数),
+        '产品类别': 随机数.choice(['智能手机', '耳机'], 行数),
+        '区域': 随机数.choice(['华北', '华东', '西部'], 行数),
+        '客户类型': 随机数.choice(['新客户', '老客户'], 行数),
+        '销售额': 随机数.random(行数) * 1000,
+        '数量': 随机数.integers(1, 5, 行数),
+    })
+
+def 分组区间合计(df, 开始, 结束, 维度=None, 取值=()):
+    """用 pandas 按天分组后再对日期区间求和，作为区间索引的参照"""
+    明细 = df.assign(订单日期=pd.to_datetime(df['订单日期']), 订单数=1)
+    if 维度:
+        明细 = 明细[明细[维度].isin(取值)]
+    每日 = 明细.groupby('订单日期')[索引度量].sum()
+    return 每日.loc[pd.Timestamp(开始):pd.Timestamp(结束)].sum()
+
+def test_区间合计与分组求和一致():
+    随机数 = np.random.default_rng(0)
+    全部订单 = 随机订单(随机数, 400, 30, 90)
+    索引 = 区间索引.从记录构建(全部订单)
+
+    # 增量累加：同一天、更晚的日期（容量翻倍）、更早的日期（向前补齐）和新的维度取值
+    for 批次 in [随机订单(随机数, 5, 85, 95), 随机订单(随机数, 50, 100, 400), 随机订单(随机数, 5, 0, 10)]:
+        批次.loc[0, '区域'] = '新区'
+        索引.累加(批次)
+        全部订单 = pd.concat([全部订单, 批次], ignore_index=True)
+
+    条件列表 = [(None, ()), ('区域', ('华北', '新区')), ('销售员姓名', ('李四',))]
+    for 序号 in range(150):
+        开始天, 结束天 = sorted(随机数.integers(-20, 420, 2))
+        开始 = pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(开始天))
+        结束 = pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(结束天))
+        维度, 取值 = 条件列表[序号 % len(条件列表)]
+
+        实际 = 索引.区间合计(开始, 结束, {维度: list(取值)} if 维度 else None)
+        期望 = 分组区间合计(全部订单, 开始, 结束, 维度, 取值)
+        assert 实际 == pytest.approx(期望.to_dict())
+
+def test_环比取紧邻的等长区间():
+    随机数 = np.random.default_rng(1)
+    订单 = 随机订单(随机数, 300, 0, 120)
+    索引 = 区间索引.从记录构建(订单)
+
+    本期, 上期 = 索引.环比('2025-03-01', '2025-03-31')
+    assert 本期 == pytest.approx(分组区间合计(订单, '2025-03-01', '2025-03-31').to_dict())
+    assert 上期 == pytest.approx(分组区间合计(订单, '2025-01-29', '2025-02-28').to_dict())
+    assert 变化率(本期['销售额'], 0) is None
+
+def test_多个维度的组合条件报错():
+    索引 = 区间索引.从记录构建(随机订单(np.random.default_rng(2), 10, 0, 5))
+    with pytest.raises(ValueError):
+        索引.区间合计('2025-01-01', '2025-01-05', {'区域': ['华北'], '产品类别': ['耳机']})
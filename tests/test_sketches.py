@@ -0,0 +1,55 @@
+# sales_dashboard/tests/test_sketches.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+from cleaned_table import 清洗表
+from sketches import 频繁项, 摘要存储, 合并摘要
+
+def test_合并后的计数和误差仍是上界():
+    随机数 = np.random.default_rng(0)
+    # 长尾分布：项数远多于容量，各部分的高频项不同
+    各部分 = [随机数.zipf(1.3, 3000) + 偏移 for 偏移 in (0, 0, 50, 200)]
+    真实计数 = pd.Series(np.concatenate(各部分)).value_counts()
+
+    合并后 = 频繁项(容量=16)
+    for 部分 in 各部分:
+        摘要 = 频繁项(容量=16)
+        摘要.添加(部分.astype(object))
+        合并后.合并(摘要)
+
+    计数器 = pd.DataFrame.from_dict(合并后.计数器, orient='index', columns=['计数', '误差'])
+    真实 = 真实计数.reindex(计数器.index)
+    assert (计数器['计数'] - 计数器['误差'] <= 真实).all()
+    assert (真实 <= 计数器['计数']).all()
+    # 不在摘要中的项不超过最小计数
+    assert 真实计数.drop(计数器.index).max() <= 计数器['计数'].min()
+
+def test_只新增订单时增量合并日摘要(数据库, tmp_path):
+    data_cleaning.全量清洗(随机种子=1)
+    存储 = 摘要存储(数据库, str(tmp_path / 'sketch_cache.db'))
+    重建数 = len(存储.日摘要(清洗表))
+
+    conn = sqlite3.connect(数据库)
+    conn.execute("""
+        INSERT INTO 产品销售
+        SELECT 'NEW' || rowid, 销售员ID, 销售员姓名, 产品类别, 单价, 数量, 单价 * 数量, 订单日期, 区域, 客户类型
+        FROM 产品销售 WHERE rowid IN (4, 5, 6)
+    """)
+    conn.commit()
+    conn.close()
+    assert data_cleaning.增量清洗(随机种子=2) == 3
+
+    # 增量清洗只插入了新订单：不重建，只合并新订单所在日期的摘要
+    日摘要 = 存储.日摘要(清洗表)
+    assert 存储.重建 == 重建数
+    assert 0 < 存储.增量合并 <= 5 * 3
+
+    # 与从头构建的结果相同
+    重新构建 = 摘要存储(数据库, str(tmp_path / 'rebuild_cache.db')).日摘要(清洗表)
+    assert set(日摘要) == set(重新构建)
+    增量, 全量 = 合并摘要(日摘要), 合并摘要(重新构建)
+    assert np.array_equal(增量.订单.寄存器, 全量.订单.寄存器)
+    assert 增量.金额.桶 == 全量.金额.桶